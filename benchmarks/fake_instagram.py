@@ -0,0 +1,252 @@
+"""Deterministic local stand-in for the parts of Instagram the crawler talks to.
+
+:class:`FakeInstagram` generates hashtag feeds, posts and owner profiles
+on the fly from a seed, so feeds of a million posts cost no memory up
+front.  Every simulated request can be slowed down (``latency``), fail
+with a connection error (``error_rate``) or fall into a burst of 429
+responses (``burst_every``/``burst_length``), and owners repeat across
+posts according to ``owner_overlap``.
+
+:meth:`FakeInstagram.patch` swaps it in for ``instaloader.Hashtag`` and
+``instaloader.Profile`` inside the crawler, the same way the unit tests
+mock them.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import random
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import patch
+
+import instaloader
+
+from instagram_hashtag_crawler.ratelimit import RateLimiter
+
+# Newest post in every feed; older posts are spaced FEED_SPACING apart.
+FEED_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+FEED_SPACING = timedelta(minutes=1)
+
+
+@dataclasses.dataclass
+class BackendConfig:
+    """Shape of the simulated backend."""
+
+    posts_per_tag: int = 10_000
+    page_size: int = 50  # posts returned per feed request
+    latency: float = 0.0  # seconds per request
+    error_rate: float = 0.0  # share of requests failing with a connection error
+    burst_every: int = 0  # start a burst of 429s every N requests; 0 disables
+    burst_length: int = 2  # consecutive 429 responses per burst
+    owner_overlap: float = 0.5  # share of posts whose owner already posted in the feed
+    cooccurrence: float = 0.1  # chance a post also carries each other known hashtag
+    non_image_rate: float = 0.1  # share of sidecar/video posts
+    seed: int = 0
+
+
+@dataclasses.dataclass
+class BackendStats:
+    """Requests served by the backend, by kind."""
+
+    feed_pages: int = 0
+    profile_fetches: int = 0
+    errors: int = 0
+    throttled: int = 0
+
+    @property
+    def requests(self) -> int:
+        return self.feed_pages + self.profile_fetches
+
+
+class FakeProfile:
+    """The ``instaloader.Profile`` attributes the crawler reads."""
+
+    def __init__(self, owner_id: int) -> None:
+        self.userid = owner_id
+        self.username = f"user{owner_id}"
+        self.full_name = f"User {owner_id}"
+        self.profile_pic_url = f"https://example.com/u/{owner_id}.jpg"
+        self.mediacount = owner_id % 1000
+        self.followers = owner_id % 10_000
+        self.followees = owner_id % 500
+
+
+class FakePost:
+    """The ``instaloader.Post`` attributes the crawler reads.
+
+    ``owner_profile`` and ``owner_username`` are requests against the
+    backend, like the lazy properties of a real post whose feed node does
+    not carry the owner.
+    """
+
+    def __init__(
+        self,
+        backend: FakeInstagram,
+        shortcode: str,
+        owner_id: int,
+        date_utc: datetime,
+        typename: str,
+        caption_hashtags: list[str],
+    ) -> None:
+        self._backend = backend
+        self.shortcode = shortcode
+        self.owner_id = owner_id
+        self.date_utc = date_utc
+        self.typename = typename
+        self.caption_hashtags = caption_hashtags
+        self.caption = " ".join(f"#{tag}" for tag in caption_hashtags)
+        self.url = f"https://example.com/p/{shortcode}.jpg"
+        self.likes = owner_id % 997
+        self.comments = owner_id % 89
+
+    @property
+    def owner_profile(self) -> FakeProfile:
+        return self._backend.fetch_profile(self.owner_id)
+
+    @property
+    def owner_username(self) -> str:
+        return self.owner_profile.username
+
+
+class FakeFeed:
+    """Paged, newest-first feed of one hashtag.
+
+    Unlike a generator, the feed survives an exception from ``__next__``,
+    so the crawler's retry around paging can resume it like instaloader's
+    ``NodeIterator``.
+    """
+
+    def __init__(self, backend: FakeInstagram, name: str) -> None:
+        self._backend = backend
+        self._name = name
+        self._index = 0
+        self._page: list[FakePost] = []
+
+    def __iter__(self) -> Iterator[FakePost]:
+        return self
+
+    def __next__(self) -> FakePost:
+        if not self._page:
+            if self._index >= self._backend.config.posts_per_tag:
+                raise StopIteration
+            self._page = self._backend.fetch_page(self._name, self._index)
+            self._page.reverse()
+        self._index += 1
+        return self._page.pop()
+
+
+class FakeHashtag:
+    """The ``instaloader.Hashtag`` attributes the crawler reads."""
+
+    def __init__(self, backend: FakeInstagram, name: str) -> None:
+        self._backend = backend
+        self.name = name
+        self.mediacount = backend.config.posts_per_tag
+
+    def get_posts_resumable(self) -> FakeFeed:
+        return FakeFeed(self._backend, self.name)
+
+
+class FakeInstagram:
+    """Seeded generator of hashtag feeds and profiles with simulated faults.
+
+    *hashtags* lists the tags that can co-occur on a post (used by AND
+    searches); other tags can still be crawled.  A *limiter* paces every
+    request the way the crawler's rate controller does with a real
+    loader.
+    """
+
+    def __init__(
+        self,
+        config: BackendConfig,
+        *,
+        hashtags: tuple[str, ...] = (),
+        limiter: RateLimiter | None = None,
+    ) -> None:
+        self.config = config
+        self.hashtags = hashtags
+        self.limiter = limiter
+        self.stats = BackendStats()
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+
+    @contextlib.contextmanager
+    def patch(self) -> Iterator[FakeInstagram]:
+        """Route the crawler's hashtag and profile lookups to this backend."""
+        with (
+            patch("instagram_hashtag_crawler.crawler.Hashtag") as hashtag_cls,
+            patch("instagram_hashtag_crawler.crawler.Profile") as profile_cls,
+        ):
+            hashtag_cls.from_name.side_effect = lambda _ctx, name: FakeHashtag(self, name)
+            profile_cls.from_id.side_effect = lambda _ctx, owner_id: self.fetch_profile(owner_id)
+            yield self
+
+    def fetch_page(self, hashtag: str, start: int) -> list[FakePost]:
+        self._request()
+        with self._lock:
+            self.stats.feed_pages += 1
+        end = min(start + self.config.page_size, self.config.posts_per_tag)
+        return [self._make_post(hashtag, index) for index in range(start, end)]
+
+    def fetch_profile(self, owner_id: int) -> FakeProfile:
+        self._request()
+        with self._lock:
+            self.stats.profile_fetches += 1
+        return FakeProfile(owner_id)
+
+    def _request(self) -> None:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        with self._lock:
+            count = self.stats.requests + self.stats.errors + self.stats.throttled
+            every = self.config.burst_every
+            if every and count % every < self.config.burst_length and count >= every:
+                self.stats.throttled += 1
+                raise instaloader.TooManyRequestsException("429 Too Many Requests (simulated)")
+            if self._rng.random() < self.config.error_rate:
+                self.stats.errors += 1
+                raise instaloader.ConnectionException("Connection reset (simulated)")
+        if self.limiter is not None:
+            self.limiter.succeeded()
+
+    def _make_post(self, hashtag: str, index: int) -> FakePost:
+        # Seeded per post so a feed looks the same however it is paged
+        rng = random.Random(f"{self.config.seed}:{hashtag}:{index}")
+        config = self.config
+        # Owner ids are shared across hashtags, so the same accounts recur in every feed
+        if index and rng.random() < config.owner_overlap:
+            owner_id = rng.randrange(index) + 1
+        else:
+            owner_id = index + 1
+        tags = [hashtag]
+        tags += [t for t in self.hashtags if t != hashtag and rng.random() < config.cooccurrence]
+        typename = "GraphSidecar" if rng.random() < config.non_image_rate else "GraphImage"
+        return FakePost(
+            self,
+            shortcode=f"{hashtag}-{index}",
+            owner_id=owner_id,
+            date_utc=FEED_START - index * FEED_SPACING,
+            typename=typename,
+            caption_hashtags=tags,
+        )
+
+
+class _FakeContext:
+    pass
+
+
+def fake_loader() -> Any:
+    """A stand-in loader; the fake backend never looks at its context."""
+    return type("FakeLoader", (), {"context": _FakeContext()})()
+
+
+def fake_worker_loader(_loader: Any, _limiter: RateLimiter | None) -> Any:
+    """``CrawlConfig.worker_loader`` for fake loaders, which have no session to clone."""
+    return fake_loader()
@@ -0,0 +1,268 @@
+"""Run crawler benchmarks against the fake Instagram backend.
+
+Each scenario runs in a fresh process so its peak RSS is its own::
+
+    python -m benchmarks.run --posts 100000 --latency 0.001 --save baseline.json
+    python -m benchmarks.run --posts 100000 --latency 0.001 --compare baseline.json
+
+``--compare`` exits with status 1 if any scenario's posts/sec dropped by
+more than ``--tolerance`` against the saved results.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.fake_instagram import (
+    BackendConfig,
+    BackendStats,
+    FakeInstagram,
+    fake_loader,
+    fake_worker_loader,
+)
+from instagram_hashtag_crawler.crawler import CrawlConfig, crawl, crawl_multi_and
+from instagram_hashtag_crawler.export import read_profiles
+from instagram_hashtag_crawler.profile_cache import ProfileCache
+from instagram_hashtag_crawler.ratelimit import RateLimiter
+
+SCENARIOS = ("crawl", "crawl_multi_and", "export")
+
+# Hashtags used by the scenarios; AND searches query the first two.
+HASHTAGS = ("food", "pizza")
+
+
+@dataclasses.dataclass
+class Result:
+    scenario: str
+    posts: int
+    wall_time: float
+    posts_per_sec: float
+    profile_fetches_per_post: float
+    requests: int
+    errors: int
+    throttled: int
+    peak_rss_mb: float
+
+
+def run_scenario(scenario: str, backend_config: BackendConfig, options: dict) -> Result:
+    """Run one scenario in the current process and measure it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp) / "json"
+        output_dir.mkdir()
+        if scenario == "export":
+            # Export reads what a crawl wrote.  The crawl runs in a process of
+            # its own, so the time and peak RSS measured here are the export's.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                _, posts = pool.submit(
+                    _crawl, "crawl", backend_config, options, output_dir
+                ).result()
+            stats = BackendStats()
+            start = time.perf_counter()
+            read_profiles(output_dir, Path(tmp) / "csv", workers=options["export_workers"])
+            wall_time = time.perf_counter() - start
+        else:
+            start = time.perf_counter()
+            stats, posts = _crawl(scenario, backend_config, options, output_dir)
+            wall_time = time.perf_counter() - start
+
+    return Result(
+        scenario=scenario,
+        posts=posts,
+        wall_time=round(wall_time, 3),
+        posts_per_sec=round(posts / wall_time, 1) if wall_time else 0.0,
+        profile_fetches_per_post=round(stats.profile_fetches / posts, 3) if posts else 0.0,
+        requests=stats.requests,
+        errors=stats.errors,
+        throttled=stats.throttled,
+        peak_rss_mb=round(_peak_rss_mb(), 1),
+    )
+
+
+def _crawl(
+    scenario: str, backend_config: BackendConfig, options: dict, output_dir: Path
+) -> tuple[BackendStats, int]:
+    """Run a crawl scenario into *output_dir*; return the backend's stats and the posts saved."""
+    # Simulated errors would otherwise log a retry warning each
+    logging.getLogger("instagram_hashtag_crawler").setLevel(logging.ERROR)
+    # Requests are paced by the backend; a high ceiling keeps pacing out of the
+    # way unless --rate-limit asks for it, and short backoffs keep 429 bursts cheap.
+    limiter = RateLimiter(options["rate_limit"], max_backoff=options["max_backoff"])
+    backend = FakeInstagram(backend_config, hashtags=HASHTAGS, limiter=limiter)
+    config = CrawlConfig(
+        output_dir=output_dir,
+        max_posts=options["max_posts"],
+        output_format=options["output_format"],
+        rate_limiter=limiter,
+        profile_cache=ProfileCache(),
+        profile_workers=options["profile_workers"],
+        profile_batch_size=options["profile_batch"],
+        worker_loader=fake_worker_loader,
+    )
+    with backend.patch():
+        if scenario == "crawl":
+            crawl(fake_loader(), HASHTAGS[0], config)
+        else:
+            crawl_multi_and(fake_loader(), list(HASHTAGS), config)
+    config.profile_cache.close()
+    return backend.stats, _count_posts(output_dir)
+
+
+def _count_posts(output_dir: Path) -> int:
+    count = 0
+    for path in output_dir.iterdir():
+        if path.suffix == ".jsonl":
+            with path.open() as f:
+                count += sum(1 for _ in f)
+        elif path.suffix == ".json" and not path.name.endswith((".checkpoint.json", ".index.json")):
+            count += len(json.loads(path.read_text())["posts"])
+    return count
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark the crawler and exporter against a fake Instagram backend.",
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all)",
+    )
+    backend = parser.add_argument_group("backend")
+    backend.add_argument("--posts", type=int, default=10_000, help="Posts per hashtag feed")
+    backend.add_argument("--page-size", type=int, default=50, help="Posts per feed request")
+    backend.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    backend.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing")
+    backend.add_argument(
+        "--burst-every", type=int, default=0, help="Start a burst of 429s every N requests"
+    )
+    backend.add_argument("--burst-length", type=int, default=2, help="429s per burst")
+    backend.add_argument(
+        "--owner-overlap",
+        type=float,
+        default=0.5,
+        help="Share of posts by an owner already seen in the feed",
+    )
+    backend.add_argument(
+        "--cooccurrence",
+        type=float,
+        default=0.1,
+        help="Chance a post carries the other benchmark hashtag",
+    )
+    backend.add_argument("--seed", type=int, default=0)
+    crawler = parser.add_argument_group("crawler")
+    crawler.add_argument(
+        "--max-posts", type=int, default=None, help="Posts to collect (default: --posts)"
+    )
+    crawler.add_argument("--output-format", choices=("json", "jsonl"), default="jsonl")
+    crawler.add_argument("--profile-workers", type=int, default=4)
+    crawler.add_argument("--profile-batch", type=int, default=24)
+    crawler.add_argument("--rate-limit", type=float, default=1_000_000.0)
+    crawler.add_argument("--max-backoff", type=float, default=0.01)
+    parser.add_argument(
+        "--export-workers", type=int, default=1, help="Processes parsing files in the export"
+    )
+    parser.add_argument("--save", metavar="FILE", help="Write results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="Compare against saved results")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed posts/sec drop against --compare (default: 0.2)",
+    )
+    args = parser.parse_args(argv)
+
+    # argparse rejects a list default for nargs="*" positionals with choices
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    return args
+
+
+def _regressions(results: list[Result], baseline_file: Path, tolerance: float) -> list[str]:
+    baseline = {r["scenario"]: r for r in json.loads(baseline_file.read_text())}
+    messages = []
+    for result in results:
+        before = baseline.get(result.scenario)
+        if before is None or not before["posts_per_sec"]:
+            continue
+        change = result.posts_per_sec / before["posts_per_sec"] - 1
+        if change < -tolerance:
+            messages.append(
+                f"{result.scenario}: {result.posts_per_sec} posts/s vs "
+                f"{before['posts_per_sec']} ({change:+.0%})"
+            )
+    return messages
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+
+    backend_config = BackendConfig(
+        posts_per_tag=args.posts,
+        page_size=args.page_size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        owner_overlap=args.owner_overlap,
+        cooccurrence=args.cooccurrence,
+        seed=args.seed,
+    )
+    options = {
+        "max_posts": args.max_posts or args.posts,
+        "output_format": args.output_format,
+        "profile_workers": args.profile_workers,
+        "profile_batch": args.profile_batch,
+        "rate_limit": args.rate_limit,
+        "max_backoff": args.max_backoff,
+        "export_workers": args.export_workers,
+    }
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    header = f"{'scenario':<16} {'posts':>8} {'wall s':>8} {'posts/s':>10} "
+    header += f"{'fetch/post':>10} {'errors':>7} {'429s':>6} {'RSS MB':>7}"
+    print(header)
+    for scenario in args.scenarios:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_scenario, scenario, backend_config, options).result()
+        results.append(result)
+        print(
+            f"{result.scenario:<16} {result.posts:>8} {result.wall_time:>8.2f} "
+            f"{result.posts_per_sec:>10.1f} {result.profile_fetches_per_post:>10.3f} "
+            f"{result.errors:>7} {result.throttled:>6} {result.peak_rss_mb:>7.1f}"
+        )
+
+    if args.save:
+        Path(args.save).write_text(
+            json.dumps([dataclasses.asdict(r) for r in results], indent=2) + "\n"
+        )
+    if args.compare:
+        regressions = _regressions(results, Path(args.compare), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Measure the import cost of the command-line entry points.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``,
+which reports every module imported along the way::
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup instagram_hashtag_crawler.cli --top 15
+
+Scheduled runs start the CLI thousands of times, so modules that only
+some code paths need (instaloader, requests, multiprocessing) should not
+be imported by the entry points themselves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import re
+import subprocess
+import sys
+
+ENTRY_POINTS = ("instagram_hashtag_crawler.cli", "instagram_hashtag_crawler.export")
+
+# Modules the entry points must leave to the code paths that need them.
+HEAVY_MODULES = ("instaloader", "requests", "urllib3", "concurrent.futures.process")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+@dataclasses.dataclass
+class ImportProfile:
+    module: str
+    # Cumulative import time in microseconds of *module* and each module it
+    # imported, as reported by -X importtime
+    cumulative: dict[str, int]
+
+    @property
+    def total_ms(self) -> float:
+        return self.cumulative[self.module] / 1000
+
+    def imported(self, module: str) -> bool:
+        return module in self.cumulative
+
+    def top(self, count: int) -> list[tuple[str, int]]:
+        return sorted(self.cumulative.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def profile_import(module: str) -> ImportProfile:
+    """Import *module* in a fresh interpreter and return its import times."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # A module's imports are listed (indented) before the module itself, so
+    # collect each top-level import's group and keep *module*'s; the rest
+    # is interpreter startup (site, .pth files)
+    cumulative: dict[str, int] = {}
+    group: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        _, micros, indent, name = match.groups()
+        group[name] = int(micros)
+        if len(indent) <= 1:
+            if name == module:
+                cumulative = group
+            group = {}
+    return ImportProfile(module, cumulative)
+
+
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=list(ENTRY_POINTS))
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _parse_args(argv)
+    for module in args.modules:
+        profile = profile_import(module)
+        heavy = [name for name in HEAVY_MODULES if profile.imported(name)]
+        print(f"{module}: {profile.total_ms:.1f} ms, {len(profile.cumulative)} modules")
+        if heavy:
+            print(f"  imports heavy modules: {', '.join(heavy)}")
+        for name, micros in profile.top(args.top):
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
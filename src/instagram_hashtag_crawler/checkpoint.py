@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+
+import instaloader
+from instaloader import FrozenNodeIterator, NodeIterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class Checkpoint:
+    """Resume information for one hashtag crawl.
+
+    Holds the frozen state of the hashtag's post iterator together with
+    the shortcodes of every post already written to the output, so an
+    interrupted crawl can continue where it stopped without re-fetching
+    or duplicating posts.
+    """
+
+    path: Path
+    frozen: FrozenNodeIterator | None = None
+    shortcodes: set[str] = dataclasses.field(default_factory=set)
+    iterator: NodeIterator | None = dataclasses.field(default=None, repr=False)
+
+    @classmethod
+    def load(cls, path: Path) -> Checkpoint:
+        """Read a checkpoint from *path*, or return an empty one if absent."""
+        if not path.exists():
+            return cls(path)
+        data = json.loads(path.read_text())
+        frozen = data.get("iterator")
+        return cls(
+            path,
+            frozen=FrozenNodeIterator(**frozen) if frozen is not None else None,
+            shortcodes=set(data.get("shortcodes", [])),
+        )
+
+    def attach(self, iterator: NodeIterator) -> None:
+        """Track *iterator*, restoring the saved position into it if possible.
+
+        An expired or mismatching saved state is discarded with a warning;
+        the crawl then restarts from the newest post and relies on
+        :attr:`shortcodes` to skip posts that were already written.
+        """
+        self.iterator = iterator
+        if self.frozen is None or not isinstance(iterator, NodeIterator):
+            return
+        if self.frozen.best_before and self.frozen.best_before < datetime.now().timestamp():
+            logger.warning("Checkpoint %s has expired, restarting from the newest post", self.path)
+            return
+        try:
+            iterator.thaw(self.frozen)
+        except instaloader.InvalidArgumentException as exc:
+            logger.warning(
+                "Cannot resume from %s (%s), restarting from the newest post", self.path, exc
+            )
+            return
+        logger.info("Resuming from checkpoint %s (%d posts done)", self.path, len(self.shortcodes))
+
+    def mark(self) -> None:
+        """Record the attached iterator's current position for the next save.
+
+        The crawler marks the position before reading each batch of posts,
+        so a checkpoint never points past posts that were read but not yet
+        written.
+        """
+        if isinstance(self.iterator, NodeIterator):
+            self.frozen = self.iterator.freeze()
+
+    def save(self) -> None:
+        """Atomically write the last marked iterator position and the shortcodes."""
+        data = {
+            "iterator": self.frozen._asdict() if self.frozen is not None else None,
+            "shortcodes": sorted(self.shortcodes),
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data))
+        tmp_path.replace(self.path)
+        logger.debug("Saved checkpoint %s", self.path)
+
+    def discard(self) -> None:
+        """Remove the checkpoint file once the crawl has completed."""
+        self.path.unlink(missing_ok=True)
@@ -2,15 +2,17 @@ from __future__ import annotations
 
 import argparse
 import logging
-import sys
 from pathlib import Path
 
-import instaloader
-
-from instagram_hashtag_crawler.crawler import CrawlConfig, crawl, crawl_multi_and
-from instagram_hashtag_crawler.utils import file_to_list
-
-logger = logging.getLogger(__name__)
+from instagram_hashtag_crawler.compressed import COMPRESSIONS, check_available
+from instagram_hashtag_crawler.fields import (
+    MEDIA_TYPES,
+    OUTPUT_FORMATS,
+    POST_FIELDS,
+    PROFILE_FIELDS,
+)
+from instagram_hashtag_crawler.session_cache import SESSION_CACHE_TTL, default_cache_dir
+from instagram_hashtag_crawler.store import parse_store_url
 
 
 def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
@@ -51,6 +53,42 @@ def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
             "logged-in session is in a non-default profile (e.g. Chrome Profile 1)."
         ),
     )
+    auth.add_argument(
+        "--session-cache",
+        default=str(default_cache_dir()),
+        metavar="DIR",
+        help=(
+            "Directory recording when sessions were last verified and caching browser "
+            "sessions (default: ~/.cache/instagram-hashtag-crawler)"
+        ),
+    )
+    auth.add_argument(
+        "--session-cache-ttl",
+        type=float,
+        default=SESSION_CACHE_TTL,
+        metavar="SECONDS",
+        help=(
+            "Trust a session verified this recently without checking it with Instagram "
+            f"(0 = always check, default: {SESSION_CACHE_TTL})"
+        ),
+    )
+    auth.add_argument(
+        "--no-session-cache",
+        action="store_true",
+        help="Always verify sessions and extract browser cookies afresh",
+    )
+    auth.add_argument(
+        "--account",
+        action="append",
+        dest="accounts",
+        default=[],
+        metavar="SPEC",
+        help=(
+            "Add a logged-in account to the session pool (repeatable): USERNAME or "
+            "USERNAME:SESSION_FILE for a saved session, browser:NAME[:COOKIE_FILE] for a "
+            "browser session. Hashtags from -f are shared out across the pool"
+        ),
+    )
 
     # Targets
     parser.add_argument(
@@ -69,11 +107,88 @@ def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         "--targetfile",
         help="Path to file with hashtags (one per line) — crawls each independently",
     )
+    parser.add_argument(
+        "-q",
+        "--query",
+        default=None,
+        metavar="EXPR",
+        help=(
+            "Boolean hashtag query written to one merged output, e.g. '(pizza OR pasta) AND NOT ad'"
+        ),
+    )
+    parser.add_argument(
+        "--schedule",
+        default=None,
+        metavar="FILE",
+        help=(
+            "Run until interrupted, refreshing the hashtags in FILE (one per line, optionally "
+            "followed by an interval such as 30m or 6h) with incremental crawls"
+        ),
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        default="6h",
+        help="With --schedule, refresh interval for hashtags without one (default: 6h)",
+    )
+    parser.add_argument(
+        "--hourly-requests",
+        type=int,
+        default=None,
+        help="With --schedule, start no crawl once this many requests were made in the last hour",
+    )
+    parser.add_argument(
+        "--enrich",
+        action="append",
+        default=None,
+        metavar="FILE",
+        help=(
+            "Instead of crawling, fill in missing profile fields of an existing "
+            "output file (e.g. from --no-profiles). Can be specified multiple times."
+        ),
+    )
     parser.add_argument(
         "--output-dir",
         default="./hashtags",
         help="Directory for output data (default: ./hashtags)",
     )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="json",
+        help=(
+            "json writes one file at the end of each crawl; jsonl streams one post "
+            "per line as posts are collected (default: json)"
+        ),
+    )
+    parser.add_argument(
+        "--compress",
+        choices=COMPRESSIONS,
+        default=None,
+        help=(
+            "Compress output files with gzip (.json.gz) or zstd (.json.zst, needs zstandard "
+            "on Python < 3.14); compressed JSON is always compact"
+        ),
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON without indentation or separator spaces",
+    )
+    fields = parser.add_mutually_exclusive_group()
+    fields.add_argument(
+        "--fields",
+        default=None,
+        help=(
+            "Comma-separated output fields (shortcode, user_id and date are always "
+            f"written). Available: {', '.join(sorted(POST_FIELDS | PROFILE_FIELDS))}. "
+            "Owner profiles are only fetched when a profile field is selected."
+        ),
+    )
+    fields.add_argument(
+        "--no-profiles",
+        action="store_true",
+        help="Write post-level fields only and skip all profile fetches",
+    )
     parser.add_argument(
         "--max-posts",
         type=int,
@@ -92,6 +207,153 @@ def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=None,
         help="Unix timestamp — only collect posts newer than this",
     )
+    parser.add_argument(
+        "--media-types",
+        default="image",
+        metavar="TYPES",
+        help=(
+            "Comma-separated post types to collect: image, sidecar (carousel), video. "
+            "Sidecars and videos cost no extra requests (default: image)"
+        ),
+    )
+    parser.add_argument(
+        "--min-likes",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Skip posts with fewer likes, before fetching their owner's profile",
+    )
+    parser.add_argument(
+        "--min-comments",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Skip posts with fewer comments, before fetching their owner's profile",
+    )
+    parser.add_argument(
+        "--keyword",
+        action="append",
+        default=None,
+        dest="keywords",
+        help="Keep only posts whose caption contains this word. Repeat to allow several.",
+    )
+    parser.add_argument(
+        "--max-scanned",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Stop reading a hashtag's feed after N posts, kept or not (default: no limit)",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Stop reading a hashtag's feed after this long (default: no limit)",
+    )
+    parser.add_argument(
+        "--request-budget",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Stop reading a hashtag's feed after N requests (default: no limit)",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=50,
+        metavar="N",
+        help="Save resume information every N posts; 0 disables (default: 50)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue interrupted crawls from their partial output and checkpoint",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Stop at the newest post already in each hashtag's output file and "
+            "merge only newer posts into it"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of hashtags from -f to crawl concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=1.0,
+        help=(
+            "Global request budget in requests/second, shared by all workers. The rate "
+            "backs off on 429s and connection errors and recovers up to this value "
+            "(default: 1.0)"
+        ),
+    )
+    parser.add_argument(
+        "--profile-cache",
+        default=None,
+        metavar="PATH",
+        help="SQLite file for caching owner profiles across runs (default: in-memory)",
+    )
+    parser.add_argument(
+        "--profile-cache-ttl",
+        type=float,
+        default=86400,
+        metavar="SECONDS",
+        help="Refetch cached profiles older than this; 0 disables expiry (default: 86400)",
+    )
+    parser.add_argument(
+        "--profile-cache-size",
+        type=int,
+        default=100_000,
+        help="Maximum number of cached profiles (default: 100000)",
+    )
+    parser.add_argument(
+        "--profile-workers",
+        type=int,
+        default=4,
+        help="Threads fetching owner profiles per crawl (default: 4)",
+    )
+    parser.add_argument(
+        "--profile-batch",
+        type=int,
+        default=24,
+        metavar="N",
+        help="Posts gathered before their owners' profiles are fetched together (default: 24)",
+    )
+    parser.add_argument(
+        "--share-posts",
+        action="store_true",
+        help="Process each post once per run even if it appears under several hashtags",
+    )
+    parser.add_argument(
+        "--post-index",
+        default=None,
+        metavar="PATH",
+        help="SQLite file sharing processed posts across runs (implies --share-posts)",
+    )
+    parser.add_argument(
+        "--post-refs",
+        action="store_true",
+        help=(
+            "With --share-posts, write posts already saved under another hashtag as "
+            "references (shortcode, user_id, date, seen_in) instead of full copies"
+        ),
+    )
+    parser.add_argument(
+        "--store",
+        default=None,
+        metavar="sqlite:PATH",
+        help=(
+            "Upsert posts, profiles and their hashtags into a SQLite store instead of "
+            "writing JSON files (export it with instagram-hashtag-export --store)"
+        ),
+    )
     parser.add_argument(
         "--session-file",
         default=None,
@@ -101,9 +363,77 @@ def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
 
     args = parser.parse_args(argv)
 
-    # Validate: need either --browser or both -u and -p
-    if args.browser is None and (args.username is None or args.password is None):
-        parser.error("Provide --browser, or both -u/--username and -p/--password")
+    # Validate: need --browser, both -u and -p, or pool accounts
+    if args.username is not None and args.password is None:
+        parser.error("-u/--username requires -p/--password")
+    if args.browser is None and args.username is None and not args.accounts:
+        parser.error("Provide --browser, both -u/--username and -p/--password, or --account")
+    if args.fields is not None:
+        args.fields = frozenset(f.strip() for f in args.fields.split(",") if f.strip())
+        unknown = args.fields - POST_FIELDS - PROFILE_FIELDS
+        if unknown:
+            parser.error(f"Unknown --fields: {', '.join(sorted(unknown))}")
+    elif args.no_profiles:
+        args.fields = POST_FIELDS
+    media_types = {t.strip() for t in args.media_types.split(",") if t.strip()}
+    unknown = media_types - MEDIA_TYPES.keys()
+    if unknown or not media_types:
+        parser.error(f"Unknown --media-types: {', '.join(sorted(unknown)) or args.media_types!r}")
+    args.media_types = frozenset(MEDIA_TYPES[t] for t in media_types)
+    if args.query is not None:
+        from instagram_hashtag_crawler.query import QueryError, parse, plan_feeds
+
+        try:
+            args.query = parse(args.query)
+            plan_feeds(args.query, lambda _tag: 0)  # reject queries no feed can answer
+        except QueryError as exc:
+            parser.error(f"--query: {exc}")
+    for flag in ("max_scanned", "time_budget", "request_budget"):
+        value = getattr(args, flag)
+        if value is not None and value <= 0:
+            parser.error(f"--{flag.replace('_', '-')} must be positive")
+    if args.checkpoint_every < 0:
+        parser.error("--checkpoint-every must not be negative")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.rate_limit <= 0:
+        parser.error("--rate-limit must be positive")
+    if args.session_cache_ttl < 0:
+        parser.error("--session-cache-ttl must not be negative")
+    if args.profile_workers < 1:
+        parser.error("--profile-workers must be at least 1")
+    if args.profile_batch < 1:
+        parser.error("--profile-batch must be at least 1")
+    if args.profile_cache_size < 1:
+        parser.error("--profile-cache-size must be at least 1")
+    if args.post_index is not None:
+        args.share_posts = True
+    if args.post_refs and not args.share_posts:
+        parser.error("--post-refs requires --share-posts or --post-index")
+    if args.store is not None:
+        if args.enrich:
+            parser.error("--enrich works on output files and cannot be used with --store")
+        try:
+            args.store = parse_store_url(args.store)
+        except ValueError as exc:
+            parser.error(f"--store: {exc}")
+    if args.schedule is not None:
+        from instagram_hashtag_crawler.scheduler import load_schedule, parse_duration
+
+        try:
+            args.schedule = load_schedule(
+                Path(args.schedule), parse_duration(args.refresh_interval)
+            )
+        except (OSError, ValueError) as exc:
+            parser.error(f"--schedule: {exc}")
+        if not args.schedule:
+            parser.error("--schedule: no hashtags in schedule file")
+    if args.hourly_requests is not None and args.hourly_requests <= 0:
+        parser.error("--hourly-requests must be positive")
+    try:
+        check_available(args.compress)
+    except RuntimeError as exc:
+        parser.error(str(exc))
 
     return args
 
@@ -117,156 +447,11 @@ def _setup_logging(verbose: bool) -> None:
     )
 
 
-def _login(
-    loader: instaloader.Instaloader,
-    username: str,
-    password: str,
-    session_file: str | None,
-) -> None:
-    """Attempt session restore, fall back to username/password login."""
-    if session_file:
-        try:
-            loader.load_session_from_file(username, filename=session_file)
-            if loader.test_login() == username:
-                logger.info("Restored session from %s", session_file)
-                return
-        except FileNotFoundError:
-            logger.debug("No session file at %s, will login fresh", session_file)
-
-    # Try default session location
-    try:
-        loader.load_session_from_file(username)
-        if loader.test_login() == username:
-            logger.info("Restored session for %s", username)
-            return
-    except FileNotFoundError:
-        logger.debug("No default session file found")
-
-    logger.info("Logging in as %s", username)
-    loader.login(username, password)
-
-    # Save session for next time
-    if session_file:
-        loader.save_session_to_file(filename=session_file)
-    else:
-        loader.save_session_to_file()
-    logger.info("Session saved")
-
-
-def _login_browser(
-    loader: instaloader.Instaloader,
-    browser: str,
-    cookie_file: str | None = None,
-) -> None:
-    from instagram_hashtag_crawler.browser_session import load_browser_session
-
-    user_id = load_browser_session(loader, browser, cookie_file=cookie_file)
-    logged_in = loader.test_login()
-    if logged_in:
-        logger.info("Browser session verified — logged in as %s", logged_in)
-    else:
-        logger.warning(
-            "Browser session loaded (user_id=%s) but test_login did not confirm. "
-            "The session may still work for hashtag queries.",
-            user_id,
-        )
-
-
 def main(argv: list[str] | None = None) -> None:
     args = _parse_args(argv)
     _setup_logging(args.verbose)
 
-    # Resolve targets
-    multi_and = False
-    if args.targets:
-        hashtags = args.targets
-        if len(hashtags) > 1:
-            multi_and = True
-    elif args.targetfile:
-        hashtags = file_to_list(args.targetfile)
-    else:
-        logger.error("Provide a hashtag with -t or a file of hashtags with -f")
-        sys.exit(1)
+    # Deferred so --help and argument errors skip instaloader and requests
+    from instagram_hashtag_crawler.runner import run
 
-    if multi_and:
-        logger.info("AND search for: %s", " + ".join(f"#{h}" for h in hashtags))
-    else:
-        logger.info("Targets: %s", hashtags)
-
-    # Initialize instaloader and login
-    loader = instaloader.Instaloader(
-        download_pictures=False,
-        download_videos=False,
-        download_video_thumbnails=False,
-        download_geotags=False,
-        download_comments=False,
-        save_metadata=False,
-        compress_json=False,
-    )
-
-    try:
-        if args.browser:
-            _login_browser(loader, args.browser, cookie_file=args.cookie_file)
-        else:
-            _login(loader, args.username, args.password, args.session_file)
-    except instaloader.InvalidArgumentException as exc:
-        logger.error("Login failed: %s", exc)
-        sys.exit(1)
-    except instaloader.TwoFactorAuthRequiredException:
-        logger.error(
-            "Two-factor auth required. Use --browser or --session-file "
-            "with a pre-authenticated session."
-        )
-        sys.exit(1)
-    except RuntimeError as exc:
-        logger.error("%s", exc)
-        sys.exit(1)
-
-    # Build config
-    from datetime import datetime, timezone
-
-    min_ts = None
-    if args.since is not None:
-        min_ts = datetime.fromtimestamp(args.since, tz=timezone.utc)
-
-    config = CrawlConfig(
-        output_dir=Path(args.output_dir),
-        min_posts=args.min_posts,
-        max_posts=args.max_posts,
-        min_timestamp=min_ts,
-    )
-
-    config.output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Multi-tag AND search
-    if multi_and:
-        try:
-            success = crawl_multi_and(loader, hashtags, config)
-            if success:
-                logger.info(
-                    "Finished AND search for %s",
-                    " + ".join(f"#{h}" for h in hashtags),
-                )
-            else:
-                logger.warning("Insufficient posts matching all tags")
-        except KeyboardInterrupt:
-            logger.info("Interrupted by user")
-            sys.exit(130)
-        except instaloader.QueryReturnedNotFoundException as exc:
-            logger.warning("Hashtag not found: %s", exc)
-        return
-
-    # Single-tag or file-based independent crawls
-    for hashtag in hashtags:
-        logger.info("Crawling #%s", hashtag)
-        try:
-            success = crawl(loader, hashtag, config)
-            if success:
-                logger.info("Finished #%s", hashtag)
-            else:
-                logger.warning("Insufficient posts for #%s", hashtag)
-        except KeyboardInterrupt:
-            logger.info("Interrupted by user")
-            sys.exit(130)
-        except instaloader.QueryReturnedNotFoundException:
-            logger.warning("Hashtag #%s not found, skipping", hashtag)
+    run(args)
@@ -0,0 +1,86 @@
+"""Transparent gzip and zstd compression of crawl output files.
+
+A compressed output file carries the codec's suffix after its format
+suffix (``food.json.gz``, ``food.jsonl.zst``); :func:`open_text` picks
+the codec from the file name, so readers need not know how a file was
+written.  zstd needs Python 3.14's ``compression.zstd`` or the
+``zstandard`` package.
+"""
+
+from __future__ import annotations
+
+import gzip
+from pathlib import Path
+from typing import Any, TextIO
+
+# Compression codecs by their command-line name, and the suffixes they add.
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def with_compression(path: Path, compression: str | None) -> Path:
+    """Return *path* with the suffix of *compression* (None for uncompressed) appended."""
+    if compression is None:
+        return path
+    return path.with_name(path.name + COMPRESSIONS[compression])
+
+
+def compression_of(path: Path) -> str | None:
+    """Return the compression *path* is named for, or None."""
+    for compression, suffix in COMPRESSIONS.items():
+        if path.suffix == suffix:
+            return compression
+    return None
+
+
+def strip_compression(path: Path) -> Path:
+    """Return *path* without its compression suffix, if any."""
+    return path.with_suffix("") if compression_of(path) else path
+
+
+def format_suffix(path: Path) -> str:
+    """Return the suffix of *path* before any compression suffix (``.jsonl`` for ``a.jsonl.gz``)."""
+    return strip_compression(path).suffix
+
+
+def open_text(path: Path, mode: str = "r") -> TextIO:
+    """Open *path* for text reading, writing (``w``) or appending (``a``).
+
+    Compressed files are decompressed on the fly; appending to one adds a
+    new gzip member or zstd frame, which readers see as one stream.
+    """
+    if path.suffix == COMPRESSIONS["gzip"]:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.suffix == COMPRESSIONS["zstd"]:
+        return _zstd_open(path, mode)
+    return path.open(mode)
+
+
+def check_available(compression: str | None) -> None:
+    """Raise ``RuntimeError`` if the library for *compression* is missing."""
+    if compression == "zstd":
+        _zstd_module()
+
+
+def _zstd_open(path: Path, mode: str) -> TextIO:
+    zstd = _zstd_module()
+    if zstd.__name__ == "zstandard":
+        return zstd.open(path, mode, encoding="utf-8")
+    return zstd.open(path, mode + "t", encoding="utf-8")
+
+
+def _zstd_module() -> Any:
+    try:
+        from compression import zstd
+    except ImportError:
+        pass
+    else:
+        return zstd
+    try:
+        import zstandard
+    except ImportError as exc:
+        msg = (
+            "zstandard is required for zstd-compressed output. "
+            "Install it with: pip install instagram-hashtag-crawler[zstd]"
+        )
+        raise RuntimeError(msg) from exc
+    return zstandard
@@ -1,18 +1,83 @@
 from __future__ import annotations
 
+import contextlib
 import dataclasses
 import json
 import logging
+import math
+import queue
+import shutil
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from time import sleep
-from typing import Any
+from typing import Any, TextIO, TypeVar
 
 import instaloader
 from instaloader import Hashtag, Post, Profile
 
+from instagram_hashtag_crawler.checkpoint import Checkpoint
+from instagram_hashtag_crawler.compressed import (
+    compression_of,
+    format_suffix,
+    open_text,
+    strip_compression,
+    with_compression,
+)
+from instagram_hashtag_crawler.fields import PROFILE_FIELDS, REQUIRED_FIELDS
+from instagram_hashtag_crawler.filters import PostFilter, node_value
+from instagram_hashtag_crawler.post_index import PostIndex
+from instagram_hashtag_crawler.profile_cache import ProfileCache, ProfileRecord
+from instagram_hashtag_crawler.query import Query, file_stem, plan_feeds, positive_tags
+from instagram_hashtag_crawler.ratelimit import (
+    RateLimiter,
+    call_with_retry,
+    rate_controller_factory,
+)
+from instagram_hashtag_crawler.store import STORE_BATCH_SIZE, PostStore
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def make_loader(limiter: RateLimiter | None = None) -> instaloader.Instaloader:
+    """Create a loader that downloads nothing, its requests paced by *limiter*."""
+    return instaloader.Instaloader(
+        download_pictures=False,
+        download_videos=False,
+        download_video_thumbnails=False,
+        download_geotags=False,
+        download_comments=False,
+        save_metadata=False,
+        compress_json=False,
+        rate_controller=rate_controller_factory(limiter) if limiter is not None else None,
+    )
+
+
+def clone_loader(
+    loader: instaloader.Instaloader,
+    limiter: RateLimiter | None,
+) -> instaloader.Instaloader:
+    """Create a new loader sharing *loader*'s login cookies.
+
+    The clone gets its own ``requests`` session and instaloader context,
+    so it can be used from another thread, while *limiter* keeps the
+    combined request rate in check.
+    """
+    clone = make_loader(limiter)
+    clone.context.load_session(loader.context.username, loader.context.save_session())
+    return clone
+
+
+class CrawlStoppedError(Exception):
+    """Raised by a crawl whose ``CrawlConfig.stop`` event was set."""
+
 
 @dataclasses.dataclass
 class CrawlConfig:
@@ -22,97 +87,609 @@ class CrawlConfig:
     min_posts: int = 1
     max_posts: int = 100
     min_timestamp: datetime | None = None
+    # Shared by every crawl using this config; None gives each crawl a
+    # fresh in-memory cache.
+    profile_cache: ProfileCache | None = None
+    output_format: str = "json"
+    # Posts between checkpoint saves; 0 disables checkpoint files.
+    checkpoint_interval: int = 50
+    resume: bool = False
+    # Stop at the newest post already in the output file and merge only
+    # newer posts into it.
+    incremental: bool = False
+    # Adapts to connection errors and paces retries; should be the limiter
+    # the loaders were built with.
+    rate_limiter: RateLimiter | None = None
+    # Candidate posts are gathered in batches whose distinct owners'
+    # profiles are fetched by this many threads, each with its own loader
+    # made by worker_loader: an instaloader context wraps one
+    # requests.Session, which threads must not share.
+    profile_workers: int = 4
+    worker_loader: Callable[
+        [instaloader.Instaloader, RateLimiter | None], instaloader.Instaloader
+    ] = clone_loader
+    profile_batch_size: int = 24
+    # Output fields to write (None for all).  Profiles are only fetched
+    # when a field from PROFILE_FIELDS is selected.
+    fields: frozenset[str] | None = None
+    # Run-wide (optionally persisted) index of processed posts: a post seen
+    # under an earlier hashtag is reused instead of re-processed, written
+    # either as a full copy or, with post_refs, as a reference record.
+    post_index: PostIndex | None = None
+    post_refs: bool = False
+    # Post typenames to collect (values of MEDIA_TYPES).  Sidecars and
+    # videos are written with the media fields their feed node carries.
+    media_types: frozenset[str] = frozenset({"GraphImage"})
+    # Cheap predicates on feed node data, run before any profile fetch;
+    # rejections are counted per filter name in CrawlStats.skipped.
+    filters: tuple[PostFilter, ...] = ()
+    # Per-hashtag cost caps: feed posts read, seconds spent and requests
+    # issued (the latter needs rate_limiter).  None means unlimited.
+    max_scanned: int | None = None
+    time_budget: float | None = None
+    request_budget: int | None = None
+    # Output compression (a key of COMPRESSIONS, or None) and whether JSON
+    # is written without indentation and spaces; compressed output always is.
+    compression: str | None = None
+    compact: bool = False
+    # Write posts to this store instead of JSON output files.
+    store: PostStore | None = None
+    # Once set, running crawls raise CrawlStoppedError before reading their
+    # next post, saving their checkpoints on the way out.
+    stop: threading.Event | None = None
+
+    @property
+    def needs_profiles(self) -> bool:
+        return self.fields is None or bool(self.fields & PROFILE_FIELDS)
+
+    @property
+    def compact_json(self) -> bool:
+        return self.compact or self.compression is not None
+
+    def output_file(self, name: str) -> Path:
+        """Return the output path for *name*, e.g. ``<output_dir>/food.jsonl.gz``."""
+        return with_compression(self.output_dir / f"{name}.{self.output_format}", self.compression)
+
+
+@dataclasses.dataclass
+class HighWaterMark:
+    """The newest part of a hashtag's existing output.
+
+    *newest_date* is the timestamp of the newest post already saved and
+    *shortcodes* the posts saved with exactly that timestamp, which lets
+    an incremental crawl tell same-second newcomers from known posts.
+    """
+
+    newest_date: int
+    shortcodes: set[str]
+    post_count: int
+
+
+@dataclasses.dataclass
+class CrawlStats:
+    """What one hashtag crawl read, kept and skipped, and why it stopped.
+
+    *matched* counts feed posts that passed the feed filters; of those,
+    *kept* were written and the rest are counted in *skipped* (by reason)
+    together with posts rejected by the filters.  *requests* is only
+    counted when the crawl has a rate limiter.
+    """
+
+    hashtag: str
+    scanned: int = 0
+    matched: int = 0
+    kept: int = 0
+    skipped: Counter[str] = dataclasses.field(default_factory=Counter)
+    requests: int = 0
+    elapsed: float = 0.0
+    # max_posts, feed_end, min_timestamp, high_water_mark, max_scanned,
+    # time_budget or request_budget
+    stop_reason: str = ""
+
+    @property
+    def exhausted(self) -> bool:
+        return self.stop_reason == "feed_end"
+
+    def log(self) -> None:
+        skipped = ", ".join(f"{reason} {n}" for reason, n in sorted(self.skipped.items()))
+        logger.info(
+            "Collected %d posts for #%s: scanned %d, skipped %d (%s), %d requests in %.1fs, "
+            "stopped at %s",
+            self.kept,
+            self.hashtag,
+            self.scanned,
+            self.skipped.total(),
+            skipped or "none",
+            self.requests,
+            self.elapsed,
+            self.stop_reason or "interrupt",
+        )
+
+
+# json.dumps separators for compact output.
+COMPACT_SEPARATORS = (",", ":")
+
+# Number of posts between flushes of a streaming (JSON Lines) output file.
+FLUSH_INTERVAL = 50
+
+# AND search planning: scan broader feeds this many times deeper than their
+# estimated match rate suggests, and skip feeds expected to yield fewer new
+# matches than AND_MIN_YIELD.
+AND_SCAN_SLACK = 2.0
+AND_MIN_YIELD = 1.0
 
 
 def _collect_posts(
     loader: instaloader.Instaloader,
     hashtag: str,
     config: CrawlConfig,
-    profile_cache: dict[int, Profile] | None = None,
+    profile_cache: ProfileCache | None = None,
     *,
     required_tags: frozenset[str] | None = None,
+    output_name: str | None = None,
+    hashtag_obj: Hashtag | None = None,
+    max_scanned: int | None = None,
+    stats: CrawlStats | None = None,
+    query: Query | None = None,
+    seen: set[str] | None = None,
 ) -> list[dict[str, Any]]:
     """Collect posts from a single hashtag, returning them as a list.
 
+    See :func:`_iter_posts` for the filtering rules.
+    """
+    return list(
+        _iter_posts(
+            loader,
+            hashtag,
+            config,
+            profile_cache,
+            required_tags=required_tags,
+            output_name=output_name,
+            hashtag_obj=hashtag_obj,
+            max_scanned=max_scanned,
+            stats=stats,
+            query=query,
+            seen=seen,
+        )
+    )
+
+
+def _iter_posts(
+    loader: instaloader.Instaloader,
+    hashtag: str,
+    config: CrawlConfig,
+    profile_cache: ProfileCache | None = None,
+    *,
+    required_tags: frozenset[str] | None = None,
+    checkpoint: Checkpoint | None = None,
+    high_water_mark: HighWaterMark | None = None,
+    output_name: str | None = None,
+    hashtag_obj: Hashtag | None = None,
+    max_scanned: int | None = None,
+    stats: CrawlStats | None = None,
+    query: Query | None = None,
+    seen: set[str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield processed posts from a single hashtag as they are fetched.
+
     If *required_tags* is given, only posts whose caption contains **all**
     of the specified hashtags (case-insensitive, without ``#``) are kept.
     This enables efficient AND filtering: query one hashtag via the API
-    and check the caption for the remaining tags.
+    and check the caption for the remaining tags.  A boolean *query* is
+    evaluated on the caption hashtags the same way, before any profile is
+    fetched.
 
-    Posts are deduplicated by shortcode within a single call.
+    Posts are deduplicated by shortcode within a single call, or across
+    calls sharing the same *seen* set of shortcodes.  With a
+    *checkpoint*, iteration resumes from its saved position and posts it
+    lists as already written are neither yielded nor counted again.
+    With a *high_water_mark*, iteration stops at the first post older
+    than the newest post already saved.
+
+    Posts found in ``config.post_index`` are reused rather than processed,
+    as references when they were indexed under an output other than
+    *output_name* (default: *hashtag*).  Indexing the new posts is left
+    to the caller, once they are safely written (see :func:`_index_posts`).
+
+    An already looked-up *hashtag_obj* saves the lookup request.  Reading
+    the feed stops once ``config.max_scanned`` (or the stricter
+    *max_scanned*) posts were read, or ``config.time_budget`` or
+    ``config.request_budget`` is spent.  *stats*, if given, is filled in
+    with what was scanned, kept and skipped.
     """
+    if output_name is None:
+        output_name = hashtag
     if profile_cache is None:
-        profile_cache = {}
+        profile_cache = config.profile_cache
+    if profile_cache is None:
+        profile_cache = ProfileCache()
 
-    hashtag_obj = Hashtag.from_name(loader.context, hashtag)
-    logger.info("Hashtag #%s has %d total posts", hashtag, hashtag_obj.mediacount)
+    if stats is None:
+        stats = CrawlStats(hashtag)
+    cap = config.max_scanned
+    if max_scanned is not None:
+        cap = max_scanned if cap is None else min(cap, max_scanned)
 
-    posts: list[dict[str, Any]] = []
-    seen_shortcodes: set[str] = set()
-    skipped = 0
+    limiter = config.rate_limiter
+    started = time.monotonic()
+    requests_before = limiter.requests_for(loader.context) if limiter is not None else 0
+    worker_loaders: _WorkerLoaders | None = None
 
-    for post in hashtag_obj.get_posts_resumable():
-        if len(posts) >= config.max_posts:
-            break
+    def update_usage() -> None:
+        stats.elapsed = time.monotonic() - started
+        if limiter is not None:
+            stats.requests = limiter.requests_for(loader.context) - requests_before
+            if worker_loaders is not None:
+                stats.requests += worker_loaders.requests(limiter, exclude=loader)
 
-        # Skip if older than min_timestamp
-        if config.min_timestamp and post.date_utc < config.min_timestamp:
-            if config.min_timestamp is not None:
-                # When filtering by time, stop iterating once we hit old posts
-                # (posts are returned newest-first)
-                break
-            continue
+    def out_of_budget() -> str | None:
+        """Name the budget that is used up, if any."""
+        update_usage()
+        if cap is not None and stats.scanned >= cap:
+            return "max_scanned"
+        if config.time_budget is not None and stats.elapsed >= config.time_budget:
+            return "time_budget"
+        if config.request_budget is not None and stats.requests >= config.request_budget:
+            return "request_budget"
+        return None
 
-        # Only collect single-image posts
-        if post.typename != "GraphImage":
-            skipped += 1
-            continue
+    if hashtag_obj is None:
+        hashtag_obj = _lookup_hashtag(loader, hashtag, limiter)
+
+    # The iterator requests the feed's first page as it is created
+    posts = call_with_retry(
+        hashtag_obj.get_posts_resumable, limiter, what=f"fetching first page of #{hashtag}"
+    )
+    seen_shortcodes = seen if seen is not None else set()
+    collected = 0
+    if checkpoint is not None:
+        checkpoint.attach(posts)
+        seen_shortcodes |= checkpoint.shortcodes
+        collected = len(checkpoint.shortcodes)
+
+    def candidates() -> Iterator[Post]:
+        """Stage 1: page through the feed and apply the cheap filters."""
+        while True:
+            if config.stop is not None and config.stop.is_set():
+                msg = f"Crawl of #{hashtag} stopped"
+                raise CrawlStoppedError(msg)
+            budget = out_of_budget()
+            if budget is not None:
+                stats.stop_reason = budget
+                logger.info("Stopping #%s: %s reached", hashtag, budget)
+                return
+            post = call_with_retry(lambda: next(posts, None), limiter, what=f"paging #{hashtag}")
+            if post is None:
+                stats.stop_reason = "feed_end"
+                return
+            stats.scanned += 1
+
+            # Skip if older than min_timestamp
+            if config.min_timestamp and post.date_utc < config.min_timestamp:
+                if config.min_timestamp is not None:
+                    # When filtering by time, stop iterating once we hit old posts
+                    # (posts are returned newest-first)
+                    stats.stop_reason = "min_timestamp"
+                    return
+                continue
 
-        # Deduplicate by shortcode
-        if post.shortcode in seen_shortcodes:
-            continue
-        seen_shortcodes.add(post.shortcode)
+            # Incremental crawl: stop once we reach previously saved posts
+            if high_water_mark is not None:
+                if post.shortcode in high_water_mark.shortcodes:
+                    stats.skipped["already_saved"] += 1
+                    continue
+                if post.date_utc.timestamp() < high_water_mark.newest_date:
+                    logger.info("Reached previously crawled posts for #%s", hashtag)
+                    stats.stop_reason = "high_water_mark"
+                    return
 
-        # AND filter: check caption contains all required tags
-        if required_tags is not None:
+            # Only collect the configured post types (single images by default)
+            if post.typename not in config.media_types:
+                stats.skipped["media_type"] += 1
+                continue
+
+            # Deduplicate by shortcode
+            if post.shortcode in seen_shortcodes:
+                stats.skipped["duplicate"] += 1
+                continue
+            seen_shortcodes.add(post.shortcode)
+
+            # AND filter: check caption contains all required tags
             caption_tags = frozenset(post.caption_hashtags)  # lowercase, no #
-            if not required_tags <= caption_tags:
-                skipped += 1
+            if required_tags is not None and not required_tags <= caption_tags:
+                stats.skipped["missing_tags"] += 1
+                continue
+            if query is not None and not query.matches(caption_tags):
+                stats.skipped["query_mismatch"] += 1
                 continue
 
-        processed = _process_post(loader, post, profile_cache)
-        if processed is not None:
-            posts.append(processed)
-            if len(posts) % 10 == 0:
-                logger.info("Collected %d posts so far...", len(posts))
+            # Configured pre-filters, first rejection wins
+            rejected_by = next((f.name for f in config.filters if not f(post)), None)
+            if rejected_by is not None:
+                stats.skipped[rejected_by] += 1
+                continue
 
-    logger.info(
-        "Collected %d posts for #%s (skipped %d)",
-        len(posts),
-        hashtag,
-        skipped,
-    )
-    return posts
+            stats.matched += 1
+            yield post
+
+    feed = candidates()
+    executor = None
+    if config.needs_profiles and config.profile_workers > 1:
+        executor = ThreadPoolExecutor(config.profile_workers, thread_name_prefix="profiles")
+        worker_loaders = _WorkerLoaders(loader, config)
+    try:
+        while collected < config.max_posts:
+            # Remember where this batch starts so a resumed crawl re-reads
+            # any of its posts that were not written yet.
+            if checkpoint is not None:
+                checkpoint.mark()
+            batch_size = min(config.profile_batch_size, config.max_posts - collected)
+            batch = list(islice(feed, batch_size))
+            if not batch:
+                break
+
+            # Posts already processed under another hashtag need no profile
+            known: dict[str, tuple[str, dict[str, Any]]] = {}
+            if config.post_index is not None:
+                for post in batch:
+                    entry = config.post_index.get(post.shortcode)
+                    if entry is not None:
+                        known[post.shortcode] = entry
+            fresh = [post for post in batch if post.shortcode not in known]
+
+            # Stage 2: resolve the batch's distinct owners, then join them back
+            profiles = None
+            if config.needs_profiles:
+                profiles = _resolve_profiles(
+                    loader, fresh, profile_cache, limiter, executor, worker_loaders
+                )
+            for post in batch:
+                if post.shortcode in known:
+                    seen_in, record = known[post.shortcode]
+                    processed = _reused_post(record, seen_in, output_name, refs=config.post_refs)
+                else:
+                    profile = None
+                    if profiles is not None:
+                        profile = profiles[post.owner_id]
+                        if profile is None:
+                            stats.skipped["no_profile"] += 1
+                            continue
+                    processed = _process_post(post, profile, config.fields)
+                if processed is None:
+                    stats.skipped["unavailable"] += 1
+                    continue
+                collected += 1
+                stats.kept += 1
+                yield processed
+                if collected % 10 == 0:
+                    logger.info("Collected %d posts so far...", collected)
+        else:
+            stats.stop_reason = "max_posts"
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        update_usage()
+
+    stats.log()
 
 
 def crawl(
     loader: instaloader.Instaloader,
     hashtag: str,
     config: CrawlConfig,
+    stats: CrawlStats | None = None,
 ) -> bool:
-    """Crawl a single hashtag and save results as JSON.
+    """Crawl a single hashtag and save results in ``config.output_format``.
+
+    Posts are appended to ``<output>.part`` (one JSON object per line) as
+    they are processed, so memory stays bounded and an interrupted crawl
+    keeps everything written so far.  On completion the partial file
+    becomes ``<hashtag>.jsonl``, or is converted to ``<hashtag>.json``.
+
+    Every ``config.checkpoint_interval`` posts the iterator position is
+    saved to ``<hashtag>.checkpoint.json``.  With ``config.resume``, a
+    crawl that finds a partial file continues from its checkpoint.
+
+    With ``config.incremental`` and an existing output file, the crawl
+    stops at the newest post already saved and merges the new posts into
+    the file; ``<hashtag>.index.json`` records the high-water mark so the
+    next run need not re-read the output.
+
+    With ``config.store``, posts are upserted into the store instead; see
+    :func:`_crawl_to_store`.
+
+    *stats*, if given, is filled in with the crawl's scan accounting.
 
     Returns True if enough posts were collected, False otherwise.
     """
-    posts = _collect_posts(loader, hashtag, config)
+    if config.store is not None:
+        return _crawl_to_store(loader, hashtag, config, stats)
+
+    output_file = config.output_file(hashtag)
+    part_file = _part_path(output_file)
+    checkpoint_path = config.output_dir / f"{hashtag}.checkpoint.json"
+    index_path = config.output_dir / f"{hashtag}.index.json"
+    resume = config.resume and part_file.exists()
+
+    if resume:
+        checkpoint = Checkpoint.load(checkpoint_path)
+        checkpoint.shortcodes |= _recover_part_file(part_file)
+    else:
+        checkpoint = Checkpoint(checkpoint_path)
+
+    mark = None
+    if config.incremental and output_file.exists():
+        mark = _load_high_water_mark(index_path, output_file)
+        logger.info(
+            "Incremental crawl of #%s: %d posts saved, newest at %d",
+            hashtag,
+            mark.post_count,
+            mark.newest_date,
+        )
+
+    written = _stream_posts(
+        _iter_posts(
+            loader, hashtag, config, checkpoint=checkpoint, high_water_mark=mark, stats=stats
+        ),
+        part_file,
+        config,
+        checkpoint,
+        append=resume,
+    )
+    checkpoint.discard()
 
-    if len(posts) < config.min_posts:
+    existing = mark.post_count if mark is not None else 0
+    if written + existing < config.min_posts:
+        part_file.unlink()
         return False
 
-    _save_posts(posts, config.output_dir / f"{hashtag}.json")
+    if config.incremental:
+        new_mark = _high_water_mark(_iter_lines(part_file), previous=mark)
+    _finalize_output(
+        part_file, output_file, written, merge=mark is not None, compact=config.compact_json
+    )
+    if config.incremental:
+        _save_high_water_mark(index_path, new_mark)
+    if config.post_index is not None:
+        # Only this crawl's posts, not those merged in from earlier runs
+        _index_posts(
+            config,
+            hashtag,
+            (p for p in _iter_saved_posts(output_file) if p["shortcode"] in checkpoint.shortcodes),
+        )
     return True
 
 
+def _crawl_to_store(
+    loader: instaloader.Instaloader,
+    hashtag: str,
+    config: CrawlConfig,
+    stats: CrawlStats | None,
+) -> bool:
+    """Crawl a single hashtag into ``config.store``.
+
+    Posts are written in transactions of :data:`STORE_BATCH_SIZE`, and
+    the checkpoint is saved after the posts it covers are committed.
+    With ``config.incremental`` the high-water mark comes from the
+    posts already stored under the hashtag.  Posts stay in the store
+    even if fewer than ``config.min_posts`` were found.
+    """
+    store = config.store
+    checkpoint_path = config.output_dir / f"{hashtag}.checkpoint.json"
+    resume = config.resume and checkpoint_path.exists()
+    checkpoint = Checkpoint.load(checkpoint_path) if resume else Checkpoint(checkpoint_path)
+
+    mark = None
+    stored = store.high_water_mark(hashtag) if config.incremental else None
+    if stored is not None:
+        mark = HighWaterMark(*stored)
+        logger.info(
+            "Incremental crawl of #%s: %d posts stored, newest at %d",
+            hashtag,
+            mark.post_count,
+            mark.newest_date,
+        )
+
+    posts = _iter_posts(
+        loader, hashtag, config, checkpoint=checkpoint, high_water_mark=mark, stats=stats
+    )
+    interval = config.checkpoint_interval
+    written = len(checkpoint.shortcodes) if resume else 0
+    batch: list[dict[str, Any]] = []
+
+    def commit() -> None:
+        store.add_posts([hashtag], batch)
+        _index_posts(config, hashtag, batch)
+        checkpoint.shortcodes.update(post["shortcode"] for post in batch)
+        batch.clear()
+
+    try:
+        for post in posts:
+            batch.append(post)
+            written += 1
+            if len(batch) >= STORE_BATCH_SIZE or (interval and written % interval == 0):
+                commit()
+                if interval:
+                    checkpoint.save()
+        commit()
+    except BaseException:
+        commit()
+        if interval and written:
+            checkpoint.save()
+        raise
+    checkpoint.discard()
+
+    existing = mark.post_count if mark is not None else 0
+    logger.info("Stored %d posts for #%s in %s", written, hashtag, store.path)
+    return written + existing >= config.min_posts
+
+
+def crawl_concurrent(
+    loaders: list[instaloader.Instaloader],
+    hashtags: list[str],
+    config: CrawlConfig,
+) -> dict[str, bool]:
+    """Crawl independent hashtags concurrently, one worker per loader.
+
+    Each worker borrows a loader from the pool for the duration of one
+    hashtag, so no ``Instaloader`` session is used by two threads at
+    once.  Results land as one ``<hashtag>.json`` per tag exactly as with
+    :func:`crawl`.  A failure on one hashtag is logged and recorded as
+    False without affecting the other workers.  On ``KeyboardInterrupt``
+    the running crawls are stopped through ``config.stop`` and waited
+    for, so they save their checkpoints before the caller closes shared
+    caches and stores.
+
+    Returns a mapping of hashtag to the :func:`crawl` result.
+    """
+    if not loaders:
+        msg = "crawl_concurrent requires at least one loader"
+        raise ValueError(msg)
+
+    pool: queue.Queue[instaloader.Instaloader] = queue.Queue()
+    for loader in loaders:
+        pool.put(loader)
+    stop = config.stop or threading.Event()
+    config = dataclasses.replace(config, stop=stop)
+
+    def worker(hashtag: str) -> bool:
+        loader = pool.get()
+        try:
+            logger.info("Crawling #%s", hashtag)
+            success = crawl(loader, hashtag, config)
+        except instaloader.QueryReturnedNotFoundException:
+            logger.warning("Hashtag #%s not found, skipping", hashtag)
+            return False
+        except CrawlStoppedError:
+            logger.info("Stopped #%s", hashtag)
+            return False
+        except Exception:
+            logger.exception("Crawl of #%s failed", hashtag)
+            return False
+        finally:
+            pool.put(loader)
+
+        if success:
+            logger.info("Finished #%s", hashtag)
+        else:
+            logger.warning("Insufficient posts for #%s", hashtag)
+        return success
+
+    results: dict[str, bool] = {}
+    executor = ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="crawl")
+    try:
+        futures = {hashtag: executor.submit(worker, hashtag) for hashtag in hashtags}
+        for hashtag, future in futures.items():
+            results[hashtag] = future.result()
+    except KeyboardInterrupt:
+        logger.info("Interrupted; waiting for running crawls to save their checkpoints")
+        stop.set()
+        executor.shutdown(cancel_futures=True)
+        raise
+    executor.shutdown()
+    return results
+
+
 def crawl_multi_and(
     loader: instaloader.Instaloader,
     hashtags: list[str],
@@ -120,17 +697,24 @@ def crawl_multi_and(
 ) -> bool:
     """Crawl posts that contain ALL given hashtags (AND logic).
 
-    Strategy: query each hashtag via the API and keep only posts whose
-    caption contains **every** tag in *hashtags*.  We start with all
-    hashtags because Instagram's API returns different post sets for
-    each hashtag — a post tagged with both ``#food`` and ``#pizza``
-    may appear in the ``#pizza`` feed but be buried far down in the
-    ``#food`` feed.  By querying each hashtag and filtering the caption,
-    we maximise the chance of finding matching posts.
+    Strategy: hashtag feeds are queried via the API and only posts whose
+    caption contains **every** tag in *hashtags* are kept.  Every matching
+    post appears in every tag's feed, so the feeds differ only in how
+    many non-matching posts must be paged through to reach the matches.
 
     Duplicate posts (same shortcode) across queries are merged so the
     final output contains unique posts only.
 
+    The feeds are planned by selectivity: every tag's post count is looked
+    up first and the rarest tag is scanned first, since every matching
+    post carries it.  Its observed match rate estimates how many matching
+    posts exist; each broader feed is then scanned only as deep as that
+    estimate says is needed for the missing posts, and skipped once it is
+    expected to yield fewer than :data:`AND_MIN_YIELD` new ones.  Only a
+    scan that reached the end of its feed or *config.max_posts* gives an
+    estimate; one cut short by ``max_scanned`` or a budget may have missed
+    the matches, so the next feed is then scanned without a planned depth.
+
     Returns True if at least *config.min_posts* were found.
     """
     if len(hashtags) < 2:
@@ -138,23 +722,66 @@ def crawl_multi_and(
         raise ValueError(msg)
 
     required_tags = frozenset(tag.lower() for tag in hashtags)
-    profile_cache: dict[int, Profile] = {}
+    output_name = "_AND_".join(sorted(hashtags))
+    profile_cache = config.profile_cache
+    if profile_cache is None:
+        profile_cache = ProfileCache()
     merged: dict[str, dict[str, Any]] = {}
+    # Shared across feeds so a post found twice is processed once
+    seen: set[str] = set()
+
+    # Rarest first; sorted() is stable, so ties keep the order given
+    plan = sorted(
+        ((tag, _lookup_hashtag(loader, tag, config.rate_limiter)) for tag in hashtags),
+        key=lambda item: item[1].mediacount,
+    )
+    logger.info("AND search plan: %s", ", ".join(f"#{tag} ({obj.mediacount})" for tag, obj in plan))
+
+    estimated_matches: float | None = None
+    for hashtag, hashtag_obj in plan:
+        needed = config.max_posts - len(merged)
+        if needed <= 0:
+            break
+        max_scanned = None
+        if estimated_matches is not None:
+            max_scanned = _and_scan_depth(
+                estimated_matches, len(merged), needed, hashtag_obj.mediacount
+            )
+            if max_scanned is None:
+                logger.info(
+                    "AND search: skipping #%s and broader tags, too few new matches expected",
+                    hashtag,
+                )
+                break
 
-    for hashtag in hashtags:
         logger.info("AND search: querying #%s (require all of %s)", hashtag, sorted(required_tags))
+        stats = CrawlStats(hashtag)
         posts = _collect_posts(
             loader,
             hashtag,
             config,
             profile_cache,
             required_tags=required_tags,
+            output_name=output_name,
+            hashtag_obj=hashtag_obj,
+            max_scanned=max_scanned,
+            stats=stats,
+            seen=seen,
         )
         for post in posts:
             merged.setdefault(post["shortcode"], post)
+        logger.info(
+            "AND search: #%s matched %d of %d scanned posts", hashtag, stats.matched, stats.scanned
+        )
 
-        if len(merged) >= config.max_posts:
-            break
+        if estimated_matches is None:
+            if stats.stop_reason not in ("feed_end", "max_posts"):
+                # A truncated scan says little about the match rate
+                continue
+            # The first complete feed's match rate, scaled to its size
+            rate = stats.matched / stats.scanned if stats.scanned else 0.0
+            estimated_matches = rate * hashtag_obj.mediacount
+        estimated_matches = max(estimated_matches, len(merged))
 
     all_posts = list(merged.values())[: config.max_posts]
 
@@ -167,84 +794,635 @@ def crawl_multi_and(
     if len(all_posts) < config.min_posts:
         return False
 
-    filename = "_AND_".join(sorted(hashtags)) + ".json"
-    _save_posts(all_posts, config.output_dir / filename)
+    if config.store is not None:
+        # Every post carries all of the hashtags
+        config.store.add_posts(hashtags, all_posts)
+    else:
+        _save_posts(all_posts, config.output_file(output_name), compact=config.compact_json)
+    _index_posts(config, output_name, all_posts)
+    return True
+
+
+def crawl_query(
+    loader: instaloader.Instaloader,
+    query: Query,
+    config: CrawlConfig,
+) -> bool:
+    """Crawl posts matching a boolean hashtag *query* into one output file.
+
+    Every hashtag outside a ``NOT`` is looked up, and
+    :func:`~instagram_hashtag_crawler.query.plan_feeds` picks the cheapest
+    set of feeds that together hold every possible match.  Those feeds
+    are read rarest first with the query evaluated on each post's caption
+    hashtags, so non-matching posts never cost a profile lookup, and a
+    post found in several feeds is processed once.
+
+    The output is named after the query (see
+    :func:`~instagram_hashtag_crawler.query.file_stem`), e.g.
+    ``pizza_OR_pasta_AND_NOT_ad-c16f00b4.json``.  Returns True if at least
+    *config.min_posts* were found.
+    """
+    hashtag_objs = {
+        tag: _lookup_hashtag(loader, tag, config.rate_limiter)
+        for tag in sorted(positive_tags(query))
+    }
+    feeds = plan_feeds(query, lambda tag: hashtag_objs[tag].mediacount)
+    logger.info("Query %s: reading %s", query, ", ".join(f"#{tag}" for tag in feeds))
+
+    name = file_stem(query)
+    if config.profile_cache is None:
+        config = dataclasses.replace(config, profile_cache=ProfileCache())
+    merged: dict[str, dict[str, Any]] = {}
+    found_in: dict[str, str] = {}
+    seen: set[str] = set()
+    for hashtag in feeds:
+        remaining = config.max_posts - len(merged)
+        if remaining <= 0:
+            break
+        posts = _collect_posts(
+            loader,
+            hashtag,
+            dataclasses.replace(config, max_posts=remaining),
+            query=query,
+            output_name=name,
+            hashtag_obj=hashtag_objs[hashtag],
+            seen=seen,
+        )
+        for post in posts:
+            if post["shortcode"] not in merged:
+                merged[post["shortcode"]] = post
+                found_in[post["shortcode"]] = hashtag
+
+    logger.info("Query %s: found %d unique posts", query, len(merged))
+    if len(merged) < config.min_posts:
+        return False
+
+    if config.store is not None:
+        for hashtag in feeds:
+            config.store.add_posts(
+                [hashtag], [post for code, post in merged.items() if found_in[code] == hashtag]
+            )
+    else:
+        _save_posts(list(merged.values()), config.output_file(name), compact=config.compact_json)
+    _index_posts(config, name, merged.values())
     return True
 
 
-def _save_posts(posts: list[dict[str, Any]], output_file: Path) -> None:
-    """Write posts to a JSON file."""
-    output = {"posts": posts}
-    output_file.write_text(json.dumps(output, indent=2, default=str))
+def _index_posts(config: CrawlConfig, output_name: str, posts: Iterable[dict[str, Any]]) -> None:
+    """Add written *posts* to ``config.post_index`` under *output_name*.
+
+    Call only once *posts* are committed to their output, so no later
+    reference points at a file that was never written.  Reference
+    records are skipped; their posts are indexed already.
+    """
+    if config.post_index is not None:
+        config.post_index.put_many(output_name, (p for p in posts if "seen_in" not in p))
+
+
+def _lookup_hashtag(
+    loader: instaloader.Instaloader,
+    hashtag: str,
+    limiter: RateLimiter | None,
+) -> Hashtag:
+    hashtag_obj = call_with_retry(
+        lambda: Hashtag.from_name(loader.context, hashtag),
+        limiter,
+        what=f"looking up #{hashtag}",
+    )
+    logger.info("Hashtag #%s has %d total posts", hashtag, hashtag_obj.mediacount)
+    return hashtag_obj
+
+
+def _and_scan_depth(
+    estimated_matches: float,
+    found: int,
+    needed: int,
+    mediacount: int,
+) -> int | None:
+    """Return how many posts of a broader feed to scan in an AND search.
+
+    The feed's match rate is estimated as *estimated_matches* over its
+    *mediacount*, discounted by the share of matches already *found*.
+    Returns None when the feed is expected to yield fewer than
+    :data:`AND_MIN_YIELD` new matches.
+    """
+    unseen = estimated_matches - found
+    if unseen < AND_MIN_YIELD or mediacount <= 0:
+        return None
+    new_match_rate = unseen / mediacount
+    depth = math.ceil(min(needed, unseen) / new_match_rate * AND_SCAN_SLACK)
+    return min(depth, mediacount)
+
+
+def _save_posts(posts: list[dict[str, Any]], output_file: Path, *, compact: bool = False) -> None:
+    """Write posts to a JSON file, or a JSON Lines file for ``.jsonl``.
+
+    The file is compressed according to its name (see
+    :mod:`~instagram_hashtag_crawler.compressed`); *compact* drops the
+    indentation and separator spaces.  An existing file is only replaced
+    once the new one is complete.
+    """
+    with _replacing(output_file) as tmp_file, open_text(tmp_file, "w") as f:
+        if format_suffix(output_file) == ".jsonl":
+            for post in posts:
+                _write_line(f, post, compact=compact)
+        elif compact:
+            json.dump({"posts": posts}, f, separators=COMPACT_SEPARATORS, default=str)
+        else:
+            json.dump({"posts": posts}, f, indent=2, default=str)
     logger.info("Saved %d posts to %s", len(posts), output_file)
 
 
-def _process_post(
+@contextlib.contextmanager
+def _replacing(output_file: Path) -> Iterator[Path]:
+    """Yield a temporary path that replaces *output_file* once the block completes.
+
+    An interrupted write leaves *output_file* as it was.
+    """
+    # e.g. food.jsonl.tmp.gz: compressed like the output, but not read as one
+    plain = strip_compression(output_file)
+    tmp_file = with_compression(plain.with_name(plain.name + ".tmp"), compression_of(output_file))
+    try:
+        yield tmp_file
+        tmp_file.replace(output_file)
+    finally:
+        tmp_file.unlink(missing_ok=True)
+
+
+def _write_line(f: TextIO, post: dict[str, Any], *, compact: bool = False) -> None:
+    f.write(json.dumps(post, separators=COMPACT_SEPARATORS if compact else None, default=str))
+    f.write("\n")
+
+
+def _part_path(output_file: Path) -> Path:
+    return output_file.with_name(output_file.name + ".part")
+
+
+def _recover_part_file(part_file: Path) -> set[str]:
+    """Return the shortcodes in a partial output file.
+
+    A trailing line cut short by a crash is truncated so that new posts
+    can be appended cleanly.
+    """
+    data = part_file.read_bytes()
+    complete = data[: data.rfind(b"\n") + 1]
+    if len(complete) != len(data):
+        logger.warning("Discarding incomplete last line of %s", part_file)
+        with part_file.open("r+b") as f:
+            f.truncate(len(complete))
+    return {json.loads(line)["shortcode"] for line in complete.splitlines() if line.strip()}
+
+
+def _stream_posts(
+    posts: Iterable[dict[str, Any]],
+    part_file: Path,
+    config: CrawlConfig,
+    checkpoint: Checkpoint,
+    *,
+    append: bool = False,
+) -> int:
+    """Append *posts* to a partial JSON Lines file as they arrive.
+
+    Posts are flushed every :data:`FLUSH_INTERVAL` posts; *checkpoint* is
+    saved every ``config.checkpoint_interval`` posts and when the crawl
+    is interrupted.
+
+    Returns the number of posts in *part_file*.
+    """
+    interval = config.checkpoint_interval
+    written = len(checkpoint.shortcodes) if append else 0
+    try:
+        with part_file.open("a" if append else "w") as f:
+            for post in posts:
+                _write_line(f, post, compact=config.compact_json)
+                checkpoint.shortcodes.add(post["shortcode"])
+                written += 1
+                if written % FLUSH_INTERVAL == 0:
+                    f.flush()
+                if interval and written % interval == 0:
+                    f.flush()
+                    checkpoint.save()
+    except BaseException:
+        if interval and written:
+            checkpoint.save()
+        elif not written:
+            part_file.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def _finalize_output(
+    part_file: Path,
+    output_file: Path,
+    count: int,
+    *,
+    merge: bool = False,
+    compact: bool = False,
+) -> None:
+    """Turn a partial file holding *count* posts into *output_file*.
+
+    With *merge*, the new posts are merged into the existing
+    *output_file*: appended to a ``.jsonl`` file, or placed ahead of the
+    (older) existing posts in a ``.json`` file.  The merged file is
+    written next to *output_file* and replaces it when complete, so an
+    interrupted merge leaves the earlier posts intact.  The partial file
+    itself is never compressed, so it can be appended to and recovered.
+    """
+    if format_suffix(output_file) == ".jsonl":
+        if merge or compression_of(output_file):
+            with _replacing(output_file) as tmp_file:
+                if merge:
+                    # Compressed streams concatenate, so the bytes copy as they are
+                    shutil.copyfile(output_file, tmp_file)
+                with open_text(tmp_file, "a" if merge else "w") as out, part_file.open() as f:
+                    out.writelines(f)
+            part_file.unlink()
+        else:
+            part_file.replace(output_file)
+        logger.info("Saved %d posts to %s", count, output_file)
+    else:
+        existing = _read_posts(output_file) if merge else []
+        _save_posts(list(_iter_lines(part_file)) + existing, output_file, compact=compact)
+        part_file.unlink()
+
+
+def _iter_lines(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the posts of a (possibly compressed) JSON Lines file one at a time."""
+    with open_text(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _read_posts(output_file: Path) -> list[dict[str, Any]]:
+    """Read the posts saved in a ``.json`` or ``.jsonl`` output file."""
+    if format_suffix(output_file) == ".jsonl":
+        return list(_iter_lines(output_file))
+    with open_text(output_file) as f:
+        return json.load(f).get("posts", [])
+
+
+def _high_water_mark(
+    posts: Iterable[dict[str, Any]],
+    previous: HighWaterMark | None = None,
+) -> HighWaterMark:
+    newest_date = previous.newest_date if previous is not None else 0
+    shortcodes = set(previous.shortcodes) if previous is not None else set()
+    count = previous.post_count if previous is not None else 0
+    for post in posts:
+        count += 1
+        if post["date"] > newest_date:
+            newest_date = post["date"]
+            shortcodes = set()
+        if post["date"] == newest_date:
+            shortcodes.add(post["shortcode"])
+    return HighWaterMark(newest_date, shortcodes, count)
+
+
+def _load_high_water_mark(index_path: Path, output_file: Path) -> HighWaterMark:
+    """Read the high-water mark from *index_path*, or rebuild it from *output_file*.
+
+    The index is only trusted if it is newer than the output file.
+    """
+    if index_path.exists() and index_path.stat().st_mtime >= output_file.stat().st_mtime:
+        data = json.loads(index_path.read_text())
+        return HighWaterMark(data["newest_date"], set(data["shortcodes"]), data["post_count"])
+    return _high_water_mark(_read_posts(output_file))
+
+
+def _save_high_water_mark(index_path: Path, mark: HighWaterMark) -> None:
+    data = {
+        "newest_date": mark.newest_date,
+        "shortcodes": sorted(mark.shortcodes),
+        "post_count": mark.post_count,
+    }
+    index_path.write_text(json.dumps(data))
+
+
+class _WorkerLoaders:
+    """Hands each profile worker thread its own loader, made on first use."""
+
+    def __init__(self, loader: instaloader.Instaloader, config: CrawlConfig) -> None:
+        self._loader = loader
+        self._make = config.worker_loader
+        self._limiter = config.rate_limiter
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._loaders: list[instaloader.Instaloader] = []
+
+    def get(self) -> instaloader.Instaloader:
+        loader = getattr(self._local, "loader", None)
+        if loader is None:
+            loader = self._local.loader = self._make(self._loader, self._limiter)
+            with self._lock:
+                self._loaders.append(loader)
+        return loader
+
+    def requests(self, limiter: RateLimiter, *, exclude: instaloader.Instaloader) -> int:
+        """Return the requests the worker loaders made (all made after their creation)."""
+        with self._lock:
+            contexts = {id(w.context): w.context for w in self._loaders if w is not exclude}
+        return sum(limiter.requests_for(context) for context in contexts.values())
+
+
+def _resolve_profiles(
     loader: instaloader.Instaloader,
+    posts: list[Post],
+    cache: ProfileCache,
+    limiter: RateLimiter | None,
+    executor: ThreadPoolExecutor | None = None,
+    worker_loaders: _WorkerLoaders | None = None,
+) -> dict[int, ProfileRecord | None]:
+    """Fetch the profiles of the distinct owners of *posts*.
+
+    Owners are looked up once per batch, through the cache, and missing
+    profiles are fetched concurrently on *executor* when one is given,
+    each thread through its loader from *worker_loaders*.  Owners whose
+    profile cannot be fetched map to None.
+    """
+    owners: dict[int, Post] = {}
+    for post in posts:
+        owners.setdefault(post.owner_id, post)
+
+    def resolve(post: Post) -> ProfileRecord | None:
+        fetch_loader = worker_loaders.get() if worker_loaders is not None else loader
+        try:
+            return _get_profile(fetch_loader, post, cache, limiter)
+        except instaloader.QueryReturnedNotFoundException:
+            logger.warning("Owner of post %s no longer exists", post.shortcode)
+        except instaloader.ConnectionException as exc:
+            logger.warning("Connection error fetching owner of post %s: %s", post.shortcode, exc)
+        return None
+
+    return dict(zip(owners, _map(executor, resolve, owners.values()), strict=True))
+
+
+def _map(
+    executor: ThreadPoolExecutor | None,
+    fn: Callable[[T], R],
+    items: Iterable[T],
+) -> Iterator[R]:
+    return map(fn, items) if executor is None else executor.map(fn, items)
+
+
+def _process_post(
     post: Post,
-    profile_cache: dict[int, Profile],
+    profile: ProfileRecord | None,
+    fields: frozenset[str] | None = None,
 ) -> dict[str, Any] | None:
-    """Extract metadata from a single post.
+    """Extract metadata from a single post and its owner's profile.
+
+    Without a *profile* only post-level fields are written.  *fields*
+    restricts the output to the given fields plus :data:`REQUIRED_FIELDS`.
 
     Returns a dict of post data, or None on failure.
     """
     try:
-        profile = _get_profile(loader, post, profile_cache)
-
-        return {
+        record: dict[str, Any] = {
             "shortcode": post.shortcode,
             "user_id": post.owner_id,
-            "username": profile.username,
-            "full_name": profile.full_name,
-            "profile_pic_url": profile.profile_pic_url,
-            "media_count": profile.mediacount,
-            "follower_count": profile.followers,
-            "following_count": profile.followees,
-            "date": int(post.date_utc.timestamp()),
-            "pic_url": post.url,
-            "like_count": post.likes,
-            "comment_count": post.comments,
-            "caption": post.caption or "",
-            "tags": [f"#{tag}" for tag in post.caption_hashtags],
         }
+        if profile is not None:
+            record.update(_profile_fields(profile))
+        record.update(
+            {
+                "date": int(post.date_utc.timestamp()),
+                "pic_url": post.url,
+                "like_count": post.likes,
+                "comment_count": post.comments,
+                "caption": post.caption or "",
+                "tags": [f"#{tag}" for tag in post.caption_hashtags],
+            }
+        )
+        if post.typename != "GraphImage":
+            record.update(_media_fields(post))
     except instaloader.QueryReturnedNotFoundException:
-        logger.warning("Post %s or its owner no longer exists", post.shortcode)
+        logger.warning("Post %s no longer exists", post.shortcode)
         return None
     except instaloader.ConnectionException as exc:
         logger.warning("Connection error processing post %s: %s", post.shortcode, exc)
         return None
 
+    if fields is not None:
+        record = {k: v for k, v in record.items() if k in fields or k in REQUIRED_FIELDS}
+    return record
+
+
+def _media_fields(post: Post) -> dict[str, Any]:
+    """Return the media fields of a sidecar or video post from its feed node.
+
+    Only data already in the node is used; ``Post.video_url`` and
+    sidecar nodes without media URLs would each cost another request.
+    Hashtag feed nodes usually carry just the cover image, in which case
+    *media_urls* holds that alone.
+    """
+    urls = []
+    for edge in node_value(post, ("edge_sidecar_to_children", "edges")) or []:
+        child = edge.get("node", {})
+        url = child.get("video_url") if child.get("is_video") else None
+        urls.append(url or child.get("display_url"))
+    if not urls:
+        urls.append(node_value(post, ("video_url",)) or node_value(post, ("display_url",)))
+    return {
+        "typename": post.typename,
+        "media_urls": [url for url in urls if url],
+        "video_view_count": node_value(post, ("video_view_count",)),
+    }
+
+
+def _reused_post(
+    record: dict[str, Any],
+    seen_in: str,
+    output_name: str,
+    *,
+    refs: bool,
+) -> dict[str, Any]:
+    """Return the output for a post already written under *seen_in*.
+
+    With *refs*, posts first written to another output are replaced by a
+    reference record naming that output; otherwise the full record is
+    copied.
+    """
+    if not refs or seen_in == output_name:
+        return record
+    return {
+        "shortcode": record["shortcode"],
+        "user_id": record["user_id"],
+        "date": record["date"],
+        "seen_in": seen_in,
+    }
+
+
+def _profile_fields(profile: ProfileRecord) -> dict[str, Any]:
+    return {
+        "username": profile.username,
+        "full_name": profile.full_name,
+        "profile_pic_url": profile.profile_pic_url,
+        "media_count": profile.mediacount,
+        "follower_count": profile.followers,
+        "following_count": profile.followees,
+    }
+
+
+def enrich(
+    loader: instaloader.Instaloader,
+    output_file: Path,
+    config: CrawlConfig,
+) -> int:
+    """Fill in the profile fields of posts saved without them.
+
+    Reads a ``.json`` or ``.jsonl`` crawl output (for example from a
+    ``fields``-restricted crawl), fetches the profiles of the distinct
+    owners of posts lacking profile fields in bulk, through the profile
+    cache and on ``config.profile_workers`` threads, and rewrites the file
+    in place.  Posts whose owner cannot be fetched, and reference records
+    (``seen_in``) pointing at a post saved in another output, are left
+    unchanged.
+
+    Returns the number of posts enriched.
+    """
+    owner_ids = {post["user_id"] for post in _iter_saved_posts(output_file) if _lacks_profile(post)}
+    logger.info("Enriching %s: fetching %d owner profiles", output_file, len(owner_ids))
+
+    cache = config.profile_cache
+    if cache is None:
+        cache = ProfileCache()
+    limiter = config.rate_limiter
+
+    worker_loaders = None
+
+    def resolve(owner_id: int) -> ProfileRecord | None:
+        fetch_loader = worker_loaders.get() if worker_loaders is not None else loader
+        try:
+            return _get_profile_by_id(fetch_loader, owner_id, cache, limiter)
+        except (instaloader.ProfileNotExistsException, instaloader.QueryReturnedNotFoundException):
+            logger.warning("Owner %s no longer exists", owner_id)
+        except instaloader.ConnectionException as exc:
+            logger.warning("Connection error fetching owner %s: %s", owner_id, exc)
+        return None
+
+    executor = None
+    if config.profile_workers > 1:
+        executor = ThreadPoolExecutor(config.profile_workers, thread_name_prefix="profiles")
+        worker_loaders = _WorkerLoaders(loader, config)
+    try:
+        profiles = dict(zip(owner_ids, _map(executor, resolve, owner_ids), strict=True))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    enriched = 0
+
+    def fill(posts: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        nonlocal enriched
+        for post in posts:
+            profile = profiles.get(post["user_id"]) if _lacks_profile(post) else None
+            if profile is not None:
+                post = {
+                    "shortcode": post["shortcode"],
+                    "user_id": post["user_id"],
+                    **_profile_fields(profile),
+                    **post,
+                }
+                enriched += 1
+            yield post
+
+    _rewrite_saved_posts(output_file, fill, compact=config.compact_json)
+    logger.info("Enriched %d posts in %s", enriched, output_file)
+    return enriched
+
+
+def _lacks_profile(post: dict[str, Any]) -> bool:
+    # Reference records (seen_in) never carry profile fields
+    return "seen_in" not in post and not PROFILE_FIELDS.issubset(post)
+
+
+def _iter_saved_posts(output_file: Path) -> Iterator[dict[str, Any]]:
+    if format_suffix(output_file) == ".jsonl":
+        return _iter_lines(output_file)
+    return iter(_read_posts(output_file))
+
+
+def _rewrite_saved_posts(
+    output_file: Path,
+    transform: Callable[[Iterable[dict[str, Any]]], Iterable[dict[str, Any]]],
+    *,
+    compact: bool = False,
+) -> None:
+    """Rewrite a saved output file through *transform*, streaming ``.jsonl`` files.
+
+    Both formats are written to a temporary file that replaces
+    *output_file* when complete, so an interrupted rewrite (e.g. of
+    ``--enrich``) leaves the original intact.
+    """
+    if format_suffix(output_file) == ".jsonl":
+        with _replacing(output_file) as tmp_file, open_text(tmp_file, "w") as f:
+            for post in transform(_iter_lines(output_file)):
+                _write_line(f, post, compact=compact)
+    else:
+        # _save_posts writes through _replacing too
+        _save_posts(list(transform(_read_posts(output_file))), output_file, compact=compact)
+
 
 def _get_profile(
     loader: instaloader.Instaloader,
     post: Post,
-    cache: dict[int, Profile],
-) -> Profile:
+    cache: ProfileCache,
+    limiter: RateLimiter | None = None,
+) -> ProfileRecord:
     """Fetch owner profile with caching and retry."""
-    owner_id = post.owner_id
+    return _cached_profile(
+        post.owner_id,
+        lambda: _owner_profile(loader.context, post),
+        cache,
+        limiter,
+        # Not owner_username: without the owner in the feed node, reading it
+        # fetches the post's metadata, even on a cache hit
+        what=f"fetching profile of owner {post.owner_id}",
+    )
 
-    if owner_id in cache:
-        return cache[owner_id]
 
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            sleep(0.05)  # Small delay to avoid rate limiting
-            profile = post.owner_profile
-            cache[owner_id] = profile
-            return profile
-        except instaloader.ConnectionException as exc:
-            if attempt < max_retries - 1:
-                wait = 5 * (attempt + 1)
-                logger.warning(
-                    "Rate limited fetching profile for %s, waiting %ds: %s",
-                    post.owner_username,
-                    wait,
-                    exc,
-                )
-                sleep(wait)
-            else:
-                raise
-    # Unreachable, but satisfies type checker
-    msg = "Failed to fetch profile after retries"
-    raise RuntimeError(msg)
+def _owner_profile(context: instaloader.InstaloaderContext, post: Post) -> Profile:
+    """Return ``post.owner_profile``, but requested through *context*.
+
+    ``Post.owner_profile`` always uses the context the feed was read
+    with.  As there, the profile is built from the feed node's owner when
+    it names the owner, and is otherwise looked up by owner ID.
+    """
+    owner = node_value(post, ("owner",))
+    if isinstance(owner, dict) and "username" in owner:
+        return Profile(context, owner)
+    return Profile.from_id(context, post.owner_id)
+
+
+def _get_profile_by_id(
+    loader: instaloader.Instaloader,
+    owner_id: int,
+    cache: ProfileCache,
+    limiter: RateLimiter | None = None,
+) -> ProfileRecord:
+    """Fetch a profile by owner ID with caching and retry."""
+    return _cached_profile(
+        owner_id,
+        lambda: Profile.from_id(loader.context, owner_id),
+        cache,
+        limiter,
+        what=f"fetching profile {owner_id}",
+    )
+
+
+def _cached_profile(
+    owner_id: int,
+    fetch: Callable[[], Profile],
+    cache: ProfileCache,
+    limiter: RateLimiter | None,
+    *,
+    what: str,
+) -> ProfileRecord:
+    cached = cache.get(owner_id)
+    if cached is not None:
+        return cached
+
+    profile = call_with_retry(lambda: ProfileRecord.from_profile(fetch()), limiter, what=what)
+    cache.put(owner_id, profile)
+    return profile
@@ -1,11 +1,31 @@
 from __future__ import annotations
 
+import abc
 import argparse
+import array
+import collections
 import csv
+import dataclasses
+import hashlib
+import itertools
 import json
 import logging
+import pickle
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, TextIO
+
+from instagram_hashtag_crawler.compressed import format_suffix, open_text
+from instagram_hashtag_crawler.store import PostStore, parse_store_url
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -13,98 +33,945 @@ logger = logging.getLogger(__name__)
 # to avoid collecting posts that are still accumulating engagement.
 RECENCY_THRESHOLD = 60 * 60 * 24  # 24 hours
 
+INPUT_SUFFIXES = (".json", ".jsonl")
+
+# Crawler bookkeeping files that share the .json suffix but hold no posts.
+SKIPPED_SUFFIXES = ("_rawfeed.json", ".checkpoint.json", ".index.json")
+
+# Output formats and their file suffixes; parquet and arrow need pyarrow.
+EXPORT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+# Rows buffered per Parquet row group / Arrow record batch.
+ROW_GROUP_SIZE = 64 * 1024
+
+# Characters read per chunk when streaming a crawler .json file.
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Exported posts a pool worker returns with its result; the rest of a larger
+# file is spilled to a temporary file in chunks of this size.
+RESULT_CHUNK_SIZE = 1000
+
+# Where a deduplicating export keeps its seen shortcodes, and what the
+# recency cutoff is measured from.
+DEDUPE_MODES = ("memory", "disk")
+RECENCY_MODES = ("file", "global")
+
+# Manifest of an incremental export, kept next to its partitions.
+MANIFEST_NAME = "manifest.json"
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+
+# Exported columns, in order.  Integer columns may be empty (None) for
+# posts crawled without profiles.
+COLUMNS = (
+    "shortcode",
+    "pic_url",
+    "like_count",
+    "username",
+    "user_id",
+    "full_name",
+    "profile_pic_url",
+    "media_count",
+    "follower_count",
+    "comment_count",
+    "date",
+    "caption",
+    "tags",
+)
+
+
+@dataclasses.dataclass
+class ExportStats:
+    """How many files and rows one export read and wrote, and how fast.
+
+    *unchanged* counts input files an incremental export left alone and
+    *duplicates* the posts a deduplicating export dropped.
+    """
+
+    files: int = 0
+    rows: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def files_per_sec(self) -> float:
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def log(self) -> None:
+        logger.info(
+            "Exported %d rows from %d files (%d unchanged, %d duplicates dropped) in %.1fs "
+            "(%.1f files/s, %.1f rows/s)",
+            self.rows,
+            self.files,
+            self.unchanged,
+            self.duplicates,
+            self.elapsed,
+            self.files_per_sec,
+            self.rows_per_sec,
+        )
+
 
 def read_profiles(
     json_dir: Path,
     csv_dir: Path,
-    output_file_name: str = "posts.csv",
-) -> None:
-    """Read all JSON files in a directory and write post data to CSV."""
+    output_file_name: str | None = None,
+    output_format: str = "csv",
+    workers: int = 1,
+    ordered: bool = True,
+    incremental: bool = False,
+    dedupe: str | None = None,
+    recency: str = "file",
+    reference_time: int | None = None,
+) -> ExportStats:
+    """Read all JSON files in a directory and write post data to one table.
+
+    Both the crawler's ``.json`` files and streaming ``.jsonl`` files
+    (one post per line) are read, plain or gzip/zstd compressed
+    (``.json.gz``, ``.jsonl.zst``).  *output_format* is ``csv`` or, with
+    pyarrow installed, ``parquet`` or ``arrow`` (Arrow IPC file) with
+    typed columns; the file is written to *csv_dir* as
+    *output_file_name* (default ``posts.<format>``).
+
+    With *workers* > 1 files are parsed in a process pool and their rows
+    merged into the output in file order, or as files finish when
+    *ordered* is false.  Files are parsed incrementally, so memory does
+    not grow with the size of the largest file.
+
+    With *incremental*, each input file is exported to its own partition
+    in a directory named after *output_file_name* (``posts/`` by
+    default), and a manifest there records each file's size, mtime and
+    content hash.  Later runs re-export only new or changed files and
+    drop the partitions of deleted ones; see :func:`_export_incremental`.
+
+    *dedupe* (``memory`` or ``disk``) writes each shortcode only once
+    across all input files, keeping its first occurrence in file order;
+    see :class:`_SeenShortcodes`.  Posts newer than
+    :data:`RECENCY_THRESHOLD` are skipped relative to each file's newest
+    post (*recency* ``file``), to the newest post of all files
+    (``global``, which reads every file twice) or to *reference_time*, a
+    Unix timestamp, if given.  Incremental exports support neither
+    option, as they would make each partition depend on the other files.
+    """
     json_dir = Path(json_dir)
     csv_dir = Path(csv_dir)
 
+    if output_format not in EXPORT_FORMATS:
+        msg = f"Unknown export format {output_format!r}"
+        raise ValueError(msg)
+    if dedupe not in (None, *DEDUPE_MODES):
+        msg = f"Unknown dedupe mode {dedupe!r}"
+        raise ValueError(msg)
+    if recency not in RECENCY_MODES:
+        msg = f"Unknown recency mode {recency!r}"
+        raise ValueError(msg)
+    if incremental and (dedupe or recency != "file" or reference_time is not None):
+        msg = "Incremental exports cannot dedupe or use a global recency cutoff"
+        raise ValueError(msg)
     if not json_dir.exists():
         msg = f"JSON directory does not exist: {json_dir}"
         raise FileNotFoundError(msg)
 
     csv_dir.mkdir(parents=True, exist_ok=True)
+    if output_file_name is None:
+        output_file_name = "posts" + EXPORT_FORMATS[output_format]
     output_path = csv_dir / output_file_name
 
     logger.info("Reading profiles from %s", json_dir)
 
-    with output_path.open("w", newline="") as f:
-        writer = csv.writer(f, lineterminator="\n")
+    input_files = [
+        path
+        for path in sorted(json_dir.iterdir())
+        if format_suffix(path) in INPUT_SUFFIXES and not path.name.endswith(SKIPPED_SUFFIXES)
+    ]
+    if incremental:
+        partition_dir = csv_dir / Path(output_file_name).stem
+        return _export_incremental(input_files, partition_dir, output_format, workers)
 
-        for json_file in sorted(json_dir.iterdir()):
-            if json_file.suffix != ".json" or json_file.name.endswith("_rawfeed.json"):
-                continue
+    stats = ExportStats()
+    start = time.perf_counter()
+    cutoff = None
+    if reference_time is not None:
+        cutoff = reference_time - RECENCY_THRESHOLD
+    elif recency == "global":
+        newest = _newest_date(input_files, workers)
+        if newest is not None:
+            cutoff = newest - RECENCY_THRESHOLD
+
+    if workers > 1:
+        batches = _parallel_posts(input_files, workers, ordered, cutoff)
+    else:
+        batches = (_exported_posts(path, cutoff) for path in input_files)
 
-            logger.debug("Processing %s", json_file.name)
-            data = json.loads(json_file.read_text())
-            _write_posts(data, writer)
+    seen = _SeenShortcodes(on_disk=dedupe == "disk") if dedupe else None
+    try:
+        with _open_sink(output_path, output_format) as sink:
+            for posts in batches:
+                for post in posts:
+                    shortcode = post.get("shortcode")
+                    if seen is not None and shortcode is not None and not seen.add(shortcode):
+                        stats.duplicates += 1
+                        continue
+                    sink.write(post)
+                    stats.rows += 1
+                stats.files += 1
+    finally:
+        if seen is not None:
+            seen.close()
+    stats.elapsed = time.perf_counter() - start
 
-    logger.info("Wrote CSV to %s", output_path)
+    logger.info("Wrote %s to %s", output_format, output_path)
+    stats.log()
+    return stats
 
 
-def _write_posts(data: dict[str, Any], writer: csv.writer) -> None:
-    """Write posts from a single JSON file to the CSV writer.
+def read_store(
+    store_path: Path,
+    csv_dir: Path,
+    output_file_name: str | None = None,
+    output_format: str = "csv",
+    tags: list[str] | None = None,
+    since: int | None = None,
+    until: int | None = None,
+) -> ExportStats:
+    """Export posts from a crawler :class:`~instagram_hashtag_crawler.store.PostStore`.
 
-    Posts within the recency threshold of the most recent post are skipped.
+    Posts are selected with the store's indexes: those crawled under any
+    of *tags* and dated between *since* and *until* (Unix timestamps,
+    inclusive), newest first.  Without *until*, posts within
+    :data:`RECENCY_THRESHOLD` of the newest stored post are skipped, as
+    in a file export.  The output is written like :func:`read_profiles`'.
     """
-    posts: list[dict[str, Any]] = data.get("posts", [])
+    store_path = Path(store_path)
+    csv_dir = Path(csv_dir)
 
-    if not posts:
-        return
+    if output_format not in EXPORT_FORMATS:
+        msg = f"Unknown export format {output_format!r}"
+        raise ValueError(msg)
+    if not store_path.exists():
+        msg = f"Store does not exist: {store_path}"
+        raise FileNotFoundError(msg)
+
+    csv_dir.mkdir(parents=True, exist_ok=True)
+    if output_file_name is None:
+        output_file_name = "posts" + EXPORT_FORMATS[output_format]
+    output_path = csv_dir / output_file_name
+
+    logger.info("Reading posts from store %s", store_path)
+    stats = ExportStats(files=1)
+    start = time.perf_counter()
+    store = PostStore(store_path)
+    try:
+        if until is None:
+            newest = store.newest_date()
+            until = newest - RECENCY_THRESHOLD if newest is not None else None
+        with _open_sink(output_path, output_format) as sink:
+            for post in store.iter_posts(tags=tags, since=since, until=until):
+                sink.write(post)
+                stats.rows += 1
+    finally:
+        store.close()
+    stats.elapsed = time.perf_counter() - start
 
-    max_date = max(p["date"] for p in posts)
-    threshold_date = max_date - RECENCY_THRESHOLD
+    logger.info("Wrote %s to %s", output_format, output_path)
+    stats.log()
+    return stats
+
+
+def _export_incremental(
+    input_files: list[Path], partition_dir: Path, output_format: str, workers: int
+) -> ExportStats:
+    """Bring the per-file partitions in *partition_dir* up to date with *input_files*.
+
+    A file whose size and mtime match the manifest is skipped without
+    being read, as long as its partition is still there.  Otherwise its
+    content hash is compared, so a file that was only touched is not
+    re-exported either.  The manifest is written last: after an
+    interrupted run, files exported without a manifest entry are simply
+    exported again.
+    """
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = partition_dir / MANIFEST_NAME
+    manifest = _load_manifest(manifest_path, output_format)
+    suffix = EXPORT_FORMATS[output_format]
 
-    for post in posts:
-        if post["date"] > threshold_date:
+    stats = ExportStats()
+    start = time.perf_counter()
+    jobs = []
+    files: dict[str, dict[str, Any]] = {}
+    for path in input_files:
+        entry = manifest["files"].get(path.name)
+        partition = partition_dir / (path.name + suffix)
+        stat = path.stat()
+        if (
+            entry is not None
+            and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns)
+            and partition.exists()
+        ):
+            files[path.name] = entry
+            stats.unchanged += 1
             continue
+        jobs.append((path, partition, output_format, entry))
 
-        row = [
-            post.get("shortcode", ""),
-            str(post.get("pic_url", "")),
-            post.get("like_count", 0),
-            post.get("username", ""),
-            post.get("user_id", ""),
-            post.get("full_name", ""),
-            post.get("profile_pic_url", ""),
-            post.get("media_count", 0),
-            post.get("follower_count", 0),
-            post.get("comment_count", 0),
-            post.get("date", 0),
-            str(post.get("caption", "")),
-            post.get("tags", []),
-        ]
-        writer.writerow(row)
+    if workers > 1 and len(jobs) > 1:
+        with _process_pool(workers) as pool:
+            results = list(pool.map(_export_partition, *zip(*jobs, strict=True)))
+    else:
+        results = [_export_partition(*job) for job in jobs]
+
+    for (path, *_), (entry, exported) in zip(jobs, results, strict=True):
+        files[path.name] = entry
+        if exported:
+            stats.files += 1
+            stats.rows += entry["rows"]
+        else:
+            stats.unchanged += 1
+
+    for name, entry in manifest["files"].items():
+        if name not in files:
+            logger.debug("Removing partition of deleted input %s", name)
+            (partition_dir / entry["partition"]).unlink(missing_ok=True)
+
+    _save_manifest(manifest_path, {"format": output_format, "files": files})
+    stats.elapsed = time.perf_counter() - start
+
+    logger.info("Updated %s partitions in %s", output_format, partition_dir)
+    stats.log()
+    return stats
+
+
+def _export_partition(
+    json_file: Path, partition: Path, output_format: str, previous: dict[str, Any] | None
+) -> tuple[dict[str, Any], bool]:
+    """Export *json_file* to *partition* unless its content matches its *previous* entry.
+
+    Returns the file's new manifest entry and whether it was exported.
+    Runs in a pool worker when the export has several.
+    """
+    stat = json_file.stat()
+    digest = hashlib.sha256()
+    with json_file.open("rb") as f:
+        for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    entry = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+        "partition": partition.name,
+        "rows": 0,
+    }
+    if previous is not None and previous["sha256"] == entry["sha256"] and partition.exists():
+        return {**entry, "rows": previous["rows"]}, False
+
+    tmp_path = partition.with_name(partition.name + ".tmp")
+    with _open_sink(tmp_path, output_format) as sink:
+        for post in _exported_posts(json_file):
+            sink.write(post)
+            entry["rows"] += 1
+    tmp_path.replace(partition)
+    return entry, True
+
+
+def _load_manifest(path: Path, output_format: str) -> dict[str, Any]:
+    """Return the manifest at *path*, or an empty one if it is missing or unusable.
+
+    A manifest written for another output format is discarded together
+    with its partitions, so the export starts over.
+    """
+    empty: dict[str, Any] = {"format": output_format, "files": {}}
+    try:
+        manifest = json.loads(path.read_text())
+    except FileNotFoundError:
+        return empty
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable export manifest %s (%s)", path, exc)
+        return empty
+    if manifest.get("format") != output_format:
+        logger.info("Export format changed to %s, re-exporting every file", output_format)
+        for entry in manifest.get("files", {}).values():
+            (path.parent / entry["partition"]).unlink(missing_ok=True)
+        return empty
+    return manifest
+
+
+def _save_manifest(path: Path, manifest: dict[str, Any]) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp_path.replace(path)
+
+
+def _exported_posts(json_file: Path, cutoff: int | None = None) -> Iterator[dict[str, Any]]:
+    """Yield the posts of one crawl output file that belong in the export.
+
+    Posts dated after *cutoff* or, without one, within the recency
+    threshold of the file's most recent post are skipped, as are
+    reference records (``seen_in``) for posts exported from another
+    file.  Profile columns missing from posts crawled without profiles
+    are left to the sink.
+
+    The file is read in a single streaming pass: a post is yielded as
+    soon as it is older than the threshold of the newest post seen so
+    far, and only posts inside that window are held back until the end
+    of the file.  For the crawler's newest-first files this keeps file
+    order.
+    """
+    logger.debug("Processing %s", json_file.name)
+    if cutoff is not None:
+        for post in _iter_file_posts(json_file):
+            if post["date"] <= cutoff:
+                yield post
+        return
+
+    newest: int | None = None
+    held: list[dict[str, Any]] = []
+    for post in _iter_file_posts(json_file):
+        if newest is None or post["date"] > newest:
+            newest = post["date"]
+            threshold = newest - RECENCY_THRESHOLD
+            released = [p for p in held if p["date"] <= threshold]
+            if released:
+                held = [p for p in held if p["date"] > threshold]
+                yield from released
+        if post["date"] <= newest - RECENCY_THRESHOLD:
+            yield post
+        else:
+            held.append(post)
+    if newest is not None:
+        threshold = newest - RECENCY_THRESHOLD
+        yield from (p for p in held if p["date"] <= threshold)
+
+
+def _iter_file_posts(json_file: Path) -> Iterator[dict[str, Any]]:
+    """Yield the posts of one crawl output file, except reference records."""
+    with open_text(json_file) as f:
+        posts = _iter_jsonl(f) if format_suffix(json_file) == ".jsonl" else _iter_json_posts(f)
+        for post in posts:
+            if "seen_in" not in post:
+                yield post
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # Imported on first use: multiprocessing adds a noticeable share to the
+    # startup of every export, and most exports run in a single process
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def _file_newest_date(json_file: Path) -> int | None:
+    return max((post["date"] for post in _iter_file_posts(json_file)), default=None)
+
+
+def _newest_date(files: list[Path], workers: int) -> int | None:
+    """Return the newest post date across *files*, reading them in parallel if asked."""
+    if workers > 1 and len(files) > 1:
+        with _process_pool(workers) as pool:
+            dates = list(pool.map(_file_newest_date, files))
+    else:
+        dates = [_file_newest_date(path) for path in files]
+    return max((date for date in dates if date is not None), default=None)
+
+
+def _load_exported_posts(
+    json_file: Path, cutoff: int | None
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Pool worker: return the first exported posts of *json_file*, and the spill of the rest.
+
+    Parsing happens in the worker and only kept posts are sent back.
+    Posts past the first :data:`RESULT_CHUNK_SIZE` are pickled chunk by
+    chunk to a temporary file whose name is returned with them, so
+    neither process holds all of a large file's posts at once.
+    """
+    posts = _exported_posts(json_file, cutoff)
+    first = list(itertools.islice(posts, RESULT_CHUNK_SIZE))
+    chunk = list(itertools.islice(posts, RESULT_CHUNK_SIZE))
+    if not chunk:
+        return first, None
+    with tempfile.NamedTemporaryFile(prefix="export-", suffix=".pickle", delete=False) as spill:
+        try:
+            while chunk:
+                pickle.dump(chunk, spill, pickle.HIGHEST_PROTOCOL)
+                chunk = list(itertools.islice(posts, RESULT_CHUNK_SIZE))
+        except BaseException:
+            spill.close()
+            Path(spill.name).unlink()
+            raise
+    return first, spill.name
+
+
+def _spilled_posts(first: list[dict[str, Any]], spill: str | None) -> Iterator[dict[str, Any]]:
+    """Yield the posts of a :func:`_load_exported_posts` result, removing its spill file."""
+    yield from first
+    if spill is None:
+        return
+    try:
+        with open(spill, "rb") as f:
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    return
+                yield from chunk
+    finally:
+        Path(spill).unlink(missing_ok=True)
+
+
+def _parallel_posts(
+    files: list[Path], workers: int, ordered: bool, cutoff: int | None = None
+) -> Iterator[Iterator[dict[str, Any]]]:
+    """Yield each file's exported posts, parsed in a pool of *workers* processes.
+
+    At most two files per worker are in flight, so finished results wait
+    for the writer instead of piling up in memory, and each holds at most
+    :data:`RESULT_CHUNK_SIZE` posts in memory; the rest is read back from
+    its spill file as the writer gets to it.
+    """
+    remaining = iter(files)
+    pending: collections.deque[Future[Any]] = collections.deque()
+    spills: list[str | None] = []
+    try:
+        with _process_pool(workers) as pool:
+            pending.extend(
+                pool.submit(_load_exported_posts, path, cutoff)
+                for path in itertools.islice(remaining, 2 * workers)
+            )
+            while pending:
+                if ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = done.pop()
+                    pending.remove(future)
+                for path in itertools.islice(remaining, 1):
+                    pending.append(pool.submit(_load_exported_posts, path, cutoff))
+                first, spill = future.result()
+                spills.append(spill)
+                yield _spilled_posts(first, spill)
+    finally:
+        # Spills of results the writer abandoned or never took
+        for future in pending:
+            if not future.cancelled() and future.exception() is None:
+                spills.append(future.result()[1])
+        for spill in spills:
+            if spill is not None:
+                Path(spill).unlink(missing_ok=True)
+
+
+def _iter_jsonl(f: TextIO) -> Iterator[dict[str, Any]]:
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_json_posts(f: TextIO) -> Iterator[dict[str, Any]]:
+    """Yield the items of the top-level ``"posts"`` array of a JSON object in *f*.
+
+    Other keys are parsed and discarded.  Only one chunk of the file and
+    one post are held at a time.
+    """
+    stream = _JsonStream(f)
+    stream.take("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.take(":")
+        if key != "posts":
+            stream.value()
+        else:
+            stream.take("[")
+            if stream.peek() == "]":
+                stream.take("]")
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.take(",]") == "]":
+                        break
+        if stream.take(",}") == "}":
+            return
+
+
+class _JsonStream:
+    """Chunked reader that decodes one JSON value or delimiter at a time."""
+
+    def __init__(self, f: TextIO) -> None:
+        self._file = f
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        chunk = self._file.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character, or ``""`` at the end."""
+        while True:
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ""
+
+    def take(self, expected: str) -> str:
+        """Consume the next character, which must be one of *expected*."""
+        char = self.peek()
+        if not char or char not in expected:
+            msg = f"Expected one of {expected!r}"
+            raise json.JSONDecodeError(msg, self._buffer, self._position)
+        self._position += 1
+        return char
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self._buffer) and not self._eof and self._fill():
+                continue
+            self._position = end
+            return value
+
+
+class _SeenShortcodes:
+    """Set of exported shortcodes, stored as 64-bit hashes.
+
+    In memory the hashes live in an open-addressing table backed by an
+    ``array`` (12 to 24 bytes per shortcode instead of ~100 for a set of
+    strings); *on_disk* keeps them in a temporary SQLite table instead,
+    for exports beyond what fits in RAM.  Two distinct shortcodes share
+    a hash with negligible probability (about 3 in a million at 10
+    million shortcodes), in which case the second is dropped.
+    """
+
+    def __init__(self, on_disk: bool = False) -> None:
+        self._count = 0
+        self._table = array.array("q", bytes(8 * 1024))
+        self._conn: sqlite3.Connection | None = None
+        self._tmpdir: tempfile.TemporaryDirectory[str] | None = None
+        if on_disk:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="export-dedupe-")
+            self._conn = sqlite3.connect(str(Path(self._tmpdir.name) / "seen.db"))
+            self._conn.executescript(
+                "PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;"
+                "CREATE TABLE seen (hash INTEGER PRIMARY KEY) WITHOUT ROWID;"
+            )
+
+    def add(self, shortcode: str) -> bool:
+        """Add *shortcode*; return False if it was already in the set."""
+        # str hashes are 64-bit and only need to be stable within this process
+        key = hash(shortcode) or 1  # 0 marks an empty slot
+        if self._conn is not None:
+            cursor = self._conn.execute("INSERT OR IGNORE INTO seen VALUES (?)", (key,))
+            return cursor.rowcount == 1
+
+        table = self._table
+        mask = len(table) - 1
+        slot = key & mask
+        while table[slot]:
+            if table[slot] == key:
+                return False
+            slot = (slot + 1) & mask
+        table[slot] = key
+        self._count += 1
+        if self._count * 3 > len(table) * 2:
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        old = self._table
+        self._table = table = array.array("q", bytes(16 * len(old)))
+        mask = len(table) - 1
+        for key in old:
+            if key:
+                slot = key & mask
+                while table[slot]:
+                    slot = (slot + 1) & mask
+                table[slot] = key
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+
+
+class _Sink(abc.ABC):
+    """Destination table for exported posts, used as a context manager."""
+
+    @abc.abstractmethod
+    def write(self, post: dict[str, Any]) -> None: ...
+
+    @abc.abstractmethod
+    def close(self) -> None: ...
+
+    def __enter__(self) -> _Sink:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class _CsvSink(_Sink):
+    """Untyped CSV rows; ``tags`` is written as a Python list repr."""
+
+    def __init__(self, path: Path) -> None:
+        self._file = path.open("w", newline="")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+
+    def write(self, post: dict[str, Any]) -> None:
+        self._writer.writerow(
+            [
+                post.get("shortcode", ""),
+                str(post.get("pic_url", "")),
+                post.get("like_count", 0),
+                post.get("username", ""),
+                post.get("user_id", ""),
+                post.get("full_name", ""),
+                post.get("profile_pic_url", ""),
+                post.get("media_count", ""),
+                post.get("follower_count", ""),
+                post.get("comment_count", 0),
+                post.get("date", 0),
+                str(post.get("caption", "")),
+                post.get("tags", []),
+            ]
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowSink(_Sink):
+    """Typed Parquet or Arrow IPC output written in bounded row groups.
+
+    Counts and dates are int64, ``tags`` is list<string> and
+    ``username`` is dictionary-encoded.  Rows are buffered column-wise
+    and flushed every :data:`ROW_GROUP_SIZE` rows, so memory does not
+    grow with the size of the export.
+    """
+
+    def __init__(self, path: Path, output_format: str) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.ipc as ipc
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            msg = (
+                f"pyarrow is required for {output_format} export. "
+                "Install it with: pip install instagram-hashtag-crawler[parquet]"
+            )
+            raise RuntimeError(msg) from exc
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [
+                ("shortcode", pa.string()),
+                ("pic_url", pa.string()),
+                ("like_count", pa.int64()),
+                ("username", pa.dictionary(pa.int32(), pa.string())),
+                ("user_id", pa.int64()),
+                ("full_name", pa.string()),
+                ("profile_pic_url", pa.string()),
+                ("media_count", pa.int64()),
+                ("follower_count", pa.int64()),
+                ("comment_count", pa.int64()),
+                ("date", pa.int64()),
+                ("caption", pa.string()),
+                ("tags", pa.list_(pa.string())),
+            ]
+        )
+        if output_format == "parquet":
+            self._writer = pq.ParquetWriter(str(path), self.schema)
+        else:
+            self._writer = ipc.new_file(str(path), self.schema)
+        self._columns: dict[str, list[Any]] = {name: [] for name in COLUMNS}
+        self._rows = 0
+
+    def write(self, post: dict[str, Any]) -> None:
+        columns = self._columns
+        columns["shortcode"].append(post.get("shortcode"))
+        columns["pic_url"].append(_str_or_none(post.get("pic_url")))
+        columns["like_count"].append(_int_or_none(post.get("like_count")))
+        columns["username"].append(post.get("username"))
+        columns["user_id"].append(_int_or_none(post.get("user_id")))
+        columns["full_name"].append(post.get("full_name"))
+        columns["profile_pic_url"].append(_str_or_none(post.get("profile_pic_url")))
+        columns["media_count"].append(_int_or_none(post.get("media_count")))
+        columns["follower_count"].append(_int_or_none(post.get("follower_count")))
+        columns["comment_count"].append(_int_or_none(post.get("comment_count")))
+        columns["date"].append(_int_or_none(post.get("date")))
+        columns["caption"].append(_str_or_none(post.get("caption")))
+        columns["tags"].append(post.get("tags"))
+        self._rows += 1
+        if self._rows >= ROW_GROUP_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        batch = self._pa.record_batch(
+            [self._pa.array(self._columns[field.name], field.type) for field in self.schema],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch)
+        for values in self._columns.values():
+            values.clear()
+        self._rows = 0
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+def _open_sink(path: Path, output_format: str) -> _Sink:
+    if output_format == "csv":
+        return _CsvSink(path)
+    return _ArrowSink(path, output_format)
+
+
+def _int_or_none(value: Any) -> int | None:
+    # user_id arrives as a string from feed nodes; profile counts may be missing
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _str_or_none(value: Any) -> str | None:
+    return None if value is None else str(value)
 
 
 def main(argv: list[str] | None = None) -> None:
-    """CLI entrypoint for exporting JSON data to CSV."""
+    """CLI entrypoint for exporting JSON data to CSV, Parquet or Arrow."""
     parser = argparse.ArgumentParser(
         prog="instagram-hashtag-export",
-        description="Export crawled hashtag data from JSON to CSV.",
+        description="Export crawled hashtag data from JSON to CSV, Parquet or Arrow.",
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "--json-dir",
-        required=True,
         help="Directory containing crawled JSON files",
     )
+    source.add_argument(
+        "--store",
+        metavar="sqlite:PATH",
+        help="Export from a crawler --store database instead of JSON files",
+    )
     parser.add_argument(
         "--csv-dir",
         required=True,
-        help="Directory to write CSV output",
+        help="Directory to write the export to",
     )
     parser.add_argument(
         "--output-file",
-        default="posts.csv",
-        help="Output CSV filename (default: posts.csv)",
+        default=None,
+        help="Output filename (default: posts.<format>)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        default="csv",
+        dest="output_format",
+        help=(
+            "csv, or typed columnar parquet / arrow (Arrow IPC); the latter two "
+            "need pyarrow (default: csv)"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse input files in this many processes (default: 1)",
+    )
+    parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="With --workers, write each file's rows as soon as it is parsed",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Export each input file to its own partition under CSV_DIR/<output name>/ "
+            "and re-export only files changed since the last run"
+        ),
+    )
+    parser.add_argument(
+        "--dedupe",
+        nargs="?",
+        const="memory",
+        choices=DEDUPE_MODES,
+        help=(
+            "Export each shortcode once across all files, tracking seen posts in memory "
+            "(default) or on disk"
+        ),
+    )
+    parser.add_argument(
+        "--recency",
+        choices=RECENCY_MODES,
+        default="file",
+        help=(
+            "Skip posts from the last 24 hours before each file's newest post (file) or "
+            "the newest post overall (global) (default: file)"
+        ),
+    )
+    parser.add_argument(
+        "--reference-time",
+        type=int,
+        default=None,
+        help="Unix timestamp to measure the 24-hour recency cutoff from instead",
+    )
+    store_filters = parser.add_argument_group("store filters (with --store)")
+    store_filters.add_argument(
+        "--tag",
+        action="append",
+        dest="tags",
+        help="Only export posts crawled under this hashtag. Can be specified multiple times.",
+    )
+    store_filters.add_argument(
+        "--since", type=int, default=None, help="Unix timestamp of the oldest post to export"
+    )
+    store_filters.add_argument(
+        "--until",
+        type=int,
+        default=None,
+        help="Unix timestamp of the newest post to export (default: 24 hours before the newest)",
     )
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable debug logging")
 
     args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.store is not None:
+        try:
+            args.store = parse_store_url(args.store)
+        except ValueError as exc:
+            parser.error(f"--store: {exc}")
+        if args.incremental:
+            parser.error("--incremental works on JSON files and cannot be used with --store")
+    elif args.tags or args.since is not None or args.until is not None:
+        parser.error("--tag, --since and --until require --store")
+    if args.incremental and (
+        args.dedupe or args.recency != "file" or args.reference_time is not None
+    ):
+        parser.error(
+            "--incremental cannot be combined with --dedupe, --recency or --reference-time"
+        )
 
     level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(
@@ -113,8 +980,33 @@ def main(argv: list[str] | None = None) -> None:
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    read_profiles(
-        json_dir=Path(args.json_dir),
-        csv_dir=Path(args.csv_dir),
-        output_file_name=args.output_file,
-    )
+    try:
+        if args.store is not None:
+            until = args.until
+            if until is None and args.reference_time is not None:
+                until = args.reference_time - RECENCY_THRESHOLD
+            read_store(
+                args.store,
+                Path(args.csv_dir),
+                output_file_name=args.output_file,
+                output_format=args.output_format,
+                tags=args.tags,
+                since=args.since,
+                until=until,
+            )
+            return
+        read_profiles(
+            json_dir=Path(args.json_dir),
+            csv_dir=Path(args.csv_dir),
+            output_file_name=args.output_file,
+            output_format=args.output_format,
+            workers=args.workers,
+            ordered=not args.unordered,
+            incremental=args.incremental,
+            dedupe=args.dedupe,
+            recency=args.recency,
+            reference_time=args.reference_time,
+        )
+    except RuntimeError as exc:
+        logger.error("%s", exc)
+        sys.exit(1)
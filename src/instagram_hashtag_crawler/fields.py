@@ -0,0 +1,43 @@
+"""Output formats, post fields and collectable media types.
+
+Kept apart from the crawler so the CLI can validate its arguments
+without importing instaloader.
+"""
+
+from __future__ import annotations
+
+OUTPUT_FORMATS = ("json", "jsonl")
+
+# Output fields copied from the owner's profile; every other field comes
+# from the feed node itself and costs no extra request.
+PROFILE_FIELDS = frozenset(
+    {
+        "username",
+        "full_name",
+        "profile_pic_url",
+        "media_count",
+        "follower_count",
+        "following_count",
+    }
+)
+POST_FIELDS = frozenset(
+    {
+        "shortcode",
+        "user_id",
+        "date",
+        "pic_url",
+        "like_count",
+        "comment_count",
+        "caption",
+        "tags",
+        # Only written for sidecar and video posts
+        "typename",
+        "media_urls",
+        "video_view_count",
+    }
+)
+# Post types by their command-line name; only single images are crawled by default.
+MEDIA_TYPES = {"image": "GraphImage", "sidecar": "GraphSidecar", "video": "GraphVideo"}
+
+# Always written, whatever the field selection: the crawler and exporter rely on them.
+REQUIRED_FIELDS = frozenset({"shortcode", "user_id", "date"})
@@ -0,0 +1,81 @@
+"""Cheap post filters evaluated on feed node data.
+
+The crawler runs ``CrawlConfig.filters`` on each feed post before its
+owner's profile is fetched or the post is processed, so a rejected post
+costs no further request.  Filters read the node the feed already
+returned rather than ``instaloader.Post`` properties, some of which
+fetch the post's full metadata when a field is missing.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from instaloader import Post
+
+
+@dataclasses.dataclass(frozen=True)
+class PostFilter:
+    """A named predicate on a feed post; *name* labels its rejections in the crawl stats."""
+
+    name: str
+    predicate: Callable[[Post], bool]
+
+    def __call__(self, post: Post) -> bool:
+        return self.predicate(post)
+
+
+def node_value(post: Post, *paths: tuple[str, ...]) -> Any | None:
+    """Return the first of the key *paths* present in *post*'s feed node, or None."""
+    node = getattr(post, "_node", None)
+    for path in paths:
+        value: Any = node
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            return value
+    return None
+
+
+def like_count(post: Post) -> int | None:
+    return node_value(post, ("edge_media_preview_like", "count"), ("edge_liked_by", "count"))
+
+
+def comment_count(post: Post) -> int | None:
+    return node_value(
+        post, ("edge_media_to_comment", "count"), ("edge_media_to_parent_comment", "count")
+    )
+
+
+def min_likes(count: int) -> PostFilter:
+    """Reject posts with fewer than *count* likes.
+
+    Posts whose node lacks a like count pass, since checking would cost
+    a request.
+    """
+    return PostFilter("min_likes", lambda post: _at_least(like_count(post), count))
+
+
+def min_comments(count: int) -> PostFilter:
+    """Reject posts with fewer than *count* comments (unknown counts pass)."""
+    return PostFilter("min_comments", lambda post: _at_least(comment_count(post), count))
+
+
+def _at_least(value: int | None, count: int) -> bool:
+    return value is None or value >= count
+
+
+def caption_keywords(words: Iterable[str]) -> PostFilter:
+    """Keep only posts whose caption contains any of *words* (case-insensitive)."""
+    needles = tuple(word.lower() for word in words)
+
+    def predicate(post: Post) -> bool:
+        caption = (post.caption or "").lower()
+        return any(needle in caption for needle in needles)
+
+    return PostFilter("keyword", predicate)
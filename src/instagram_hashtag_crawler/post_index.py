@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    shortcode TEXT PRIMARY KEY,
+    hashtag TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+"""
+
+
+class PostIndex:
+    """SQLite-backed index of processed posts keyed by shortcode.
+
+    Lets a post that shows up under several hashtags be processed (and
+    its owner's profile fetched) only once per run, or once ever when the
+    index is persisted at *path*.  Each entry remembers the hashtag the
+    post was first written under; posts are only indexed once the output
+    file holding them has been written, so an entry never points at an
+    output that does not exist.
+
+    The index is safe to share between crawler threads.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self.reused = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(path) if path is not None else ":memory:",
+            check_same_thread=False,
+        )
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, shortcode: str) -> tuple[str, dict[str, Any]] | None:
+        """Return ``(hashtag, record)`` for *shortcode*, or None if unseen."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hashtag, record FROM posts WHERE shortcode = ?", (shortcode,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.reused += 1
+        return row[0], json.loads(row[1])
+
+    def put(self, hashtag: str, record: dict[str, Any]) -> None:
+        """Index *record* as first written under *hashtag*; existing entries win."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO posts (shortcode, hashtag, record) VALUES (?, ?, ?)",
+                (record["shortcode"], hashtag, json.dumps(record, default=str)),
+            )
+            self._conn.commit()
+
+    def put_many(self, hashtag: str, records: Iterable[dict[str, Any]]) -> None:
+        """Index each of *records* as written under *hashtag*, in one transaction."""
+        rows = ((r["shortcode"], hashtag, json.dumps(r, default=str)) for r in records)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO posts (shortcode, hashtag, record) VALUES (?, ?, ?)", rows
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def log_stats(self) -> None:
+        """Log how many posts were reused instead of processed again."""
+        logger.info("Post index: %d posts reused across hashtags", self.reused)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from instaloader import Profile
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    owner_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    profile_pic_url TEXT NOT NULL,
+    mediacount INTEGER NOT NULL,
+    followers INTEGER NOT NULL,
+    followees INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_used_at ON profiles (used_at);
+"""
+
+# Cache writes (new profiles and recency updates of hits) per commit, so a
+# lookup does not cost a disk sync.  A crash loses at most this many.
+COMMIT_INTERVAL = 256
+
+_FIELDS = ("username", "full_name", "profile_pic_url", "mediacount", "followers", "followees")
+
+
+@dataclasses.dataclass(frozen=True)
+class ProfileRecord:
+    """The profile fields the crawler copies into each post.
+
+    Attribute names mirror ``instaloader.Profile`` so a record can stand
+    in for a live profile.
+    """
+
+    username: str
+    full_name: str
+    profile_pic_url: str
+    mediacount: int
+    followers: int
+    followees: int
+
+    @classmethod
+    def from_profile(cls, profile: Profile) -> ProfileRecord:
+        return cls(
+            username=profile.username,
+            full_name=profile.full_name or "",
+            profile_pic_url=str(profile.profile_pic_url),
+            mediacount=profile.mediacount,
+            followers=profile.followers,
+            followees=profile.followees,
+        )
+
+
+class ProfileCache:
+    """SQLite-backed cache of :class:`ProfileRecord` keyed by owner ID.
+
+    With *path* the cache persists across runs; without it the cache
+    lives in memory for the current run only.  Entries older than *ttl*
+    seconds are treated as misses (``None`` disables expiry), and the
+    least recently used entries are evicted once more than *max_size*
+    profiles are stored.  Recency updates of hits and new entries are
+    written in batches of :data:`COMMIT_INTERVAL`; :meth:`close` writes
+    the rest.
+
+    The cache is safe to share between crawler threads.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        *,
+        ttl: float | None = None,
+        max_size: int = 100_000,
+    ) -> None:
+        if max_size < 1:
+            msg = f"max_size must be at least 1, got {max_size}"
+            raise ValueError(msg)
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(path) if path is not None else ":memory:",
+            check_same_thread=False,
+        )
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+        # owner_id -> used_at of hits not yet written
+        self._touched: dict[int, float] = {}
+        self._uncommitted = 0
+
+    def get(self, owner_id: int) -> ProfileRecord | None:
+        """Return the cached profile for *owner_id*, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_FIELDS)}, fetched_at FROM profiles WHERE owner_id = ?",
+                (owner_id,),
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[-1] > self.ttl):
+                self.misses += 1
+                return None
+            self._touched[owner_id] = now
+            self.hits += 1
+            if len(self._touched) >= COMMIT_INTERVAL:
+                self._flush()
+        return ProfileRecord(*row[:-1])
+
+    def put(self, owner_id: int, record: ProfileRecord) -> None:
+        """Store *record* for *owner_id*, evicting old entries if needed."""
+        now = time.time()
+        values = dataclasses.astuple(record)
+        with self._lock:
+            self._touched.pop(owner_id, None)
+            exists = self._conn.execute(
+                "SELECT 1 FROM profiles WHERE owner_id = ?", (owner_id,)
+            ).fetchone()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO profiles (owner_id, {', '.join(_FIELDS)}, "
+                "fetched_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (owner_id, *values, now, now),
+            )
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_size:
+                # Pending recency updates decide which entries are least recent
+                self._write_touched()
+                self._conn.execute(
+                    "DELETE FROM profiles WHERE owner_id IN ("
+                    "SELECT owner_id FROM profiles ORDER BY used_at LIMIT ?)",
+                    (self._count - self.max_size,),
+                )
+                self._count = self.max_size
+            self._uncommitted += 1
+            if self._uncommitted + len(self._touched) >= COMMIT_INTERVAL:
+                self._flush()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def _write_touched(self) -> None:
+        self._conn.executemany(
+            "UPDATE profiles SET used_at = ? WHERE owner_id = ?",
+            [(used_at, owner_id) for owner_id, used_at in self._touched.items()],
+        )
+        self._uncommitted += len(self._touched)
+        self._touched.clear()
+
+    def _flush(self) -> None:
+        self._write_touched()
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def log_stats(self) -> None:
+        """Log how many profile fetches the cache saved."""
+        logger.info(
+            "Profile cache: %d hits, %d misses (%d profile requests saved)",
+            self.hits,
+            self.misses,
+            self.hits,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._conn.close()
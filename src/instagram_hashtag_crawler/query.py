@@ -0,0 +1,210 @@
+"""Boolean hashtag queries such as ``(#pizza OR #pasta) AND NOT #ad``.
+
+A query is parsed into a small expression tree that is evaluated against
+a post's caption hashtags.  :func:`plan_feeds` picks the hashtag feeds
+that together contain every post the query can match.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import re
+from collections.abc import Callable
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|#?(\w+))")
+_KEYWORDS = frozenset({"AND", "OR", "NOT"})
+
+
+class QueryError(ValueError):
+    """Raised for a query that cannot be parsed or answered from hashtag feeds."""
+
+
+@dataclasses.dataclass(frozen=True)
+class Tag:
+    name: str
+
+    def matches(self, tags: frozenset[str]) -> bool:
+        return self.name in tags
+
+    def __str__(self) -> str:
+        return self.name
+
+
+@dataclasses.dataclass(frozen=True)
+class Not:
+    operand: Query
+
+    def matches(self, tags: frozenset[str]) -> bool:
+        return not self.operand.matches(tags)
+
+    def __str__(self) -> str:
+        return f"NOT {_group(self.operand, Not)}"
+
+
+@dataclasses.dataclass(frozen=True)
+class And:
+    operands: tuple[Query, ...]
+
+    def matches(self, tags: frozenset[str]) -> bool:
+        return all(operand.matches(tags) for operand in self.operands)
+
+    def __str__(self) -> str:
+        return " AND ".join(_group(operand, And) for operand in self.operands)
+
+
+@dataclasses.dataclass(frozen=True)
+class Or:
+    operands: tuple[Query, ...]
+
+    def matches(self, tags: frozenset[str]) -> bool:
+        return any(operand.matches(tags) for operand in self.operands)
+
+    def __str__(self) -> str:
+        return " OR ".join(_group(operand, Or) for operand in self.operands)
+
+
+Query = Tag | Not | And | Or
+
+
+def _group(operand: Query, parent: type) -> str:
+    # Parenthesise operands that bind more loosely than their parent
+    looser = {Not: (And, Or), And: (Or,), Or: ()}[parent]
+    return f"({operand})" if isinstance(operand, looser) else str(operand)
+
+
+def parse(expression: str) -> Query:
+    """Parse a boolean hashtag query.
+
+    Hashtags may be written with or without ``#`` and are matched
+    case-insensitively.  ``NOT`` binds tighter than ``AND``, which binds
+    tighter than ``OR``; parentheses group.  Keywords are
+    case-insensitive, so a hashtag literally named ``and`` cannot be
+    queried.
+    """
+    tokens = _tokenize(expression)
+    position = 0
+
+    def peek() -> str | None:
+        return tokens[position] if position < len(tokens) else None
+
+    def take() -> str:
+        nonlocal position
+        token = peek()
+        if token is None:
+            msg = f"Unexpected end of query: {expression!r}"
+            raise QueryError(msg)
+        position += 1
+        return token
+
+    def parse_or() -> Query:
+        operands = [parse_and()]
+        while peek() == "OR":
+            take()
+            operands.append(parse_and())
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def parse_and() -> Query:
+        operands = [parse_not()]
+        while peek() == "AND":
+            take()
+            operands.append(parse_not())
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def parse_not() -> Query:
+        if peek() == "NOT":
+            take()
+            return Not(parse_not())
+        token = take()
+        if token == "(":
+            inner = parse_or()
+            if take() != ")":
+                msg = f"Expected ')' in query: {expression!r}"
+                raise QueryError(msg)
+            return inner
+        if token in _KEYWORDS or token == ")":
+            msg = f"Unexpected {token!r} in query: {expression!r}"
+            raise QueryError(msg)
+        return Tag(token.lower())
+
+    query = parse_or()
+    if peek() is not None:
+        msg = f"Unexpected {peek()!r} in query: {expression!r}"
+        raise QueryError(msg)
+    return query
+
+
+def _tokenize(expression: str) -> list[str]:
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            msg = f"Invalid character {expression[position:].strip()[0]!r} in query"
+            raise QueryError(msg)
+        open_paren, close_paren, word = match.groups()
+        if word is not None:
+            tokens.append(word.upper() if word.upper() in _KEYWORDS else word)
+        else:
+            tokens.append(open_paren or close_paren)
+        position = match.end()
+    if not tokens:
+        msg = "Empty query"
+        raise QueryError(msg)
+    return tokens
+
+
+def positive_tags(query: Query) -> frozenset[str]:
+    """Return the hashtags that occur in *query* outside any ``NOT``."""
+    if isinstance(query, Tag):
+        return frozenset({query.name})
+    if isinstance(query, Not):
+        return frozenset()
+    return frozenset().union(*(positive_tags(operand) for operand in query.operands))
+
+
+def plan_feeds(query: Query, cost: Callable[[str], int]) -> list[str]:
+    """Choose the hashtag feeds to read to find every match of *query*.
+
+    Every post matching the query carries at least one of the returned
+    hashtags, so reading their feeds (and filtering by :meth:`matches`)
+    misses nothing.  For ``AND`` only the cheapest operand's feeds are
+    needed; *cost* gives a hashtag's feed size (e.g. its post count).
+    The feeds are returned cheapest first.
+
+    Raises :class:`QueryError` if some match need not carry any positive
+    hashtag (e.g. ``NOT #ad``), since no feed could contain it.
+    """
+    cover = _cover(query, cost)
+    if cover is None:
+        msg = f"Query {query} can match posts outside every hashtag feed; add a positive hashtag"
+        raise QueryError(msg)
+    return sorted(cover, key=lambda tag: (cost(tag), tag))
+
+
+def _cover(query: Query, cost: Callable[[str], int]) -> frozenset[str] | None:
+    if isinstance(query, Tag):
+        return frozenset({query.name})
+    if isinstance(query, Not):
+        return None
+    covers = [_cover(operand, cost) for operand in query.operands]
+    if isinstance(query, Or):
+        if any(cover is None for cover in covers):
+            return None
+        return frozenset().union(*covers)
+    candidates = [cover for cover in covers if cover is not None]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda cover: sum(cost(tag) for tag in cover))
+
+
+def file_stem(query: Query) -> str:
+    """Return a file-name-safe name for *query*'s output.
+
+    The readable part drops the parentheses, so a short hash of the query
+    keeps e.g. ``(a OR b) AND c`` and ``a OR (b AND c)`` apart.
+    """
+    readable = re.sub(r"\W+", "_", str(query)).strip("_")
+    digest = hashlib.sha256(str(query).encode()).hexdigest()[:8]
+    return f"{readable}-{digest}"
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import functools
+import logging
+import random
+import threading
+import time
+import weakref
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+import instaloader
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# InstaloaderContext methods that issue one query each, as seen by the
+# rate controller.
+_QUERY_METHODS = ("get_json", "get_page_data")
+
+# Defaults for jittered exponential backoff after a throttled or failed request.
+BACKOFF_BASE = 2.0
+MAX_BACKOFF = 300.0
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = BACKOFF_BASE,
+    cap: float = MAX_BACKOFF,
+) -> float:
+    """Return a jittered exponential delay for the given retry *attempt*.
+
+    The delay is drawn uniformly from the upper half of
+    ``min(cap, base * 2**attempt)``, so concurrent workers that fail
+    together do not retry in lockstep.
+    """
+    delay = min(cap, base * 2**attempt)
+    return random.uniform(delay / 2, delay)
+
+
+class RateLimiter:
+    """Thread-safe, self-adjusting token bucket shared by every loader in a run.
+
+    The bucket starts at *rate* requests per second, which is also the
+    ceiling.  Every throttled or failed request halves the rate (down to
+    *min_rate*) and every successful one adds back a small step, in the
+    style of AIMD congestion control.  :meth:`acquire` blocks until a
+    token is available; :meth:`throttled` returns the backoff to sleep
+    before retrying.
+
+    The current rate, the total time spent waiting and the number of
+    requests issued (in total and per loader context, see
+    :meth:`requests_for`) are kept for the run summary and for request
+    budgets.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        *,
+        min_rate: float | None = None,
+        increase: float | None = None,
+        decrease: float = 0.5,
+        max_backoff: float = MAX_BACKOFF,
+    ) -> None:
+        if rate <= 0:
+            msg = f"rate must be positive, got {rate}"
+            raise ValueError(msg)
+        if burst < 1:
+            msg = f"burst must be at least 1, got {burst}"
+            raise ValueError(msg)
+        if not 0 < decrease < 1:
+            msg = f"decrease must be between 0 and 1, got {decrease}"
+            raise ValueError(msg)
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 50
+        self.increase = increase if increase is not None else rate / 50
+        self.decrease = decrease
+        self.max_backoff = max_backoff
+        self.burst = burst
+        self.rate = rate
+        self.waited = 0.0
+        self.throttles = 0
+        self.requests = 0
+        self._requests_by_owner: weakref.WeakKeyDictionary[object, int] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._strikes = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, owner: object | None = None) -> None:
+        """Block until one request may be issued.
+
+        The request is counted towards *owner* (typically the issuing
+        loader's context) when given.
+        """
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.requests += 1
+                    if owner is not None:
+                        self._requests_by_owner[owner] = self._requests_by_owner.get(owner, 0) + 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+    def requests_for(self, owner: object) -> int:
+        """Return how many requests were acquired on behalf of *owner*."""
+        with self._lock:
+            return self._requests_by_owner.get(owner, 0)
+
+    def succeeded(self) -> None:
+        """Record a successful request: raise the rate by one additive step."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._strikes = 0
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self) -> float:
+        """Record a throttled or failed request.
+
+        Cuts the rate multiplicatively and returns how long to back off
+        before retrying; consecutive throttles back off exponentially.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            attempt = self._strikes
+            self._strikes += 1
+        wait = backoff_delay(attempt, cap=self.max_backoff)
+        logger.debug("Throttled: rate now %.3f req/s, backing off %.1fs", self.rate, wait)
+        return wait
+
+    def sleep(self, secs: float) -> None:
+        """Sleep for *secs*, counting it towards :attr:`waited`."""
+        time.sleep(secs)
+        with self._lock:
+            self.waited += secs
+
+    def log_stats(self) -> None:
+        logger.info(
+            "Rate limiter: %d requests, %.3f req/s (max %.3f), waited %.1fs in total, "
+            "%d throttled requests",
+            self.requests,
+            self.rate,
+            self.max_rate,
+            self.waited,
+            self.throttles,
+        )
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    limiter: RateLimiter | None,
+    *,
+    what: str,
+    attempts: int = 3,
+) -> T:
+    """Call *fn*, retrying connection errors with jittered exponential backoff.
+
+    Each failure is reported to *limiter* (when given) so the shared rate
+    adapts.  ``QueryReturnedNotFoundException`` is not retried, and the
+    last error is re-raised once *attempts* are used up.
+    """
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except instaloader.QueryReturnedNotFoundException:
+            raise
+        except instaloader.ConnectionException as exc:
+            if attempt == attempts - 1:
+                raise
+            wait = limiter.throttled() if limiter is not None else backoff_delay(attempt)
+            logger.warning("Connection error %s, retrying in %.1fs: %s", what, wait, exc)
+            if limiter is not None:
+                limiter.sleep(wait)
+            else:
+                time.sleep(wait)
+    # Unreachable, but satisfies type checker
+    msg = f"Failed {what} after retries"
+    raise RuntimeError(msg)
+
+
+def rate_controller_factory(
+    limiter: RateLimiter,
+) -> Callable[[instaloader.InstaloaderContext], instaloader.RateController]:
+    """Build an ``Instaloader(rate_controller=...)`` factory bound to *limiter*.
+
+    Instaloader routes every GraphQL and API query through its rate
+    controller, so hooking in here paces hashtag lookups, feed pages and
+    profile fetches alike.  A query counts as successful once the
+    context's ``get_json`` (or ``get_page_data``) returns, after any
+    retries instaloader made within it; 429 responses back off through
+    *limiter* instead of instaloader's fixed sliding-window wait.  Each
+    query is counted towards the loader's context, so
+    ``limiter.requests_for(loader.context)`` tells what a loader has spent.
+    Instaloader's own per-context request windows still apply on top.
+    """
+
+    class _SharedRateController(instaloader.RateController):
+        def __init__(self, context: instaloader.InstaloaderContext) -> None:
+            super().__init__(context)
+            self._calls = threading.local()
+            for name in _QUERY_METHODS:
+                query = getattr(context, name, None)  # get_page_data is new in 4.15
+                if query is not None:
+                    setattr(context, name, self._report_success(query))
+
+        def _report_success(self, query: Callable[..., T]) -> Callable[..., T]:
+            @functools.wraps(query)
+            def wrapper(*args: Any, **kwargs: Any) -> T:
+                # get_json retries by calling itself; only the outermost
+                # call returning means the query succeeded
+                depth = getattr(self._calls, "depth", 0)
+                self._calls.depth = depth + 1
+                try:
+                    result = query(*args, **kwargs)
+                finally:
+                    self._calls.depth = depth
+                if depth == 0:
+                    limiter.succeeded()
+                return result
+
+            return wrapper
+
+        def wait_before_query(self, query_type: str) -> None:
+            limiter.acquire(self._context)
+            super().wait_before_query(query_type)
+
+        def handle_429(self, query_type: str) -> None:
+            limiter.sleep(limiter.throttled())
+
+    return _SharedRateController
@@ -0,0 +1,471 @@
+"""Crawl runs started from the command line.
+
+Kept apart from :mod:`instagram_hashtag_crawler.cli` so that ``--help``
+and argument errors return without importing instaloader and requests;
+:func:`run` is imported once the arguments are known to be good.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import logging
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+import instaloader
+from instaloader.instaloader import get_default_session_filename
+
+from instagram_hashtag_crawler.crawler import (
+    CrawlConfig,
+    clone_loader,
+    crawl,
+    crawl_concurrent,
+    crawl_multi_and,
+    crawl_query,
+    enrich,
+    make_loader,
+)
+from instagram_hashtag_crawler.filters import caption_keywords, min_comments, min_likes
+from instagram_hashtag_crawler.post_index import PostIndex
+from instagram_hashtag_crawler.profile_cache import ProfileCache
+from instagram_hashtag_crawler.query import Query
+from instagram_hashtag_crawler.ratelimit import RateLimiter
+from instagram_hashtag_crawler.scheduler import Scheduler, TagSchedule
+from instagram_hashtag_crawler.session_cache import SessionCache
+from instagram_hashtag_crawler.sessions import Session, SessionPool, crawl_pooled
+from instagram_hashtag_crawler.store import PostStore
+from instagram_hashtag_crawler.utils import file_to_list
+
+logger = logging.getLogger(__name__)
+
+
+def _check_session(
+    loader: instaloader.Instaloader,
+    session_file: Path,
+    cache: SessionCache | None,
+    *,
+    revalidate: bool = False,
+) -> str | None:
+    """Return the username the session loaded from *session_file* is logged in as.
+
+    A session the cache verified within its TTL is trusted without
+    ``test_login``; *revalidate* forces the check.
+    """
+    if cache is not None and not revalidate:
+        username = cache.verified(session_file)
+        if username is not None:
+            logger.debug("Session %s verified recently, skipping test_login", session_file)
+            return username
+    username = loader.test_login()
+    if cache is not None:
+        if username:
+            cache.mark_verified(session_file, username)
+        else:
+            cache.forget(session_file)
+    return username
+
+
+def _login(
+    loader: instaloader.Instaloader,
+    username: str,
+    password: str,
+    session_file: str | None,
+    *,
+    cache: SessionCache | None = None,
+    revalidate: bool = False,
+) -> None:
+    """Attempt session restore, fall back to username/password login."""
+    if session_file:
+        try:
+            loader.load_session_from_file(username, filename=session_file)
+            if _check_session(loader, Path(session_file), cache, revalidate=revalidate) == username:
+                logger.info("Restored session from %s", session_file)
+                return
+        except FileNotFoundError:
+            logger.debug("No session file at %s, will login fresh", session_file)
+
+    # Try default session location
+    default_file = get_default_session_filename(username)
+    try:
+        loader.load_session_from_file(username)
+        if _check_session(loader, Path(default_file), cache, revalidate=revalidate) == username:
+            logger.info("Restored session for %s", username)
+            return
+    except FileNotFoundError:
+        logger.debug("No default session file found")
+
+    logger.info("Logging in as %s", username)
+    loader.login(username, password)
+
+    # Save session for next time
+    loader.save_session_to_file(filename=session_file or default_file)
+    if cache is not None:
+        cache.mark_verified(Path(session_file or default_file), username)
+    logger.info("Session saved")
+
+
+def _login_browser(
+    loader: instaloader.Instaloader,
+    browser: str,
+    cookie_file: str | None = None,
+    *,
+    cache: SessionCache | None = None,
+    revalidate: bool = False,
+) -> None:
+    """Load the browser's Instagram session, preferring the copy in *cache*.
+
+    Cookies extracted from the browser are kept in the cache as a session
+    file once verified, so later runs skip the browser's cookie database
+    until the cached session stops working.
+    """
+    from instagram_hashtag_crawler.browser_session import load_browser_session
+
+    if cache is not None:
+        cached_file = cache.browser_session_file(browser, cookie_file)
+        username = cache.username(cached_file)
+        if username is not None and cached_file.exists():
+            loader.load_session_from_file(username, filename=str(cached_file))
+            if _check_session(loader, cached_file, cache, revalidate=revalidate):
+                logger.info("Restored %s session of %s from %s", browser, username, cached_file)
+                return
+            logger.info("Cached %s session is no longer valid, extracting cookies", browser)
+
+    user_id = load_browser_session(loader, browser, cookie_file=cookie_file)
+    logged_in = loader.test_login()
+    if logged_in:
+        logger.info("Browser session verified — logged in as %s", logged_in)
+        if cache is not None:
+            loader.context.username = logged_in
+            loader.save_session_to_file(filename=str(cached_file))
+            cache.mark_verified(cached_file, logged_in)
+    else:
+        logger.warning(
+            "Browser session loaded (user_id=%s) but test_login did not confirm. "
+            "The session may still work for hashtag queries.",
+            user_id,
+        )
+
+
+def _load_account(spec: str, rate_limit: float, cache: SessionCache | None) -> Session:
+    """Log in a pool account from a ``--account`` spec, with its own rate limiter."""
+    limiter = RateLimiter(rate_limit)
+    loader = make_loader(limiter)
+    name, _, rest = spec.partition(":")
+    if name == "browser":
+        browser, _, cookie_file = rest.partition(":")
+        _login_browser(loader, browser, cookie_file=cookie_file or None, cache=cache)
+        name = loader.context.username or f"{browser} session"
+    else:
+        session_file = rest or get_default_session_filename(name)
+        loader.load_session_from_file(name, filename=session_file)
+        if _check_session(loader, Path(session_file), cache) != name:
+            logger.warning("Session of %s could not be verified", name)
+        logger.info("Restored session for %s", name)
+    return Session(name, loader, limiter)
+
+
+def run(args: argparse.Namespace) -> None:
+    """Log in and carry out the crawl described by parsed command-line *args*."""
+    # Resolve targets
+    multi_and = False
+    if args.targets:
+        hashtags = args.targets
+        if len(hashtags) > 1:
+            multi_and = True
+    elif args.targetfile:
+        hashtags = file_to_list(args.targetfile)
+    elif args.query or args.enrich or args.schedule:
+        hashtags = []
+    else:
+        logger.error(
+            "Provide a hashtag with -t, a file of hashtags with -f, a query with -q "
+            "or a schedule with --schedule"
+        )
+        sys.exit(1)
+
+    if args.schedule:
+        logger.info("Schedule: %s", ", ".join(f"#{tag.hashtag}" for tag in args.schedule))
+    elif args.enrich:
+        logger.info("Enriching: %s", args.enrich)
+    elif args.query:
+        logger.info("Query: %s", args.query)
+    elif multi_and:
+        logger.info("AND search for: %s", " + ".join(f"#{h}" for h in hashtags))
+    else:
+        logger.info("Targets: %s", hashtags)
+
+    # Initialize instaloader and login; --account sessions join the pool
+    # after the primary one
+    limiter = RateLimiter(args.rate_limit)
+    loader = make_loader(limiter)
+    sessions = []
+
+    session_cache = (
+        None
+        if args.no_session_cache
+        else SessionCache(Path(args.session_cache), ttl=args.session_cache_ttl)
+    )
+
+    def login(*, revalidate: bool = False) -> None:
+        if args.browser:
+            _login_browser(
+                loader,
+                args.browser,
+                cookie_file=args.cookie_file,
+                cache=session_cache,
+                revalidate=revalidate,
+            )
+        else:
+            _login(
+                loader,
+                args.username,
+                args.password,
+                args.session_file,
+                cache=session_cache,
+                revalidate=revalidate,
+            )
+
+    try:
+        if args.browser or args.username:
+            login()
+            sessions.append(Session(loader.context.username or args.browser, loader, limiter))
+        sessions += [_load_account(spec, args.rate_limit, session_cache) for spec in args.accounts]
+    except FileNotFoundError as exc:
+        logger.error("Login failed: no session file %s", exc.filename)
+        sys.exit(1)
+    except instaloader.InvalidArgumentException as exc:
+        logger.error("Login failed: %s", exc)
+        sys.exit(1)
+    except instaloader.TwoFactorAuthRequiredException:
+        logger.error(
+            "Two-factor auth required. Use --browser or --session-file "
+            "with a pre-authenticated session."
+        )
+        sys.exit(1)
+    except RuntimeError as exc:
+        logger.error("%s", exc)
+        sys.exit(1)
+
+    # A logged-out session must not be trusted on the cache's word again
+    relogin = functools.partial(login, revalidate=True) if sessions[0].loader is loader else None
+    loader, limiter = sessions[0].loader, sessions[0].limiter
+    pool = SessionPool(sessions) if len(sessions) > 1 else None
+
+    # Build config
+    from datetime import datetime, timezone
+
+    min_ts = None
+    if args.since is not None:
+        min_ts = datetime.fromtimestamp(args.since, tz=timezone.utc)
+
+    filters = []
+    if args.min_likes is not None:
+        filters.append(min_likes(args.min_likes))
+    if args.min_comments is not None:
+        filters.append(min_comments(args.min_comments))
+    if args.keywords:
+        filters.append(caption_keywords(args.keywords))
+
+    config = CrawlConfig(
+        output_dir=Path(args.output_dir),
+        min_posts=args.min_posts,
+        max_posts=args.max_posts,
+        min_timestamp=min_ts,
+        media_types=args.media_types,
+        filters=tuple(filters),
+        max_scanned=args.max_scanned,
+        time_budget=args.time_budget,
+        request_budget=args.request_budget,
+        output_format=args.output_format,
+        compression=args.compress,
+        compact=args.compact,
+        checkpoint_interval=args.checkpoint_every,
+        resume=args.resume,
+        incremental=args.incremental,
+        rate_limiter=limiter,
+        profile_workers=args.profile_workers,
+        profile_batch_size=args.profile_batch,
+        fields=args.fields,
+        profile_cache=ProfileCache(
+            Path(args.profile_cache) if args.profile_cache else None,
+            ttl=args.profile_cache_ttl or None,
+            max_size=args.profile_cache_size,
+        ),
+        post_index=(
+            PostIndex(Path(args.post_index) if args.post_index else None)
+            if args.share_posts
+            else None
+        ),
+        post_refs=args.post_refs,
+        store=PostStore(args.store) if args.store is not None else None,
+    )
+
+    config.output_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        if args.schedule:
+            _run_schedule(loader, args.schedule, config, args.hourly_requests, relogin)
+        elif args.enrich:
+            _run_enrich(loader, [Path(f) for f in args.enrich], config)
+        elif args.query:
+            _run_query(loader, args.query, config)
+        else:
+            _run_crawls(
+                loader,
+                limiter,
+                hashtags,
+                config,
+                multi_and=multi_and,
+                workers=args.workers,
+                pool=pool,
+            )
+    finally:
+        _finish_run(config)
+        if pool is not None:
+            pool.log_stats()
+
+
+def _run_schedule(
+    loader: instaloader.Instaloader,
+    tags: list[TagSchedule],
+    config: CrawlConfig,
+    hourly_requests: int | None,
+    relogin: Callable[[], None] | None,
+) -> None:
+    scheduler = Scheduler(
+        loader,
+        tags,
+        config,
+        hourly_requests=hourly_requests,
+        state_path=config.output_dir / "schedule.state.json",
+        relogin=relogin,
+    )
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        logger.info("Scheduler stopped after %d crawls", scheduler.crawls)
+    except (instaloader.LoginRequiredException, instaloader.AbortDownloadException) as exc:
+        # Sessions from --account cannot be logged in again
+        logger.error(
+            "Session logged out after %d crawls (%s); log in again and restart the scheduler",
+            scheduler.crawls,
+            exc,
+        )
+        sys.exit(1)
+
+
+def _run_enrich(
+    loader: instaloader.Instaloader,
+    output_files: list[Path],
+    config: CrawlConfig,
+) -> None:
+    for output_file in output_files:
+        try:
+            enrich(loader, output_file, config)
+        except KeyboardInterrupt:
+            logger.info("Interrupted by user")
+            sys.exit(130)
+        except FileNotFoundError:
+            logger.warning("No such file %s, skipping", output_file)
+
+
+def _run_query(
+    loader: instaloader.Instaloader,
+    query: Query,
+    config: CrawlConfig,
+) -> None:
+    try:
+        if crawl_query(loader, query, config):
+            logger.info("Finished query %s", query)
+        else:
+            logger.warning("Insufficient posts matching %s", query)
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user")
+        sys.exit(130)
+    except instaloader.QueryReturnedNotFoundException as exc:
+        logger.warning("Hashtag not found: %s", exc)
+
+
+def _run_crawls(
+    loader: instaloader.Instaloader,
+    limiter: RateLimiter,
+    hashtags: list[str],
+    config: CrawlConfig,
+    *,
+    multi_and: bool,
+    workers: int,
+    pool: SessionPool | None = None,
+) -> None:
+    # Multi-tag AND search
+    if multi_and:
+        try:
+            success = crawl_multi_and(loader, hashtags, config)
+            if success:
+                logger.info(
+                    "Finished AND search for %s",
+                    " + ".join(f"#{h}" for h in hashtags),
+                )
+            else:
+                logger.warning("Insufficient posts matching all tags")
+        except KeyboardInterrupt:
+            logger.info("Interrupted by user")
+            sys.exit(130)
+        except instaloader.QueryReturnedNotFoundException as exc:
+            logger.warning("Hashtag not found: %s", exc)
+        return
+
+    # File-based independent crawls shared out across pool accounts
+    if pool is not None and len(hashtags) > 1:
+        logger.info("Crawling %d hashtags with %d accounts", len(hashtags), len(pool))
+        try:
+            results = crawl_pooled(pool, hashtags, config)
+        except KeyboardInterrupt:
+            logger.info("Interrupted by user")
+            sys.exit(130)
+        logger.info("Crawled %d/%d hashtags successfully", sum(results.values()), len(results))
+        return
+
+    # File-based independent crawls on a worker pool
+    if workers > 1 and len(hashtags) > 1:
+        workers = min(workers, len(hashtags))
+        logger.info("Crawling %d hashtags with %d workers", len(hashtags), workers)
+        loaders = [loader] + [clone_loader(loader, limiter) for _ in range(workers - 1)]
+        try:
+            results = crawl_concurrent(loaders, hashtags, config)
+        except KeyboardInterrupt:
+            logger.info("Interrupted by user")
+            sys.exit(130)
+        logger.info("Crawled %d/%d hashtags successfully", sum(results.values()), len(results))
+        return
+
+    # Single-tag or file-based independent crawls
+    for hashtag in hashtags:
+        logger.info("Crawling #%s", hashtag)
+        try:
+            success = crawl(loader, hashtag, config)
+            if success:
+                logger.info("Finished #%s", hashtag)
+            else:
+                logger.warning("Insufficient posts for #%s", hashtag)
+        except KeyboardInterrupt:
+            logger.info("Interrupted by user")
+            sys.exit(130)
+        except instaloader.QueryReturnedNotFoundException:
+            logger.warning("Hashtag #%s not found, skipping", hashtag)
+
+
+def _finish_run(config: CrawlConfig) -> None:
+    """Log the run summary and release resources shared across crawls."""
+    if config.rate_limiter is not None:
+        config.rate_limiter.log_stats()
+    if config.profile_cache is not None:
+        config.profile_cache.log_stats()
+        config.profile_cache.close()
+    if config.post_index is not None:
+        config.post_index.log_stats()
+        config.post_index.close()
+    if config.store is not None:
+        logger.info("Store %s holds %d posts", config.store.path, len(config.store))
+        config.store.close()
@@ -0,0 +1,250 @@
+"""Long-running scheduler that keeps hashtags refreshed with incremental crawls.
+
+One logged-in loader is reused for every crawl, so login and connection
+setup are paid once per process instead of once per cron invocation.
+Each round the most deserving due hashtag is crawled: tags are due once
+their refresh interval has passed, and among due tags the stalest ones
+with the most new posts per hour go first.  A rolling hourly request
+budget caps the load across all crawls.
+"""
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import json
+import logging
+import math
+import re
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import instaloader
+
+from instagram_hashtag_crawler.crawler import CrawlConfig, CrawlStats, crawl
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest crawl in a tag's smoothed post velocity.
+VELOCITY_SMOOTHING = 0.5
+
+# Longest sleep between checks for due tags, in seconds.
+MAX_IDLE = 60.0
+
+# Seconds before a tag whose crawl failed is tried again (at most its interval).
+RETRY_DELAY = 300.0
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)([smhd]?)")
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> float:
+    """Parse ``90``, ``30s``, ``15m``, ``6h`` or ``1d`` into seconds."""
+    match = _DURATION.fullmatch(text.strip().lower())
+    if match is None or float(match.group(1)) <= 0:
+        msg = f"Invalid duration {text!r}; use e.g. 900, 15m, 6h or 1d"
+        raise ValueError(msg)
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+@dataclasses.dataclass
+class TagSchedule:
+    """A scheduled hashtag and what the scheduler has learned about it."""
+
+    hashtag: str
+    interval: float  # seconds between refreshes
+    last_crawl: float | None = None  # wall-clock time of the last successful crawl
+    velocity: float = 0.0  # smoothed new posts per hour
+    retry_at: float = 0.0  # no retry before this time after a failed crawl
+
+    def staleness(self, now: float) -> float:
+        """Return how many refresh intervals have passed since the last crawl."""
+        if self.last_crawl is None:
+            return math.inf
+        return (now - self.last_crawl) / self.interval
+
+    def due_at(self) -> float:
+        """Return the wall-clock time from which the tag is due."""
+        due = 0.0 if self.last_crawl is None else self.last_crawl + self.interval
+        return max(due, self.retry_at)
+
+    def priority(self, now: float) -> float:
+        # Busy tags lose more posts to staleness, so they go first among due tags
+        return self.staleness(now) * (1 + math.log1p(self.velocity))
+
+
+def load_schedule(path: Path, default_interval: float) -> list[TagSchedule]:
+    """Read a schedule file: one hashtag per line, optionally followed by its interval.
+
+    Hashtags are written without ``#``, which starts a comment; blank
+    lines are ignored, e.g.::
+
+        food 1h
+        pizza       # refreshed every default_interval
+    """
+    tags = []
+    for number, line in enumerate(path.read_text().splitlines(), 1):
+        fields = line.split("#", 1)[0].split()
+        if not fields:
+            continue
+        if len(fields) > 2:
+            msg = f"{path}:{number}: expected 'hashtag [interval]', got {line.strip()!r}"
+            raise ValueError(msg)
+        interval = parse_duration(fields[1]) if len(fields) == 2 else default_interval
+        tags.append(TagSchedule(fields[0].lower(), interval))
+    return tags
+
+
+class Scheduler:
+    """Run incremental crawls of scheduled hashtags on one loader.
+
+    *config* is used for every crawl with ``incremental`` forced on.
+    *hourly_requests* (needs ``config.rate_limiter`` to count requests)
+    caps the requests of all crawls in any rolling hour.  A crawl is
+    started only with budget left and charged when it finishes, so the
+    budget can be overshot by one crawl (bounded by ``max_posts``):
+    stopping an incremental crawl midway would leave a gap below the
+    posts it already saved.  *relogin* is called when Instagram reports
+    the session as logged out or flagged; without it, the
+    ``LoginRequiredException`` or ``AbortDownloadException`` is raised.
+    Any other error fails only the tag's crawl: its last crawl time and
+    velocity are left alone, and it is retried after :data:`RETRY_DELAY`.
+
+    The tags' last crawl times and velocities are saved to
+    *state_path*, so a restarted scheduler resumes where it left off.
+    """
+
+    def __init__(
+        self,
+        loader: instaloader.Instaloader,
+        tags: list[TagSchedule],
+        config: CrawlConfig,
+        *,
+        hourly_requests: int | None = None,
+        state_path: Path | None = None,
+        relogin: Callable[[], None] | None = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.loader = loader
+        self.tags = {tag.hashtag: tag for tag in tags}
+        self.config = dataclasses.replace(config, incremental=True)
+        self.hourly_requests = hourly_requests
+        self.state_path = state_path
+        self.relogin = relogin
+        self.clock = clock
+        self.sleep = sleep
+        self.crawls = 0
+        # (time, requests) of the crawls in the current budget window
+        self._spent: collections.deque[tuple[float, int]] = collections.deque()
+        self._load_state()
+
+    def next_tag(self, now: float) -> TagSchedule | None:
+        """Return the due tag with the highest priority, or None if none is due."""
+        due = [tag for tag in self.tags.values() if now >= tag.due_at()]
+        return max(due, key=lambda tag: (tag.priority(now), tag.hashtag), default=None)
+
+    def remaining_budget(self, now: float) -> int | None:
+        if self.hourly_requests is None:
+            return None
+        while self._spent and self._spent[0][0] <= now - 3600:
+            self._spent.popleft()
+        return self.hourly_requests - sum(requests for _, requests in self._spent)
+
+    def run_once(self) -> float:
+        """Crawl the next due tag if the budget allows.
+
+        Returns how long to wait before the next call: 0 after a crawl,
+        otherwise until the next tag is due or budget frees up.
+        """
+        now = self.clock()
+        tag = self.next_tag(now)
+        if tag is None:
+            return self._idle_time(now)
+        budget = self.remaining_budget(now)
+        if budget is not None and budget <= 0:
+            return min(self._spent[0][0] + 3600 - now, MAX_IDLE)
+
+        self._crawl(tag)
+        self._save_state()
+        return 0.0
+
+    def run(self, max_crawls: int | None = None) -> None:
+        """Crawl due tags until interrupted (or *max_crawls* crawls have run)."""
+        logger.info("Scheduling %d hashtags", len(self.tags))
+        while max_crawls is None or self.crawls < max_crawls:
+            wait = self.run_once()
+            if wait > 0:
+                self.sleep(wait)
+
+    def _crawl(self, tag: TagSchedule) -> None:
+        stats = CrawlStats(tag.hashtag)
+        logger.info("Refreshing #%s (velocity %.1f posts/h)", tag.hashtag, tag.velocity)
+        failed = False
+        retry_delay = 0.0
+        try:
+            crawl(self.loader, tag.hashtag, self.config, stats)
+        except (instaloader.LoginRequiredException, instaloader.AbortDownloadException) as exc:
+            # A session logged out (or flagged with checkpoint_required) midway
+            # raises AbortDownloadException; LoginRequiredException means it
+            # was never logged in
+            logger.warning("Session logged out while crawling #%s: %s", tag.hashtag, exc)
+            if self.relogin is None:
+                raise
+            self.relogin()
+            # Logged in again, so the tag can be retried right away
+            failed = True
+        except instaloader.QueryReturnedNotFoundException:
+            logger.warning("Hashtag #%s not found", tag.hashtag)
+        except instaloader.ConnectionException as exc:
+            logger.warning("Crawl of #%s failed: %s", tag.hashtag, exc)
+            failed = True
+            retry_delay = min(RETRY_DELAY, tag.interval)
+        except Exception:
+            # e.g. an unreadable output file; the other tags keep their schedule
+            logger.exception("Crawl of #%s failed", tag.hashtag)
+            failed = True
+            retry_delay = min(RETRY_DELAY, tag.interval)
+
+        finished = self.clock()
+        self.crawls += 1
+        self._spent.append((finished, stats.requests))
+        if failed:
+            # An incomplete crawl says nothing about the tag's velocity, and
+            # the tag stays due until a crawl succeeds
+            tag.retry_at = finished + retry_delay
+            return
+        if tag.last_crawl is not None and finished > tag.last_crawl:
+            rate = stats.kept / ((finished - tag.last_crawl) / 3600)
+            tag.velocity += VELOCITY_SMOOTHING * (rate - tag.velocity)
+        tag.last_crawl = finished
+
+    def _idle_time(self, now: float) -> float:
+        due_in = [tag.due_at() - now for tag in self.tags.values()]
+        return max(min(min(due_in, default=MAX_IDLE), MAX_IDLE), 0.0)
+
+    def _load_state(self) -> None:
+        if self.state_path is None or not self.state_path.exists():
+            return
+        try:
+            state = json.loads(self.state_path.read_text())
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable schedule state %s (%s)", self.state_path, exc)
+            return
+        for hashtag, saved in state.items():
+            tag = self.tags.get(hashtag)
+            if tag is not None:
+                tag.last_crawl = saved["last_crawl"]
+                tag.velocity = saved["velocity"]
+
+    def _save_state(self) -> None:
+        if self.state_path is None:
+            return
+        state = {
+            tag.hashtag: {"last_crawl": tag.last_crawl, "velocity": tag.velocity}
+            for tag in self.tags.values()
+        }
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2))
+        tmp_path.replace(self.state_path)
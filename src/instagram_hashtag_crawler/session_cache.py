@@ -0,0 +1,110 @@
+"""Local cache of verified login sessions.
+
+Checking a restored session with ``test_login`` costs a round trip on
+every start, and extracting browser cookies means decrypting the
+browser's cookie database.  :class:`SessionCache` records when each
+session file was last verified, so a session verified within the TTL is
+trusted without a network check, and keeps the cookies extracted from a
+browser in an instaloader session file for later runs to load.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Seconds a verified session is trusted without another test_login.
+SESSION_CACHE_TTL = 3600
+
+_VERIFIED_NAME = "verified.json"
+
+
+def default_cache_dir() -> Path:
+    """Return ``$XDG_CACHE_HOME/instagram-hashtag-crawler`` (``~/.cache`` by default)."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "instagram-hashtag-crawler"
+
+
+class SessionCache:
+    """Verification times of session files, and cached browser sessions.
+
+    A session counts as verified until *ttl* seconds have passed or its
+    file changes (by modification time), whichever comes first.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl: float = SESSION_CACHE_TTL,
+        *,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.clock = clock
+
+    def username(self, session_file: Path) -> str | None:
+        """Return the username *session_file* was last verified for, however long ago."""
+        entry = self._load().get(_key(session_file))
+        return None if entry is None else entry["username"]
+
+    def verified(self, session_file: Path) -> str | None:
+        """Return the username *session_file* was verified for, if still fresh."""
+        entry = self._load().get(_key(session_file))
+        if entry is None or self.clock() - entry["verified_at"] >= self.ttl:
+            return None
+        try:
+            if session_file.stat().st_mtime_ns != entry["mtime_ns"]:
+                return None
+        except OSError:
+            return None
+        return entry["username"]
+
+    def mark_verified(self, session_file: Path, username: str) -> None:
+        """Record that *session_file* was just verified as logged in as *username*."""
+        entries = self._load()
+        entries[_key(session_file)] = {
+            "username": username,
+            "verified_at": self.clock(),
+            "mtime_ns": session_file.stat().st_mtime_ns,
+        }
+        self._save(entries)
+
+    def forget(self, session_file: Path) -> None:
+        entries = self._load()
+        if entries.pop(_key(session_file), None) is not None:
+            self._save(entries)
+
+    def browser_session_file(self, browser: str, cookie_file: str | None) -> Path:
+        """Return where the session extracted from *browser* (and *cookie_file*) is cached."""
+        digest = hashlib.sha256((cookie_file or "").encode()).hexdigest()[:12]
+        return self.directory / f"browser-{browser.lower()}-{digest}.session"
+
+    def _load(self) -> dict[str, Any]:
+        path = self.directory / _VERIFIED_NAME
+        try:
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable session cache %s (%s)", path, exc)
+            return {}
+
+    def _save(self, entries: dict[str, Any]) -> None:
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path = self.directory / _VERIFIED_NAME
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(entries, indent=2))
+        tmp_path.replace(path)
+
+
+def _key(session_file: Path) -> str:
+    return str(session_file.resolve())
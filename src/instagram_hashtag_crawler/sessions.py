@@ -0,0 +1,256 @@
+"""Pool of logged-in sessions that share out independent hashtag crawls.
+
+One account's rate limit caps what a single session can crawl, so the
+pool spreads hashtags across several accounts, each with its own loader
+and :class:`RateLimiter`; aggregate throughput grows with the number of
+healthy sessions.  Each session's recent 429s and connection failures
+are tracked, and a session collecting too many is quarantined for a
+cooldown before it gets more work.
+"""
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import instaloader
+
+from instagram_hashtag_crawler.crawler import CrawlConfig, CrawlStoppedError, crawl
+from instagram_hashtag_crawler.ratelimit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Seconds a 429 or failure counts against a session's health.
+HEALTH_WINDOW = 600.0
+
+# Strikes within HEALTH_WINDOW that put a session in quarantine.
+QUARANTINE_STRIKES = 3
+
+# First quarantine of a session, in seconds; doubled for each further
+# quarantine without a clean crawl in between, up to MAX_COOLDOWN.
+QUARANTINE_COOLDOWN = 900.0
+MAX_COOLDOWN = 4 * 3600.0
+
+
+class NoSessionsError(RuntimeError):
+    """Raised when every session in a pool has been logged out."""
+
+
+@dataclasses.dataclass(eq=False)
+class Session:
+    """A logged-in loader with its own rate limiter and health record."""
+
+    name: str
+    loader: instaloader.Instaloader
+    limiter: RateLimiter
+    crawls: int = 0
+    failures: int = 0
+    quarantines: int = 0  # consecutive, reset by a clean crawl
+    quarantined_until: float = 0.0
+    logged_out: bool = False
+    busy: bool = False
+    # Times of recent 429s and failures
+    strikes: collections.deque[float] = dataclasses.field(default_factory=collections.deque)
+    _throttles_at_checkout: int = 0
+
+    def available(self, now: float) -> bool:
+        return not self.busy and not self.logged_out and now >= self.quarantined_until
+
+
+class SessionPool:
+    """Hand out sessions to crawl workers, one worker per session at a time.
+
+    :meth:`acquire` blocks until a session is idle and not quarantined,
+    preferring the one with the fewest recent strikes.  :meth:`release`
+    charges the session with the 429s its limiter recorded during the
+    lease, plus one strike for a failed crawl; *strikes* of them within
+    *window* seconds quarantine it for *cooldown* seconds.  A logged-out
+    session is retired for the rest of the run.
+    """
+
+    def __init__(
+        self,
+        sessions: list[Session],
+        *,
+        strikes: int = QUARANTINE_STRIKES,
+        window: float = HEALTH_WINDOW,
+        cooldown: float = QUARANTINE_COOLDOWN,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not sessions:
+            msg = "SessionPool requires at least one session"
+            raise ValueError(msg)
+        self.sessions = sessions
+        self.max_strikes = strikes
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+        self._changed = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def acquire(self) -> Session:
+        """Wait for an available session and mark it busy.
+
+        Raises :class:`NoSessionsError` once every session is logged out.
+        """
+        with self._changed:
+            while True:
+                now = self.clock()
+                if all(session.logged_out for session in self.sessions):
+                    msg = "Every session in the pool has been logged out"
+                    raise NoSessionsError(msg)
+                ready = [session for session in self.sessions if session.available(now)]
+                if ready:
+                    session = min(ready, key=lambda s: (self._recent_strikes(s, now), s.crawls))
+                    session.busy = True
+                    session._throttles_at_checkout = session.limiter.throttles
+                    return session
+                cooldowns = [
+                    session.quarantined_until - now
+                    for session in self.sessions
+                    if not session.busy and not session.logged_out
+                ]
+                # Wake up when a quarantine ends, or when a busy session is released
+                self._changed.wait(min(cooldowns) if cooldowns else None)
+
+    def release(self, session: Session, *, failed: bool = False, logged_out: bool = False) -> None:
+        """Return *session* to the pool, updating its health."""
+        with self._changed:
+            now = self.clock()
+            throttles = session.limiter.throttles - session._throttles_at_checkout
+            session.crawls += 1
+            session.failures += failed
+            session.strikes.extend([now] * (throttles + failed))
+            if logged_out:
+                session.logged_out = True
+                logger.warning("Session %s is logged out; retiring it", session.name)
+            elif self._recent_strikes(session, now) >= self.max_strikes:
+                cooldown = min(self.cooldown * 2**session.quarantines, MAX_COOLDOWN)
+                session.quarantines += 1
+                session.quarantined_until = now + cooldown
+                session.strikes.clear()
+                logger.warning(
+                    "Session %s throttled or failing; quarantined for %.0fs", session.name, cooldown
+                )
+            elif not throttles and not failed:
+                session.quarantines = 0
+            session.busy = False
+            self._changed.notify_all()
+
+    def healthy(self) -> int:
+        """Return how many sessions are neither quarantined nor logged out."""
+        now = self.clock()
+        with self._changed:
+            return sum(
+                not session.logged_out and now >= session.quarantined_until
+                for session in self.sessions
+            )
+
+    def log_stats(self) -> None:
+        for session in self.sessions:
+            logger.info(
+                "Session %s: %d crawls, %d requests, %d throttled requests, %d failures%s",
+                session.name,
+                session.crawls,
+                session.limiter.requests,
+                session.limiter.throttles,
+                session.failures,
+                " (logged out)" if session.logged_out else "",
+            )
+
+    def _recent_strikes(self, session: Session, now: float) -> int:
+        while session.strikes and session.strikes[0] <= now - self.window:
+            session.strikes.popleft()
+        return len(session.strikes)
+
+
+def crawl_pooled(
+    pool: SessionPool,
+    hashtags: list[str],
+    config: CrawlConfig,
+    *,
+    attempts: int = 3,
+) -> dict[str, bool]:
+    """Crawl independent hashtags concurrently, one worker per pool session.
+
+    Each hashtag is crawled on a session borrowed from *pool*, with that
+    session's limiter in place of ``config.rate_limiter``.  A crawl
+    that fails with a connection error, or on a session that is logged
+    out or flagged (``AbortDownloadException``), is retried on another
+    session, resuming from its checkpoint, up to *attempts* times in
+    total.
+
+    On ``KeyboardInterrupt`` the running crawls are stopped through
+    ``config.stop`` and waited for, so they save their checkpoints
+    before the caller closes shared caches and stores.
+
+    Returns a mapping of hashtag to the :func:`crawl` result.
+    """
+    stop = config.stop or threading.Event()
+    config = dataclasses.replace(config, stop=stop)
+
+    def worker(hashtag: str) -> bool:
+        for attempt in range(attempts):
+            try:
+                session = pool.acquire()
+            except NoSessionsError as exc:
+                logger.error("Cannot crawl #%s: %s", hashtag, exc)
+                return False
+            failed = logged_out = False
+            session_config = dataclasses.replace(
+                config, rate_limiter=session.limiter, resume=config.resume or attempt > 0
+            )
+            try:
+                logger.info("Crawling #%s as %s", hashtag, session.name)
+                success = crawl(session.loader, hashtag, session_config)
+            except instaloader.QueryReturnedNotFoundException:
+                logger.warning("Hashtag #%s not found, skipping", hashtag)
+                return False
+            except CrawlStoppedError:
+                logger.info("Stopped #%s", hashtag)
+                return False
+            except (instaloader.LoginRequiredException, instaloader.AbortDownloadException) as exc:
+                # A logged-in session that is logged out or flagged
+                # (checkpoint_required) raises AbortDownloadException
+                logger.warning("Session %s is unusable: %s", session.name, exc)
+                logged_out = True
+                continue
+            except instaloader.ConnectionException as exc:
+                failed = True
+                logger.warning("Crawl of #%s as %s failed: %s", hashtag, session.name, exc)
+                continue
+            except Exception:
+                logger.exception("Crawl of #%s failed", hashtag)
+                return False
+            finally:
+                pool.release(session, failed=failed, logged_out=logged_out)
+
+            if success:
+                logger.info("Finished #%s", hashtag)
+            else:
+                logger.warning("Insufficient posts for #%s", hashtag)
+            return success
+
+        logger.error("Giving up on #%s after %d attempts", hashtag, attempts)
+        return False
+
+    results: dict[str, bool] = {}
+    executor = ThreadPoolExecutor(max_workers=len(pool), thread_name_prefix="crawl")
+    try:
+        futures = {hashtag: executor.submit(worker, hashtag) for hashtag in hashtags}
+        for hashtag, future in futures.items():
+            results[hashtag] = future.result()
+    except KeyboardInterrupt:
+        logger.info("Interrupted; waiting for running crawls to save their checkpoints")
+        stop.set()
+        executor.shutdown(cancel_futures=True)
+        raise
+    executor.shutdown()
+    return results
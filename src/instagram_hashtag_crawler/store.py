@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Posts written per transaction by the crawler's store sink.
+STORE_BATCH_SIZE = 500
+
+# Profile columns, as named in post records.
+PROFILE_COLUMNS = (
+    "username",
+    "full_name",
+    "profile_pic_url",
+    "media_count",
+    "follower_count",
+    "following_count",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    shortcode TEXT PRIMARY KEY,
+    owner_id INTEGER,
+    date INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_owner_id ON posts (owner_id);
+CREATE INDEX IF NOT EXISTS posts_date ON posts (date);
+CREATE TABLE IF NOT EXISTS profiles (
+    owner_id INTEGER PRIMARY KEY,
+    username TEXT,
+    full_name TEXT,
+    profile_pic_url TEXT,
+    media_count INTEGER,
+    follower_count INTEGER,
+    following_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS post_tags (
+    tag TEXT NOT NULL,
+    shortcode TEXT NOT NULL,
+    PRIMARY KEY (tag, shortcode)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS post_tags_shortcode ON post_tags (shortcode);
+"""
+
+# Later crawls of a post are merged into its record by add_posts, so a crawl
+# with fewer fields does not erase what an earlier one wrote.  (json_patch
+# would delete the fields a recrawl found null instead of storing the null.)
+_UPSERT_POST = """
+INSERT INTO posts (shortcode, owner_id, date, record) VALUES (?, ?, ?, ?)
+ON CONFLICT (shortcode) DO UPDATE SET
+    owner_id = excluded.owner_id,
+    date = excluded.date,
+    record = excluded.record
+"""
+
+_UPSERT_PROFILE = f"""
+INSERT INTO profiles (owner_id, {", ".join(PROFILE_COLUMNS)})
+VALUES (?, {", ".join("?" for _ in PROFILE_COLUMNS)})
+ON CONFLICT (owner_id) DO UPDATE SET
+    {", ".join(f"{column} = excluded.{column}" for column in PROFILE_COLUMNS)}
+"""
+
+
+class PostStore:
+    """SQLite store of crawled posts, their owners' profiles and hashtags.
+
+    An alternative to per-hashtag JSON output: posts are upserted by
+    shortcode, owner profiles by owner ID, and the ``post_tags`` join
+    table records every hashtag a post was crawled under.  Posts are
+    indexed by owner, date and hashtag, so consumers can select posts
+    without parsing every crawl.
+
+    The store is safe to share between crawler threads.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(
+            "PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL;" + _SCHEMA
+        )
+
+    def add_posts(self, hashtags: Iterable[str], posts: Iterable[dict[str, Any]]) -> int:
+        """Upsert *posts* found under each of *hashtags* in one transaction.
+
+        Reference records (``seen_in``, written for posts already saved
+        under another hashtag) only add their hashtags.  Returns the
+        number of posts written.
+        """
+        hashtags = list(hashtags)
+        post_rows = []
+        profile_rows = []
+        tag_rows = []
+        for post in posts:
+            tag_rows += [(tag, post["shortcode"]) for tag in hashtags]
+            if "seen_in" in post:
+                continue
+            owner_id = _int_or_none(post.get("user_id"))
+            post_rows.append((post["shortcode"], owner_id, post["date"], post))
+            if owner_id is not None and all(column in post for column in PROFILE_COLUMNS):
+                profile_rows.append((owner_id, *(post[column] for column in PROFILE_COLUMNS)))
+
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT_POST, self._merged(post_rows))
+            self._conn.executemany(_UPSERT_PROFILE, profile_rows)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO post_tags (tag, shortcode) VALUES (?, ?)", tag_rows
+            )
+        return len(post_rows)
+
+    def _merged(self, post_rows: list[tuple[Any, ...]]) -> list[tuple[Any, ...]]:
+        """Return *post_rows* with each post merged over its stored record.
+
+        Fields the new post has replace the stored ones, null included;
+        fields it lacks are kept.
+        """
+        records: dict[str, dict[str, Any]] = {}
+        rows = []
+        for shortcode, owner_id, date, post in post_rows:
+            record = records.get(shortcode)
+            if record is None:
+                stored = self._conn.execute(
+                    "SELECT record FROM posts WHERE shortcode = ?", (shortcode,)
+                ).fetchone()
+                record = json.loads(stored[0]) if stored is not None else {}
+            records[shortcode] = record = {**record, **post}
+            rows.append((shortcode, owner_id, date, json.dumps(record, default=str)))
+        return rows
+
+    def high_water_mark(self, hashtag: str) -> tuple[int, set[str], int] | None:
+        """Return ``(newest_date, shortcodes at that date, post count)`` for *hashtag*.
+
+        Returns None if no post has been stored under *hashtag*.
+        """
+        with self._lock:
+            newest, count = self._conn.execute(
+                "SELECT MAX(p.date), COUNT(*) FROM post_tags t "
+                "JOIN posts p ON p.shortcode = t.shortcode WHERE t.tag = ?",
+                (hashtag,),
+            ).fetchone()
+            if not count:
+                return None
+            rows = self._conn.execute(
+                "SELECT p.shortcode FROM post_tags t "
+                "JOIN posts p ON p.shortcode = t.shortcode WHERE t.tag = ? AND p.date = ?",
+                (hashtag, newest),
+            ).fetchall()
+        return newest, {row[0] for row in rows}, count
+
+    def newest_date(self) -> int | None:
+        with self._lock:
+            return self._conn.execute("SELECT MAX(date) FROM posts").fetchone()[0]
+
+    def iter_posts(
+        self,
+        *,
+        tags: Iterable[str] | None = None,
+        since: int | None = None,
+        until: int | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield stored posts, newest first, optionally filtered.
+
+        *tags* keeps posts crawled under any of the given hashtags, and
+        *since*/*until* bound the post date (inclusive).  Profile fields a
+        post was saved without are filled in from the owner's stored
+        profile.
+        """
+        where = []
+        params: list[Any] = []
+        if tags is not None:
+            tags = list(tags)
+            where.append(
+                "p.shortcode IN (SELECT shortcode FROM post_tags "
+                f"WHERE tag IN ({', '.join('?' for _ in tags)}))"
+            )
+            params += tags
+        if since is not None:
+            where.append("p.date >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("p.date <= ?")
+            params.append(until)
+        sql = (
+            f"SELECT p.record, {', '.join(f'pr.{column}' for column in PROFILE_COLUMNS)} "
+            "FROM posts p LEFT JOIN profiles pr ON pr.owner_id = p.owner_id"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.date DESC, p.shortcode"
+
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for record, *profile in rows:
+                post = json.loads(record)
+                if profile[0] is not None:
+                    for column, value in zip(PROFILE_COLUMNS, profile, strict=True):
+                        post.setdefault(column, value)
+                yield post
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def parse_store_url(url: str) -> Path:
+    """Return the database path of a ``sqlite:PATH`` store URL."""
+    scheme, _, path = url.partition(":")
+    if scheme != "sqlite" or not path:
+        msg = f"Unsupported store {url!r}; use sqlite:PATH"
+        raise ValueError(msg)
+    return Path(path)
+
+
+def _int_or_none(value: Any) -> int | None:
+    return None if value is None or value == "" else int(value)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import instaloader
+import pytest
+
+from benchmarks.fake_instagram import BackendConfig, FakeHashtag, FakeInstagram
+from benchmarks.run import run_scenario
+from benchmarks.startup import ENTRY_POINTS, HEAVY_MODULES, profile_import
+
+OPTIONS = {
+    "max_posts": 200,
+    "output_format": "jsonl",
+    "profile_workers": 2,
+    "profile_batch": 24,
+    "rate_limit": 1_000_000.0,
+    "max_backoff": 0.0,
+    "export_workers": 1,
+}
+
+
+def test_fake_feed_is_deterministic_and_paged() -> None:
+    config = BackendConfig(posts_per_tag=120, page_size=50)
+    first = [p.shortcode for p in FakeHashtag(FakeInstagram(config), "food").get_posts_resumable()]
+    backend = FakeInstagram(config)
+    second = [p.owner_id for p in FakeHashtag(backend, "food").get_posts_resumable()]
+
+    assert first == [f"food-{i}" for i in range(120)]
+    assert len(set(second)) < 120  # owners repeat
+    assert backend.stats.feed_pages == 3
+
+
+def test_fake_backend_throttles_in_bursts() -> None:
+    backend = FakeInstagram(BackendConfig(burst_every=3, burst_length=1))
+    for _ in range(3):
+        backend.fetch_profile(1)
+    with pytest.raises(instaloader.TooManyRequestsException):
+        backend.fetch_profile(1)
+    backend.fetch_profile(1)
+    assert (backend.stats.profile_fetches, backend.stats.throttled) == (4, 1)
+
+
+@pytest.mark.parametrize("scenario", ["crawl", "crawl_multi_and", "export"])
+def test_run_scenario_reports_throughput(scenario: str) -> None:
+    config = BackendConfig(posts_per_tag=300, burst_every=40)
+    result = run_scenario(scenario, config, OPTIONS)
+
+    assert result.posts > 0
+    assert result.posts_per_sec > 0
+    assert result.peak_rss_mb > 0
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_points_defer_heavy_imports(module: str) -> None:
+    profile = profile_import(module)
+
+    assert profile.total_ms > 0
+    assert [name for name in HEAVY_MODULES if profile.imported(name)] == []
+
+
+def test_cli_starts_faster_than_instaloader_imports() -> None:
+    cli = profile_import("instagram_hashtag_crawler.cli")
+    instaloader_import = profile_import("instaloader")
+
+    assert instaloader_import.imported("requests")
+    # Loose bound: the deferred imports cost several times the CLI's own
+    assert cli.total_ms < instaloader_import.total_ms / 2
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import instaloader
+from instaloader import FrozenNodeIterator, NodeIterator
+
+from instagram_hashtag_crawler.checkpoint import Checkpoint
+
+
+def _frozen(best_before: float | None = None) -> FrozenNodeIterator:
+    if best_before is None:
+        best_before = (datetime.now() + timedelta(days=1)).timestamp()
+    return FrozenNodeIterator(
+        query_hash="abc",
+        query_variables={"tag_name": "food"},
+        query_referer=None,
+        context_username="me",
+        total_index=12,
+        best_before=best_before,
+        remaining_data={"edges": [], "page_info": {"has_next_page": True}},
+        first_node=None,
+        doc_id=None,
+    )
+
+
+def test_load_missing_returns_empty(tmp_path: Path) -> None:
+    checkpoint = Checkpoint.load(tmp_path / "food.checkpoint.json")
+    assert checkpoint.frozen is None
+    assert checkpoint.shortcodes == set()
+
+
+def test_save_and_load_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "food.checkpoint.json"
+    iterator = MagicMock(spec=NodeIterator)
+    iterator.freeze.return_value = _frozen()
+
+    checkpoint = Checkpoint(path, shortcodes={"B", "A"})
+    checkpoint.attach(iterator)
+    checkpoint.mark()
+    checkpoint.save()
+
+    assert json.loads(path.read_text())["shortcodes"] == ["A", "B"]
+    loaded = Checkpoint.load(path)
+    assert loaded.frozen == iterator.freeze.return_value
+    assert loaded.shortcodes == {"A", "B"}
+
+
+def test_attach_thaws_saved_state(tmp_path: Path) -> None:
+    frozen = _frozen()
+    checkpoint = Checkpoint(tmp_path / "c.json", frozen=frozen)
+    iterator = MagicMock(spec=NodeIterator)
+
+    checkpoint.attach(iterator)
+
+    iterator.thaw.assert_called_once_with(frozen)
+
+
+def test_attach_skips_expired_state(tmp_path: Path) -> None:
+    expired = _frozen(best_before=(datetime.now() - timedelta(hours=1)).timestamp())
+    checkpoint = Checkpoint(tmp_path / "c.json", frozen=expired)
+    iterator = MagicMock(spec=NodeIterator)
+
+    checkpoint.attach(iterator)
+
+    iterator.thaw.assert_not_called()
+
+
+def test_attach_tolerates_mismatching_state(tmp_path: Path) -> None:
+    checkpoint = Checkpoint(tmp_path / "c.json", frozen=_frozen())
+    iterator = MagicMock(spec=NodeIterator)
+    iterator.thaw.side_effect = instaloader.InvalidArgumentException(
+        "Mismatching resume information."
+    )
+
+    checkpoint.attach(iterator)
+
+    assert checkpoint.iterator is iterator
+
+
+def test_discard_removes_file(tmp_path: Path) -> None:
+    path = tmp_path / "c.json"
+    checkpoint = Checkpoint(path)
+    checkpoint.save()
+    assert path.exists()
+    checkpoint.discard()
+    assert not path.exists()
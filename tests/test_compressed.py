@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import gzip
+from pathlib import Path
+
+import pytest
+
+from instagram_hashtag_crawler.compressed import (
+    compression_of,
+    format_suffix,
+    open_text,
+    with_compression,
+)
+
+
+def test_suffix_helpers() -> None:
+    path = with_compression(Path("out/food.jsonl"), "gzip")
+    assert path == Path("out/food.jsonl.gz")
+    assert compression_of(path) == "gzip"
+    assert format_suffix(path) == ".jsonl"
+    assert format_suffix(Path("food.json")) == ".json"
+    assert compression_of(Path("food.json")) is None
+    assert with_compression(Path("food.json"), None) == Path("food.json")
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_open_text_round_trips_and_appends(tmp_path: Path, compression: str) -> None:
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    path = with_compression(tmp_path / "food.jsonl", compression)
+
+    with open_text(path, "w") as f:
+        f.write("first\n")
+    with open_text(path, "a") as f:
+        f.write("second\n")
+
+    with open_text(path) as f:
+        assert f.read() == "first\nsecond\n"
+    assert path.read_bytes()[:4] != b"firs"
+
+
+def test_gzip_output_is_standard_gzip(tmp_path: Path) -> None:
+    path = tmp_path / "food.json.gz"
+    with open_text(path, "w") as f:
+        f.write('{"posts": []}')
+
+    assert gzip.decompress(path.read_bytes()) == b'{"posts": []}'
@@ -1,20 +1,38 @@
 from __future__ import annotations
 
+import dataclasses
+import gzip
 import json
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 
+import instaloader
 import pytest
 
 from instagram_hashtag_crawler.crawler import (
     CrawlConfig,
+    CrawlStats,
+    CrawlStoppedError,
+    _and_scan_depth,
     _collect_posts,
+    _read_posts,
     _save_posts,
     crawl,
+    crawl_concurrent,
     crawl_multi_and,
+    crawl_query,
+    enrich,
 )
+from instagram_hashtag_crawler.filters import min_likes
+from instagram_hashtag_crawler.post_index import PostIndex
+from instagram_hashtag_crawler.profile_cache import ProfileCache, ProfileRecord
+from instagram_hashtag_crawler.query import parse
+from instagram_hashtag_crawler.ratelimit import RateLimiter
+from instagram_hashtag_crawler.store import PostStore
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -61,9 +79,14 @@ def _fake_hashtag_obj(posts: list[MagicMock], mediacount: int = 999) -> MagicMoc
     return ht
 
 
+def _same_loader(loader: MagicMock, _limiter: RateLimiter | None) -> MagicMock:
+    return loader  # mock loaders have no session to clone
+
+
 def _make_config(tmp_path: Path, **kwargs: Any) -> CrawlConfig:
     output_dir = tmp_path / "output"
     output_dir.mkdir(exist_ok=True)
+    kwargs.setdefault("worker_loader", _same_loader)
     return CrawlConfig(output_dir=output_dir, **kwargs)
 
 
@@ -164,6 +187,45 @@ def test_collect_posts_skips_non_image(
     assert result[0]["shortcode"] == "IMG"
 
 
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_includes_sidecars_and_videos_from_node(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Sidecar and video posts are written with the media fields of their feed node."""
+    mock_get_profile.return_value = _fake_profile()
+    sidecar = _fake_post("SIDE", ["food"], typename="GraphSidecar")
+    sidecar._node = {
+        "display_url": "https://example.com/cover.jpg",
+        "edge_sidecar_to_children": {
+            "edges": [
+                {"node": {"is_video": False, "display_url": "https://example.com/1.jpg"}},
+                {"node": {"is_video": True, "display_url": "https://example.com/2.jpg"}},
+            ]
+        },
+    }
+    video = _fake_post("VID", ["food"], typename="GraphVideo")
+    video._node = {"display_url": "https://example.com/thumb.jpg", "video_view_count": 1234}
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(
+        [sidecar, video, _fake_post("IMG", ["food"])]
+    )
+
+    config = _make_config(
+        tmp_path, media_types=frozenset({"GraphImage", "GraphSidecar", "GraphVideo"})
+    )
+    side_out, video_out, image_out = _collect_posts(MagicMock(), "food", config)
+
+    assert side_out["typename"] == "GraphSidecar"
+    # A video child without a URL in the node falls back to its thumbnail
+    assert side_out["media_urls"] == ["https://example.com/1.jpg", "https://example.com/2.jpg"]
+    assert side_out["video_view_count"] is None
+    assert video_out["media_urls"] == ["https://example.com/thumb.jpg"]
+    assert video_out["video_view_count"] == 1234
+    assert "typename" not in image_out
+
+
 @patch("instagram_hashtag_crawler.crawler._get_profile")
 @patch("instagram_hashtag_crawler.crawler.Hashtag")
 def test_collect_posts_respects_max_posts(
@@ -183,6 +245,153 @@ def test_collect_posts_respects_max_posts(
     assert len(result) == 3
 
 
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_stops_at_max_scanned(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """The scan cap counts every post read, including filtered ones."""
+    posts = [_fake_post(f"P{i}", ["food"] if i % 2 else ["other"]) for i in range(10)]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(posts)
+    mock_get_profile.return_value = _fake_profile()
+
+    config = _make_config(tmp_path, max_scanned=4)
+    stats = CrawlStats("food")
+    result = _collect_posts(
+        MagicMock(), "food", config, required_tags=frozenset({"food"}), stats=stats
+    )
+
+    assert [p["shortcode"] for p in result] == ["P1", "P3"]
+    assert (stats.scanned, stats.kept, stats.stop_reason) == (4, 2, "max_scanned")
+    assert stats.skipped == {"missing_tags": 2}
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_counts_skips_by_reason(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    posts = [
+        _fake_post("A", ["food"]),
+        _fake_post("A", ["food"]),
+        _fake_post("V", ["food"], typename="GraphVideo"),
+        _fake_post("B", ["food"]),
+    ]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(posts)
+    mock_get_profile.side_effect = lambda _loader, post, *_: (
+        _fake_profile() if post.shortcode == "A" else None
+    )
+
+    stats = CrawlStats("food")
+    _collect_posts(MagicMock(), "food", _make_config(tmp_path), stats=stats)
+
+    assert (stats.scanned, stats.matched, stats.kept) == (4, 2, 1)
+    assert stats.skipped == {"duplicate": 1, "media_type": 1, "no_profile": 1}
+    assert stats.exhausted
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_prefilters_before_profile_lookup(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Posts rejected by a configured filter never cost a profile fetch."""
+    popular = _fake_post("POP", ["food"])
+    popular._node = {"edge_media_preview_like": {"count": 500}}
+    unpopular = _fake_post("UNPOP", ["food"])
+    unpopular._node = {"edge_media_preview_like": {"count": 3}}
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([popular, unpopular])
+    mock_get_profile.return_value = _fake_profile()
+
+    config = _make_config(tmp_path, filters=(min_likes(100),))
+    stats = CrawlStats("food")
+    result = _collect_posts(MagicMock(), "food", config, stats=stats)
+
+    assert [p["shortcode"] for p in result] == ["POP"]
+    mock_get_profile.assert_called_once()
+    assert stats.skipped == {"min_likes": 1}
+
+
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_stops_at_request_budget(
+    mock_hashtag_cls: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Requests issued through the loader's context count against the budget."""
+    loader = MagicMock()
+    limiter = RateLimiter(1000.0, burst=100)
+
+    def paged_feed() -> Any:
+        for i in range(10):
+            if i % 2 == 0:  # one request per page of two posts
+                limiter.acquire(loader.context)
+            yield _fake_post(f"P{i}", ["food"])
+
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([])
+    mock_hashtag_cls.from_name.return_value.get_posts_resumable.return_value = paged_feed()
+    config = _make_config(
+        tmp_path, rate_limiter=limiter, request_budget=2, fields=frozenset({"shortcode"})
+    )
+    stats = CrawlStats("food")
+    result = _collect_posts(loader, "food", config, stats=stats)
+
+    # Reading P2 issued the second request; the budget is spent after it
+    assert len(result) == 3
+    assert (stats.requests, stats.stop_reason) == (2, "request_budget")
+
+
+@patch("instagram_hashtag_crawler.ratelimit.time")
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_retries_first_feed_page(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    mock_time: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Creating the feed iterator fetches page one, so it is retried like later pages."""
+    mock_get_profile.return_value = _fake_profile()
+    hashtag_obj = _fake_hashtag_obj([])
+    hashtag_obj.get_posts_resumable.side_effect = [
+        instaloader.TooManyRequestsException("429"),
+        iter([_fake_post("ABC", ["food"])]),
+    ]
+    mock_hashtag_cls.from_name.return_value = hashtag_obj
+
+    result = _collect_posts(MagicMock(), "food", _make_config(tmp_path))
+
+    assert [post["shortcode"] for post in result] == ["ABC"]
+    assert hashtag_obj.get_posts_resumable.call_count == 2
+    mock_time.sleep.assert_called_once()
+
+
+@patch("instagram_hashtag_crawler.crawler.time")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_stops_at_time_budget(
+    mock_hashtag_cls: MagicMock,
+    mock_time: MagicMock,
+    tmp_path: Path,
+) -> None:
+    clock = iter([0.0, 0.0, 5.0, 11.0])
+    mock_time.monotonic.side_effect = lambda: next(clock, 11.0)
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(
+        [_fake_post(f"P{i}", ["food"]) for i in range(10)]
+    )
+
+    config = _make_config(tmp_path, time_budget=10, fields=frozenset({"shortcode"}))
+    stats = CrawlStats("food")
+    result = _collect_posts(MagicMock(), "food", config, stats=stats)
+
+    assert len(result) == 2
+    assert stats.stop_reason == "time_budget"
+
+
 # ---------------------------------------------------------------------------
 # crawl (single hashtag — refactored to use _collect_posts)
 # ---------------------------------------------------------------------------
@@ -353,6 +562,126 @@ def test_crawl_multi_and_deduplicates_across_feeds(
     assert data["posts"][0]["shortcode"] == "SHARED"
 
 
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_multi_and_starts_from_rarest_tag(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A fully scanned rare feed makes scanning the broad feed unnecessary."""
+    mock_get_profile.return_value = _fake_profile()
+    pizza_posts = [_fake_post("A", ["food", "pizza"]), _fake_post("B", ["pizza"])]
+    food = _fake_hashtag_obj([_fake_post("C", ["food", "pizza"])], mediacount=1_000_000)
+    pizza = _fake_hashtag_obj(pizza_posts, mediacount=2)
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: food if name == "food" else pizza
+
+    config = _make_config(tmp_path)
+    assert crawl_multi_and(MagicMock(), ["food", "pizza"], config) is True
+
+    food.get_posts_resumable.assert_not_called()
+    data = json.loads((config.output_dir / "food_AND_pizza.json").read_text())
+    assert [p["shortcode"] for p in data["posts"]] == ["A"]
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_multi_and_caps_broad_feed_scan(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A broader feed is only scanned as deep as its estimated match rate needs."""
+    mock_get_profile.return_value = _fake_profile()
+    # The rare feed is truncated: 1 of its 2 returned posts match, out of 100
+    pizza = _fake_hashtag_obj(
+        [_fake_post("A", ["food", "pizza"]), _fake_post("B", ["pizza"])], mediacount=100
+    )
+    food_posts = [_fake_post(f"F{i}", ["food"]) for i in range(1000)]
+    food = _fake_hashtag_obj(food_posts, mediacount=10_000)
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: food if name == "food" else pizza
+
+    config = _make_config(tmp_path, max_posts=2)
+    crawl_multi_and(MagicMock(), ["food", "pizza"], config)
+
+    # ~50 matches expected in 10k posts, 49 unseen: one more takes ~205 posts, x2 slack
+    remaining = sum(1 for _ in food.get_posts_resumable.return_value)
+    assert 1000 - remaining == _and_scan_depth(50, 1, 1, 10_000) == 409
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_multi_and_truncated_rare_scan_does_not_skip_broad_feeds(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A rare feed cut short by max_scanned gives no grounds to skip the rest."""
+    mock_get_profile.return_value = _fake_profile()
+    pizza_posts = [_fake_post("B", ["pizza"]), _fake_post("C", ["pizza"])]
+    pizza = _fake_hashtag_obj([*pizza_posts, _fake_post("A", ["food", "pizza"])], mediacount=3)
+    food = _fake_hashtag_obj([_fake_post("F", ["food", "pizza"])], mediacount=1000)
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: food if name == "food" else pizza
+
+    config = _make_config(tmp_path, max_scanned=2)
+    assert crawl_multi_and(MagicMock(), ["food", "pizza"], config) is True
+
+    data = json.loads((config.output_dir / "food_AND_pizza.json").read_text())
+    assert [p["shortcode"] for p in data["posts"]] == ["F"]
+
+
+def test_and_scan_depth_skips_feeds_without_expected_yield() -> None:
+    assert _and_scan_depth(10, 10, 5, 1000) is None
+    assert _and_scan_depth(10, 0, 5, 0) is None
+    assert _and_scan_depth(1000, 0, 5000, 100) == 100
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_query_merges_feeds_and_filters_before_profiles(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """OR feeds are merged once; posts failing the query never cost a profile."""
+    mock_get_profile.return_value = _fake_profile()
+    shared = _fake_post("S", ["pizza", "pasta"])
+    feeds = {
+        "pizza": _fake_hashtag_obj(
+            [shared, _fake_post("A", ["pizza", "ad"]), _fake_post("B", ["pizza"])], mediacount=10
+        ),
+        "pasta": _fake_hashtag_obj([shared, _fake_post("C", ["pasta"])], mediacount=5),
+    }
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: feeds[name]
+
+    config = _make_config(tmp_path)
+    assert crawl_query(MagicMock(), parse("(pizza OR pasta) AND NOT ad"), config) is True
+
+    data = json.loads((config.output_dir / "pizza_OR_pasta_AND_NOT_ad-c16f00b4.json").read_text())
+    assert [p["shortcode"] for p in data["posts"]] == ["S", "C", "B"]  # pasta feed first
+    assert mock_get_profile.call_count == 3
+    assert sorted(c.args[1].shortcode for c in mock_get_profile.call_args_list) == ["B", "C", "S"]
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_query_and_reads_only_cheapest_feed(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    mock_get_profile.return_value = _fake_profile()
+    feeds = {
+        "food": _fake_hashtag_obj([_fake_post("F", ["food", "pizza"])], mediacount=1000),
+        "pizza": _fake_hashtag_obj([_fake_post("P", ["food", "pizza"])], mediacount=10),
+    }
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: feeds[name]
+
+    config = _make_config(tmp_path, min_posts=2)
+    assert crawl_query(MagicMock(), parse("food AND pizza"), config) is False
+    feeds["food"].get_posts_resumable.assert_not_called()
+
+
 # ---------------------------------------------------------------------------
 # _save_posts
 # ---------------------------------------------------------------------------
@@ -366,3 +695,804 @@ def test_save_posts_writes_json(tmp_path: Path) -> None:
 
     data = json.loads(output_file.read_text())
     assert data == {"posts": [{"shortcode": "A", "user_id": 1}]}
+
+
+# ---------------------------------------------------------------------------
+# crawl_concurrent
+# ---------------------------------------------------------------------------
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_concurrent_writes_one_file_per_tag(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Every hashtag gets its own JSON file when crawled on a pool."""
+    mock_get_profile.return_value = _fake_profile()
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: _fake_hashtag_obj(
+        [_fake_post(f"{name}1", [name])]
+    )
+
+    config = _make_config(tmp_path)
+    loaders = [MagicMock(), MagicMock()]
+    results = crawl_concurrent(loaders, ["food", "dish", "travel"], config)
+
+    assert results == {"food": True, "dish": True, "travel": True}
+    for name in ("food", "dish", "travel"):
+        data = json.loads((config.output_dir / f"{name}.json").read_text())
+        assert data["posts"][0]["shortcode"] == f"{name}1"
+
+
+@patch("instagram_hashtag_crawler.ratelimit.time")
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_concurrent_isolates_failures(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    _mock_time: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A failing hashtag is reported as False without stopping the others."""
+    mock_get_profile.return_value = _fake_profile()
+
+    def from_name_side_effect(_ctx: Any, name: str) -> MagicMock:
+        if name == "missing":
+            raise instaloader.QueryReturnedNotFoundException("404")
+        if name == "broken":
+            raise instaloader.ConnectionException("boom")
+        return _fake_hashtag_obj([_fake_post("OK", [name])])
+
+    mock_hashtag_cls.from_name.side_effect = from_name_side_effect
+
+    config = _make_config(tmp_path)
+    results = crawl_concurrent([MagicMock(), MagicMock()], ["missing", "broken", "food"], config)
+
+    assert results == {"missing": False, "broken": False, "food": True}
+    assert (config.output_dir / "food.json").exists()
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_stopped_crawl_keeps_partial_output_for_resume(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    stop = threading.Event()
+    config = _make_config(tmp_path, output_format="jsonl", profile_batch_size=1, stop=stop)
+
+    def get_profile(*_args: Any) -> MagicMock:
+        stop.set()
+        return _fake_profile()
+
+    mock_get_profile.side_effect = get_profile
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(
+        [_fake_post("A", ["food"]), _fake_post("B", ["food"])]
+    )
+
+    with pytest.raises(CrawlStoppedError):
+        crawl(MagicMock(), "food", config)
+
+    assert (config.output_dir / "food.jsonl.part").read_text().count("\n") == 1
+    assert (config.output_dir / "food.checkpoint.json").exists()
+
+
+def test_crawl_concurrent_waits_for_stopped_crawls_on_interrupt(tmp_path: Path) -> None:
+    """Running crawls are stopped and finish before the interrupt propagates."""
+    started = threading.Event()
+    finished = []
+
+    def fake_crawl(_loader: Any, hashtag: str, config: CrawlConfig) -> bool:
+        if hashtag == "food":
+            started.set()
+            assert config.stop.wait(5)
+            time.sleep(0.05)
+            finished.append(hashtag)
+            raise CrawlStoppedError(hashtag)
+        started.wait(5)
+        raise KeyboardInterrupt
+
+    with (
+        patch("instagram_hashtag_crawler.crawler.crawl", fake_crawl),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        crawl_concurrent([MagicMock(), MagicMock()], ["interrupt", "food"], _make_config(tmp_path))
+
+    assert finished == ["food"]
+
+
+# ---------------------------------------------------------------------------
+# profile caching
+# ---------------------------------------------------------------------------
+
+
+@patch("instagram_hashtag_crawler.crawler.Profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_profile_cache_hit_costs_no_request(
+    mock_hashtag_cls: MagicMock,
+    mock_profile_cls: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A cached owner is resolved without touching the post's lazy owner properties."""
+    post = _fake_post("A", ["food"])
+    for lazy in ("owner_username", "owner_profile"):
+        setattr(type(post), lazy, PropertyMock(side_effect=AssertionError(f"{lazy} read")))
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([post])
+    cache = ProfileCache()
+    cache.put(post.owner_id, ProfileRecord.from_profile(_fake_profile()))
+
+    result = _collect_posts(MagicMock(), "food", _make_config(tmp_path, profile_cache=cache))
+
+    assert result[0]["username"] == "testuser"
+    assert cache.hits == 1
+    mock_profile_cls.assert_not_called()
+    mock_profile_cls.from_id.assert_not_called()
+
+
+@patch("instagram_hashtag_crawler.crawler.Profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_profile_workers_fetch_through_their_own_loaders(
+    mock_hashtag_cls: MagicMock,
+    mock_profile_cls: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Profile worker threads never use the crawl loader's context."""
+    loader = MagicMock()
+    limiter = RateLimiter(1000.0, burst=100)
+    worker_loaders: list[MagicMock] = []
+
+    def make_worker_loader(parent: MagicMock, worker_limiter: RateLimiter | None) -> MagicMock:
+        assert (parent, worker_limiter) == (loader, limiter)
+        worker_loaders.append(MagicMock())
+        return worker_loaders[-1]
+
+    def from_id(context: MagicMock, _owner_id: int) -> MagicMock:
+        limiter.acquire(context)
+        return _fake_profile()
+
+    mock_profile_cls.from_id.side_effect = from_id
+    posts = [_fake_post(f"P{i}", ["food"]) for i in range(8)]
+    for i, post in enumerate(posts):
+        post.owner_id = i
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(posts)
+    config = _make_config(
+        tmp_path, profile_workers=2, rate_limiter=limiter, worker_loader=make_worker_loader
+    )
+    stats = CrawlStats("food")
+
+    result = _collect_posts(loader, "food", config, stats=stats)
+
+    assert len(result) == 8
+    assert 1 <= len(worker_loaders) <= 2
+    contexts = {call.args[0] for call in mock_profile_cls.from_id.call_args_list}
+    assert loader.context not in contexts
+    assert contexts <= {worker.context for worker in worker_loaders}
+    # The workers' profile requests count towards the crawl's request usage
+    assert stats.requests == 8
+
+
+@patch("instagram_hashtag_crawler.crawler.Profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_shared_profile_cache_avoids_refetch_across_crawls(
+    mock_hashtag_cls: MagicMock,
+    mock_profile_cls: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A profile fetched for one hashtag is reused for the next one."""
+    post_a = _fake_post("A", ["food"])
+    post_b = _fake_post("B", ["dish"])
+    post_b.owner_id = post_a.owner_id
+    mock_profile_cls.from_id.return_value = _fake_profile()
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: _fake_hashtag_obj(
+        [post_a] if name == "food" else [post_b]
+    )
+
+    config = _make_config(tmp_path, profile_cache=ProfileCache())
+    crawl(MagicMock(), "food", config)
+    crawl(MagicMock(), "dish", config)
+
+    assert config.profile_cache.hits == 1
+    assert config.profile_cache.misses == 1
+    data = json.loads((config.output_dir / "dish.json").read_text())
+    assert data["posts"][0]["username"] == "testuser"
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_post_index_reuses_posts_across_hashtags(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A post seen under an earlier hashtag is copied without a profile fetch."""
+    shared = _fake_post("A", ["food", "dish"])
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: _fake_hashtag_obj(
+        [shared] if name == "food" else [shared, _fake_post("B", ["dish"])]
+    )
+    mock_get_profile.return_value = _fake_profile()
+
+    config = _make_config(tmp_path, post_index=PostIndex())
+    crawl(MagicMock(), "food", config)
+    crawl(MagicMock(), "dish", config)
+
+    assert mock_get_profile.call_count == 2  # A once, B once
+    food = json.loads((config.output_dir / "food.json").read_text())
+    dish = json.loads((config.output_dir / "dish.json").read_text())
+    assert dish["posts"][0] == food["posts"][0]
+    assert config.post_index.reused == 1
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_post_index_writes_references(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """With post_refs, repeats point at the output holding the full post."""
+    shared = _fake_post("A", ["food", "dish"])
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([shared])
+    mock_get_profile.return_value = _fake_profile()
+
+    config = _make_config(tmp_path, post_index=PostIndex(), post_refs=True)
+    crawl(MagicMock(), "food", config)
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([shared])
+    crawl(MagicMock(), "dish", config)
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([shared])
+    crawl(MagicMock(), "food", config)
+
+    dish = json.loads((config.output_dir / "dish.json").read_text())
+    assert dish["posts"] == [
+        {"shortcode": "A", "user_id": shared.owner_id, "date": 1735689600, "seen_in": "food"}
+    ]
+    # Re-crawling the hashtag that owns the post keeps the full record
+    food = json.loads((config.output_dir / "food.json").read_text())
+    assert food["posts"][0]["username"] == "testuser"
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_post_index_skips_posts_of_unwritten_outputs(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A crawl that writes no output leaves nothing for later references to point at."""
+    shared = _fake_post("A", ["food", "dish"])
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([shared])
+    mock_get_profile.return_value = _fake_profile()
+
+    config = _make_config(tmp_path, post_index=PostIndex(), post_refs=True, min_posts=2)
+    assert not crawl(MagicMock(), "food", config)
+    assert len(config.post_index) == 0
+
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([shared])
+    assert crawl(MagicMock(), "dish", dataclasses.replace(config, min_posts=1))
+    dish = json.loads((config.output_dir / "dish.json").read_text())
+    assert dish["posts"][0]["username"] == "testuser"
+    assert config.post_index.get("A")[0] == "dish"
+
+
+# ---------------------------------------------------------------------------
+# JSON Lines streaming output
+# ---------------------------------------------------------------------------
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_jsonl_streams_one_post_per_line(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """jsonl output writes each post on its own line and drops the .part file."""
+    mock_get_profile.return_value = _fake_profile()
+    posts = [_fake_post(f"P{i}", ["food"]) for i in range(3)]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(posts)
+
+    config = _make_config(tmp_path, output_format="jsonl")
+    assert crawl(MagicMock(), "food", config) is True
+
+    output_file = config.output_dir / "food.jsonl"
+    lines = output_file.read_text().splitlines()
+    assert [json.loads(line)["shortcode"] for line in lines] == ["P0", "P1", "P2"]
+    assert not (config.output_dir / "food.jsonl.part").exists()
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_jsonl_keeps_partial_output_on_interrupt(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Posts written before an interruption survive in the .part file."""
+    mock_get_profile.return_value = _fake_profile()
+
+    def feed() -> Any:
+        yield _fake_post("FIRST", ["food"])
+        raise KeyboardInterrupt
+
+    hashtag_obj = MagicMock()
+    hashtag_obj.mediacount = 1
+    hashtag_obj.get_posts_resumable.return_value = feed()
+    mock_hashtag_cls.from_name.return_value = hashtag_obj
+
+    config = _make_config(tmp_path, output_format="jsonl", profile_batch_size=1)
+    with pytest.raises(KeyboardInterrupt):
+        crawl(MagicMock(), "food", config)
+
+    part_file = config.output_dir / "food.jsonl.part"
+    assert json.loads(part_file.read_text())["shortcode"] == "FIRST"
+    assert not (config.output_dir / "food.jsonl").exists()
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_jsonl_below_min_removes_partial(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    mock_get_profile.return_value = _fake_profile()
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([_fake_post("A", ["food"])])
+
+    config = _make_config(tmp_path, output_format="jsonl", min_posts=2)
+    assert crawl(MagicMock(), "food", config) is False
+    assert list(config.output_dir.iterdir()) == []
+
+
+def test_save_posts_writes_jsonl(tmp_path: Path) -> None:
+    posts = [{"shortcode": "A"}, {"shortcode": "B"}]
+    output_file = tmp_path / "test.jsonl"
+    _save_posts(posts, output_file)
+
+    assert [json.loads(line) for line in output_file.read_text().splitlines()] == posts
+
+
+def test_save_posts_compact_json(tmp_path: Path) -> None:
+    output_file = tmp_path / "test.json"
+    _save_posts([{"shortcode": "A", "date": 1}], output_file, compact=True)
+
+    assert output_file.read_text() == '{"posts":[{"shortcode":"A","date":1}]}'
+
+
+@pytest.mark.parametrize("output_format", ["json", "jsonl"])
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_writes_compressed_output(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+    output_format: str,
+) -> None:
+    """Compressed output is named for its codec and merged into by incremental crawls."""
+    mock_get_profile.return_value = _fake_profile()
+    config = _make_config(
+        tmp_path, output_format=output_format, compression="gzip", incremental=True
+    )
+
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([_dated_post("A", 1)])
+    assert crawl(MagicMock(), "food", config) is True
+    feed = [_dated_post("B", 2), _dated_post("A", 1)]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(feed)
+    assert crawl(MagicMock(), "food", config) is True
+
+    output_file = config.output_dir / f"food.{output_format}.gz"
+    assert sorted(p["shortcode"] for p in _read_posts(output_file)) == ["A", "B"]
+    assert b", " not in gzip.decompress(output_file.read_bytes())
+    assert {p.name for p in config.output_dir.iterdir()} == {
+        f"food.{output_format}.gz",
+        "food.index.json",
+    }
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_writes_to_store_incrementally(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """With a store, posts are upserted there and incremental crawls stop at stored posts."""
+    mock_get_profile.return_value = _fake_profile()
+    store = PostStore(tmp_path / "posts.db")
+    config = _make_config(tmp_path, store=store, incremental=True)
+
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([_dated_post("A", 1)])
+    assert crawl(MagicMock(), "food", config) is True
+    feed = [_dated_post("B", 2), _dated_post("A", 1)]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(feed)
+    mock_get_profile.reset_mock()
+    assert crawl(MagicMock(), "food", config) is True
+
+    assert mock_get_profile.call_count == 1
+    assert [p["shortcode"] for p in store.iter_posts(tags=["food"])] == ["B", "A"]
+    assert next(store.iter_posts())["username"] == "testuser"
+    assert list(config.output_dir.iterdir()) == []
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_query_stores_posts_under_their_feed(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    mock_get_profile.return_value = _fake_profile()
+    feeds = {
+        "pizza": _fake_hashtag_obj([_fake_post("P", ["pizza"])], mediacount=1),
+        "pasta": _fake_hashtag_obj([_fake_post("Q", ["pasta"])], mediacount=2),
+    }
+    mock_hashtag_cls.from_name.side_effect = lambda _ctx, name: feeds[name]
+    store = PostStore(tmp_path / "posts.db")
+    config = _make_config(tmp_path, store=store)
+
+    assert crawl_query(MagicMock(), parse("pizza OR pasta"), config) is True
+
+    assert [p["shortcode"] for p in store.iter_posts(tags=["pizza"])] == ["P"]
+    assert [p["shortcode"] for p in store.iter_posts(tags=["pasta"])] == ["Q"]
+
+
+# ---------------------------------------------------------------------------
+# checkpoints and --resume
+# ---------------------------------------------------------------------------
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_saves_checkpoint_on_interrupt(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """An interrupted crawl leaves its checkpoint and partial output behind."""
+    mock_get_profile.return_value = _fake_profile()
+
+    def feed() -> Any:
+        yield _fake_post("A", ["food"])
+        yield _fake_post("B", ["food"])
+        raise KeyboardInterrupt
+
+    hashtag_obj = MagicMock()
+    hashtag_obj.mediacount = 2
+    hashtag_obj.get_posts_resumable.return_value = feed()
+    mock_hashtag_cls.from_name.return_value = hashtag_obj
+
+    config = _make_config(tmp_path, checkpoint_interval=1, profile_batch_size=1)
+    with pytest.raises(KeyboardInterrupt):
+        crawl(MagicMock(), "food", config)
+
+    checkpoint = json.loads((config.output_dir / "food.checkpoint.json").read_text())
+    assert checkpoint["shortcodes"] == ["A", "B"]
+    assert (config.output_dir / "food.json.part").exists()
+    assert not (config.output_dir / "food.json").exists()
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_resume_continues_partial_output(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """--resume keeps earlier posts, skips them in the feed and finishes the file."""
+    mock_get_profile.return_value = _fake_profile()
+    config = _make_config(tmp_path, resume=True, max_posts=3)
+
+    part_file = config.output_dir / "food.json.part"
+    # Second line was cut short by a crash
+    part_file.write_text(json.dumps({"shortcode": "A"}) + "\n" + '{"shortco')
+    (config.output_dir / "food.checkpoint.json").write_text(
+        json.dumps({"iterator": None, "shortcodes": ["A"]})
+    )
+
+    posts = [_fake_post(code, ["food"]) for code in ("A", "B", "C", "D")]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(posts)
+
+    assert crawl(MagicMock(), "food", config) is True
+
+    data = json.loads((config.output_dir / "food.json").read_text())
+    assert [p["shortcode"] for p in data["posts"]] == ["A", "B", "C"]
+    assert not part_file.exists()
+    assert not (config.output_dir / "food.checkpoint.json").exists()
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_without_resume_starts_fresh(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    mock_get_profile.return_value = _fake_profile()
+    config = _make_config(tmp_path)
+    (config.output_dir / "food.json.part").write_text(json.dumps({"shortcode": "OLD"}) + "\n")
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([_fake_post("NEW", ["food"])])
+
+    crawl(MagicMock(), "food", config)
+
+    data = json.loads((config.output_dir / "food.json").read_text())
+    assert [p["shortcode"] for p in data["posts"]] == ["NEW"]
+
+
+# ---------------------------------------------------------------------------
+# incremental crawls
+# ---------------------------------------------------------------------------
+
+
+def _dated_post(shortcode: str, day: int) -> MagicMock:
+    return _fake_post(shortcode, ["food"], date_utc=datetime(2025, 1, day, tzinfo=timezone.utc))
+
+
+@pytest.mark.parametrize("output_format", ["json", "jsonl"])
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_incremental_merges_only_new_posts(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+    output_format: str,
+) -> None:
+    """A second incremental crawl stops at known posts and merges the new ones."""
+    mock_get_profile.return_value = _fake_profile()
+    config = _make_config(tmp_path, incremental=True, output_format=output_format)
+
+    first_feed = [_dated_post("B", 2), _dated_post("A", 1)]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(first_feed)
+    assert crawl(MagicMock(), "food", config) is True
+
+    second_feed = [_dated_post("D", 4), _dated_post("C", 3), *first_feed]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(second_feed)
+    mock_get_profile.reset_mock()
+    assert crawl(MagicMock(), "food", config) is True
+
+    # Only the two new posts were processed
+    assert mock_get_profile.call_count == 2
+    output_file = config.output_dir / f"food.{output_format}"
+    if output_format == "json":
+        shortcodes = [p["shortcode"] for p in json.loads(output_file.read_text())["posts"]]
+        assert shortcodes == ["D", "C", "B", "A"]
+    else:
+        lines = output_file.read_text().splitlines()
+        assert sorted(json.loads(line)["shortcode"] for line in lines) == ["A", "B", "C", "D"]
+
+    index = json.loads((config.output_dir / "food.index.json").read_text())
+    assert index["post_count"] == 4
+    assert index["shortcodes"] == ["D"]
+
+
+@pytest.mark.parametrize(
+    ("output_format", "interrupted"),
+    [("json", "json.dump"), ("jsonl", "shutil.copyfile")],
+)
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_interrupted_incremental_merge_keeps_earlier_posts(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+    output_format: str,
+    interrupted: str,
+) -> None:
+    """The merged output replaces the old file only once it is complete."""
+    mock_get_profile.return_value = _fake_profile()
+    config = _make_config(tmp_path, incremental=True, output_format=output_format)
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([_dated_post("A", 1)])
+    assert crawl(MagicMock(), "food", config) is True
+    output_file = config.output_dir / f"food.{output_format}"
+    before = output_file.read_text()
+
+    feed = [_dated_post("B", 2), _dated_post("A", 1)]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(feed)
+    with (
+        patch(f"instagram_hashtag_crawler.crawler.{interrupted}", side_effect=KeyboardInterrupt),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        crawl(MagicMock(), "food", config)
+
+    assert output_file.read_text() == before
+    assert not any(".tmp" in path.name for path in config.output_dir.iterdir())
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_crawl_incremental_rebuilds_mark_without_index(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Existing output from a non-incremental run still serves as the high-water mark."""
+    mock_get_profile.return_value = _fake_profile()
+    config = _make_config(tmp_path, incremental=True)
+    newest = int(datetime(2025, 1, 2, tzinfo=timezone.utc).timestamp())
+    _save_posts(
+        [{"shortcode": "B", "date": newest}, {"shortcode": "A", "date": newest - 86400}],
+        config.output_dir / "food.json",
+    )
+
+    feed = [_dated_post("B2", 2), _dated_post("B", 2), _dated_post("A", 1)]
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(feed)
+    crawl(MagicMock(), "food", config)
+
+    data = json.loads((config.output_dir / "food.json").read_text())
+    assert [p["shortcode"] for p in data["posts"]] == ["B2", "B", "A"]
+
+
+# ---------------------------------------------------------------------------
+# batched profile resolution
+# ---------------------------------------------------------------------------
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_fetches_each_owner_once_per_batch(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Posts by the same owner in one batch share a single profile lookup."""
+    mock_get_profile.return_value = _fake_profile()
+    posts = [_fake_post(f"P{i}", ["food"]) for i in range(6)]
+    for i, post in enumerate(posts):
+        post.owner_id = i % 2  # two distinct owners
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(posts)
+
+    config = _make_config(tmp_path, profile_workers=3)
+    result = _collect_posts(MagicMock(), "food", config)
+
+    assert [p["shortcode"] for p in result] == [f"P{i}" for i in range(6)]
+    assert mock_get_profile.call_count == 2
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_drops_posts_of_unresolvable_owner(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """A failed profile fetch only drops that owner's posts, and batches refill."""
+    posts = [_fake_post(code, ["food"]) for code in ("GONE", "A", "B")]
+    for post in posts:
+        post.owner_id = post.shortcode
+
+    def get_profile(_loader: Any, post: MagicMock, *_args: Any) -> MagicMock:
+        if post.shortcode == "GONE":
+            raise instaloader.QueryReturnedNotFoundException("404")
+        return _fake_profile()
+
+    mock_get_profile.side_effect = get_profile
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj(posts)
+
+    config = _make_config(tmp_path, max_posts=2, profile_batch_size=2, profile_workers=1)
+    result = _collect_posts(MagicMock(), "food", config)
+
+    assert [p["shortcode"] for p in result] == ["A", "B"]
+
+
+# ---------------------------------------------------------------------------
+# field selection and enrich
+# ---------------------------------------------------------------------------
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_without_profile_fields_skips_profiles(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    """Selecting only post-level fields never fetches a profile."""
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([_fake_post("A", ["food"])])
+
+    config = _make_config(tmp_path, fields=frozenset({"like_count"}))
+    result = _collect_posts(MagicMock(), "food", config)
+
+    mock_get_profile.assert_not_called()
+    assert result == [
+        {"shortcode": "A", "user_id": result[0]["user_id"], "date": 1735689600, "like_count": 42}
+    ]
+
+
+@patch("instagram_hashtag_crawler.crawler._get_profile")
+@patch("instagram_hashtag_crawler.crawler.Hashtag")
+def test_collect_posts_with_profile_field_fetches_profiles(
+    mock_hashtag_cls: MagicMock,
+    mock_get_profile: MagicMock,
+    tmp_path: Path,
+) -> None:
+    mock_get_profile.return_value = _fake_profile()
+    mock_hashtag_cls.from_name.return_value = _fake_hashtag_obj([_fake_post("A", ["food"])])
+
+    config = _make_config(tmp_path, fields=frozenset({"username"}))
+    result = _collect_posts(MagicMock(), "food", config)
+
+    assert set(result[0]) == {"shortcode", "user_id", "date", "username"}
+    assert result[0]["username"] == "testuser"
+
+
+@pytest.mark.parametrize("suffix", [".json", ".jsonl"])
+@patch("instagram_hashtag_crawler.crawler.Profile")
+def test_enrich_fills_missing_profile_fields(
+    mock_profile_cls: MagicMock,
+    tmp_path: Path,
+    suffix: str,
+) -> None:
+    """enrich fetches each distinct owner once and fills their posts."""
+    mock_profile_cls.from_id.return_value = _fake_profile()
+    output_file = tmp_path / f"food{suffix}"
+    _save_posts(
+        [
+            {"shortcode": "A", "user_id": 1, "date": 1},
+            {"shortcode": "B", "user_id": 1, "date": 2},
+            {
+                "shortcode": "C",
+                "user_id": 2,
+                "date": 3,
+                "username": "kept",
+                "full_name": "",
+                "profile_pic_url": "",
+                "media_count": 0,
+                "follower_count": 0,
+                "following_count": 0,
+            },
+        ],
+        output_file,
+    )
+
+    config = _make_config(tmp_path, profile_workers=2)
+    assert enrich(MagicMock(), output_file, config) == 2
+
+    mock_profile_cls.from_id.assert_called_once()
+    assert mock_profile_cls.from_id.call_args[0][1] == 1
+    if suffix == ".json":
+        posts = json.loads(output_file.read_text())["posts"]
+    else:
+        posts = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert [p["username"] for p in posts] == ["testuser", "testuser", "kept"]
+    assert posts[0]["follower_count"] == 500
+    assert posts[0]["date"] == 1
+
+
+@patch("instagram_hashtag_crawler.crawler.Profile")
+def test_enrich_skips_reference_records(mock_profile_cls: MagicMock, tmp_path: Path) -> None:
+    mock_profile_cls.from_id.return_value = _fake_profile()
+    output_file = tmp_path / "pizza.jsonl"
+    ref = {"shortcode": "A", "user_id": 1, "date": 1, "seen_in": "food"}
+    _save_posts([ref, {"shortcode": "B", "user_id": 2, "date": 2}], output_file)
+
+    assert enrich(MagicMock(), output_file, _make_config(tmp_path)) == 1
+
+    mock_profile_cls.from_id.assert_called_once()
+    assert mock_profile_cls.from_id.call_args[0][1] == 2
+    posts = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert posts[0] == ref
+    assert posts[1]["username"] == "testuser"
+
+
+@pytest.mark.parametrize(
+    ("suffix", "interrupted"), [(".json", "json.dump"), (".jsonl", "_write_line")]
+)
+@patch("instagram_hashtag_crawler.crawler.Profile")
+def test_interrupted_enrich_keeps_input(
+    mock_profile_cls: MagicMock,
+    tmp_path: Path,
+    suffix: str,
+    interrupted: str,
+) -> None:
+    mock_profile_cls.from_id.return_value = _fake_profile()
+    output_file = tmp_path / f"food{suffix}"
+    _save_posts([{"shortcode": "A", "user_id": 1, "date": 1}], output_file)
+    before = output_file.read_text()
+
+    with (
+        patch(f"instagram_hashtag_crawler.crawler.{interrupted}", side_effect=KeyboardInterrupt),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        enrich(MagicMock(), output_file, _make_config(tmp_path))
+
+    assert output_file.read_text() == before
+    assert [path.name for path in tmp_path.iterdir() if path.is_file()] == [output_file.name]
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
 import csv
+import gzip
 import json
+import os
+import tempfile
 from pathlib import Path
+from typing import Any
 
-from instagram_hashtag_crawler.export import RECENCY_THRESHOLD, read_profiles
+import pytest
+
+from instagram_hashtag_crawler import export
+from instagram_hashtag_crawler.export import RECENCY_THRESHOLD, read_profiles, read_store
+from instagram_hashtag_crawler.store import PostStore
 
 
 def _make_post(
@@ -116,3 +124,429 @@ def test_read_profiles_multiple_files(tmp_path: Path) -> None:
     # alpha.json sorts before beta.json
     assert rows[0][3] == "alpha_user"
     assert rows[1][3] == "beta_user"
+
+
+def test_read_profiles_streams_large_json(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """.json files are parsed chunk by chunk, whatever their layout."""
+    monkeypatch.setattr(export, "STREAM_CHUNK_SIZE", 7)
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    posts = [_make_post(date=now)]
+    posts += [_make_post(date=now - RECENCY_THRESHOLD - i, username=f"u{i}") for i in range(20)]
+    data = {"hashtag": "food", "count": 12345, "posts": posts, "meta": {"v": [1, 2]}}
+    (json_dir / "food.json").write_text(json.dumps(data, indent=2))
+
+    stats = read_profiles(json_dir, tmp_path / "csv")
+
+    rows = _read_csv(tmp_path / "csv" / "posts.csv")
+    assert [row[3] for row in rows] == [f"u{i}" for i in range(20)]
+    assert (stats.files, stats.rows) == (1, 20)
+
+
+def test_read_profiles_applies_threshold_to_unsorted_files(tmp_path: Path) -> None:
+    """The newest post decides the recency cut even when it comes last."""
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    posts = [
+        _make_post(date=now - RECENCY_THRESHOLD - 10, username="old"),
+        _make_post(date=now - RECENCY_THRESHOLD + 10, username="almost_recent"),
+        _make_post(date=now, username="newest"),
+        _make_post(date=now - 2 * RECENCY_THRESHOLD, username="oldest"),
+    ]
+    (json_dir / "food.json").write_text(json.dumps({"posts": posts}))
+
+    read_profiles(json_dir, tmp_path / "csv")
+
+    rows = _read_csv(tmp_path / "csv" / "posts.csv")
+    assert sorted(row[3] for row in rows) == ["old", "oldest"]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_read_profiles_parallel(tmp_path: Path, ordered: bool) -> None:
+    """A process pool exports the same rows as a single process."""
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    for i in range(6):
+        posts = [_make_post(date=now), _make_post(date=now - RECENCY_THRESHOLD, username=f"u{i}")]
+        (json_dir / f"tag{i}.json").write_text(json.dumps({"posts": posts}))
+
+    stats = read_profiles(json_dir, tmp_path / "csv", workers=2, ordered=ordered)
+
+    usernames = [row[3] for row in _read_csv(tmp_path / "csv" / "posts.csv")]
+    expected = [f"u{i}" for i in range(6)]
+    assert (usernames if ordered else sorted(usernames)) == expected
+    assert (stats.files, stats.rows) == (6, 6)
+
+
+def test_pool_results_spill_past_chunk_size(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A worker returns one chunk of posts; the rest is streamed back from a spill file."""
+    monkeypatch.setattr(export, "RESULT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    now = 1_700_000_000
+    posts = [_make_post(date=now - RECENCY_THRESHOLD - i, username=f"u{i}") for i in range(5)]
+    json_file = tmp_path / "tag.json"
+    json_file.write_text(json.dumps({"posts": [_make_post(date=now), *posts]}))
+
+    first, spill = export._load_exported_posts(json_file, None)
+
+    assert [post["username"] for post in first] == ["u0", "u1"]
+    assert spill is not None
+    assert [post["username"] for post in export._spilled_posts(first, spill)] == [
+        f"u{i}" for i in range(5)
+    ]
+    assert not Path(spill).exists()
+    assert export._load_exported_posts(json_file, now - RECENCY_THRESHOLD - 3) == (posts[3:], None)
+
+
+def test_read_profiles_parallel_streams_large_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Files larger than a worker's result chunk are exported whole, leaving no spill files."""
+    spill_dir = tmp_path / "tmp"
+    spill_dir.mkdir()
+    monkeypatch.setenv("TMPDIR", str(spill_dir))
+    monkeypatch.setattr(tempfile, "tempdir", str(spill_dir))
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    count = 2 * export.RESULT_CHUNK_SIZE + 1
+    for i in range(2):
+        posts = [_make_post(date=1_600_000_000 - n, username=f"t{i}") for n in range(count)]
+        recent = _make_post(date=1_600_000_000 + RECENCY_THRESHOLD)
+        (json_dir / f"tag{i}.json").write_text(json.dumps({"posts": [recent, *posts]}))
+
+    stats = read_profiles(json_dir, tmp_path / "csv", workers=2)
+
+    usernames = [row[3] for row in _read_csv(tmp_path / "csv" / "posts.csv")]
+    assert usernames == ["t0"] * count + ["t1"] * count
+    assert stats.rows == 2 * count
+    assert list(spill_dir.iterdir()) == []
+
+
+def test_read_profiles_rejects_malformed_json(tmp_path: Path) -> None:
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    (json_dir / "food.json").write_text('{"posts": [{"date": 1} {"date": 2}]}')
+
+    with pytest.raises(json.JSONDecodeError):
+        read_profiles(json_dir, tmp_path / "csv")
+
+
+def test_read_profiles_reads_jsonl(tmp_path: Path) -> None:
+    """Streaming .jsonl output is exported like a .json file."""
+    json_dir = tmp_path / "json"
+    csv_dir = tmp_path / "csv"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    posts = [
+        _make_post(date=now, username="recent"),
+        _make_post(date=now - RECENCY_THRESHOLD - 1, username="old_user"),
+    ]
+    (json_dir / "food.jsonl").write_text("".join(json.dumps(p) + "\n" for p in posts))
+    (json_dir / "dish.jsonl.part").write_text(json.dumps(posts[1]) + "\n")
+
+    read_profiles(json_dir, csv_dir)
+
+    rows = _read_csv(csv_dir / "posts.csv")
+    assert len(rows) == 1
+    assert rows[0][3] == "old_user"
+
+
+def test_read_profiles_skips_crawler_bookkeeping(tmp_path: Path) -> None:
+    """Checkpoint and index files next to the crawl output are ignored."""
+    json_dir = tmp_path / "json"
+    csv_dir = tmp_path / "csv"
+    json_dir.mkdir()
+
+    (json_dir / "food.checkpoint.json").write_text(json.dumps({"shortcodes": ["A"]}))
+    (json_dir / "food.index.json").write_text(json.dumps({"newest_date": 1}))
+
+    read_profiles(json_dir, csv_dir)
+
+    assert _read_csv(csv_dir / "posts.csv") == []
+
+
+def test_read_profiles_tolerates_missing_profile_fields(tmp_path: Path) -> None:
+    """Posts crawled with --no-profiles export with empty profile columns."""
+    json_dir = tmp_path / "json"
+    csv_dir = tmp_path / "csv"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    post = {"shortcode": "A", "user_id": 1, "date": now - RECENCY_THRESHOLD, "like_count": 3}
+    (json_dir / "food.json").write_text(json.dumps({"posts": [post, {**post, "date": now}]}))
+
+    read_profiles(json_dir, csv_dir)
+
+    rows = _read_csv(csv_dir / "posts.csv")
+    assert len(rows) == 1
+    assert rows[0][:10] == ["A", "", "3", "", "1", "", "", "", "", "0"]
+
+
+def test_read_profiles_skips_post_references(tmp_path: Path) -> None:
+    """Reference records written with --post-refs are not exported twice."""
+    json_dir = tmp_path / "json"
+    csv_dir = tmp_path / "csv"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    post = {"shortcode": "A", "user_id": 1, "date": now - RECENCY_THRESHOLD}
+    ref = {**post, "seen_in": "food"}
+    (json_dir / "food.json").write_text(json.dumps({"posts": [post, {**post, "date": now}]}))
+    (json_dir / "dish.json").write_text(json.dumps({"posts": [ref, {**ref, "date": now}]}))
+
+    read_profiles(json_dir, csv_dir)
+
+    assert [row[0] for row in _read_csv(csv_dir / "posts.csv")] == ["A"]
+
+
+def test_read_profiles_writes_typed_parquet(tmp_path: Path) -> None:
+    """Parquet export keeps integer counts, list tags and dictionary usernames."""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    posts = [_make_post(date=now - RECENCY_THRESHOLD - i) for i in range(3)]
+    posts.append({"shortcode": "B", "user_id": "7", "date": now - RECENCY_THRESHOLD})
+    posts.append(_make_post(date=now))
+    (json_dir / "food.json").write_text(json.dumps({"posts": posts}))
+
+    read_profiles(json_dir, tmp_path / "out", output_format="parquet")
+
+    table = pq.read_table(tmp_path / "out" / "posts.parquet")
+    assert table.num_rows == 4
+    assert table.schema.field("date").type == pa.int64()
+    assert table.schema.field("tags").type == pa.list_(pa.string())
+    assert pa.types.is_dictionary(table.schema.field("username").type)
+    rows = table.to_pylist()
+    assert rows[0]["tags"] == ["#test"]
+    assert rows[0]["like_count"] == 10
+    assert rows[3]["user_id"] == 7
+    assert rows[3]["follower_count"] is None
+
+
+def test_read_profiles_writes_arrow_in_row_groups(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Arrow IPC export flushes a record batch every ROW_GROUP_SIZE rows."""
+    pa = pytest.importorskip("pyarrow")
+    monkeypatch.setattr(export, "ROW_GROUP_SIZE", 2)
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    posts = [_make_post(date=now - RECENCY_THRESHOLD - i) for i in range(5)]
+    posts.append(_make_post(date=now))
+    (json_dir / "food.json").write_text(json.dumps({"posts": posts}))
+
+    read_profiles(json_dir, tmp_path / "out", output_format="arrow")
+
+    with pa.ipc.open_file(tmp_path / "out" / "posts.arrow") as reader:
+        assert reader.num_record_batches == 3
+        assert reader.read_all().num_rows == 5
+
+
+def test_read_profiles_rejects_unknown_format(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="xlsx"):
+        read_profiles(tmp_path, tmp_path / "out", output_format="xlsx")
+
+
+def test_incomplete_sink_fails_at_creation() -> None:
+    class NoClose(export._Sink):
+        def write(self, post: dict[str, Any]) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="close"):
+        NoClose()
+
+
+def _write_tag_file(json_dir: Path, name: str, username: str) -> Path:
+    now = 1_700_000_000
+    posts = [_make_post(date=now), _make_post(date=now - RECENCY_THRESHOLD, username=username)]
+    path = json_dir / f"{name}.json"
+    path.write_text(json.dumps({"posts": posts}))
+    return path
+
+
+def test_incremental_export_only_redoes_changed_files(tmp_path: Path) -> None:
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    out = tmp_path / "csv"
+    _write_tag_file(json_dir, "food", "a")
+    pizza = _write_tag_file(json_dir, "pizza", "b")
+    ramen = _write_tag_file(json_dir, "ramen", "c")
+
+    stats = read_profiles(json_dir, out, incremental=True)
+    assert (stats.files, stats.rows, stats.unchanged) == (3, 3, 0)
+    assert _read_csv(out / "posts" / "pizza.json.csv")[0][3] == "b"
+
+    # Touched without changes, rewritten with new content, deleted
+    os.utime(pizza, ns=(1, 1))
+    _write_tag_file(json_dir, "food", "a2")
+    ramen.unlink()
+
+    stats = read_profiles(json_dir, out, incremental=True)
+
+    assert (stats.files, stats.rows, stats.unchanged) == (1, 1, 1)
+    assert _read_csv(out / "posts" / "food.json.csv")[0][3] == "a2"
+    assert sorted(p.name for p in (out / "posts").iterdir()) == [
+        "food.json.csv",
+        "manifest.json",
+        "pizza.json.csv",
+    ]
+    manifest = json.loads((out / "posts" / "manifest.json").read_text())
+    assert manifest["files"]["pizza.json"]["mtime_ns"] == 1
+    assert manifest["files"]["pizza.json"]["rows"] == 1
+
+    stats = read_profiles(json_dir, out, incremental=True, workers=2)
+    assert (stats.files, stats.unchanged) == (0, 2)
+
+
+def test_incremental_export_restores_missing_partition(tmp_path: Path) -> None:
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    out = tmp_path / "csv"
+    _write_tag_file(json_dir, "food", "a")
+    read_profiles(json_dir, out, incremental=True)
+
+    (out / "posts" / "food.json.csv").unlink()
+    stats = read_profiles(json_dir, out, incremental=True)
+
+    assert (stats.files, stats.unchanged) == (1, 0)
+    assert _read_csv(out / "posts" / "food.json.csv")[0][3] == "a"
+
+
+def test_incremental_export_restarts_on_format_change(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    out = tmp_path / "out"
+    _write_tag_file(json_dir, "food", "a")
+
+    read_profiles(json_dir, out, output_file_name="posts", incremental=True)
+    stats = read_profiles(
+        json_dir, out, output_file_name="posts", output_format="parquet", incremental=True
+    )
+
+    assert stats.files == 1
+    assert sorted(p.name for p in (out / "posts").iterdir()) == [
+        "food.json.parquet",
+        "manifest.json",
+    ]
+
+
+@pytest.mark.parametrize("dedupe", ["memory", "disk"])
+def test_read_profiles_dedupes_across_files(tmp_path: Path, dedupe: str) -> None:
+    """With dedupe, a shortcode in several hashtag files is written once."""
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    old = now - RECENCY_THRESHOLD
+    for name, shortcodes in (("food", ["A", "B"]), ("pizza", ["B", "C"])):
+        posts = [_make_post(date=now)]
+        posts += [{**_make_post(date=old, username=name), "shortcode": s} for s in shortcodes]
+        (json_dir / f"{name}.json").write_text(json.dumps({"posts": posts}))
+
+    stats = read_profiles(json_dir, tmp_path / "csv", dedupe=dedupe)
+
+    rows = _read_csv(tmp_path / "csv" / "posts.csv")
+    assert [(row[0], row[3]) for row in rows] == [("A", "food"), ("B", "food"), ("C", "pizza")]
+    assert stats.duplicates == 1
+
+
+def test_seen_shortcodes_grows() -> None:
+    seen = export._SeenShortcodes()
+    assert all(seen.add(f"S{i}") for i in range(5000))
+    assert not any(seen.add(f"S{i}") for i in range(5000))
+    seen.close()
+
+
+def test_read_profiles_global_recency(tmp_path: Path) -> None:
+    """Global recency cuts every file relative to the newest post overall."""
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    stale = [_make_post(date=now - (3 + i) * RECENCY_THRESHOLD, username=f"s{i}") for i in range(2)]
+    fresh = [_make_post(date=now, username="new"), _make_post(date=now - 2, username="f")]
+    (json_dir / "a.json").write_text(json.dumps({"posts": stale}))
+    (json_dir / "b.json").write_text(json.dumps({"posts": fresh}))
+
+    read_profiles(json_dir, tmp_path / "file")
+    read_profiles(json_dir, tmp_path / "global", recency="global")
+    read_profiles(json_dir, tmp_path / "ref", reference_time=now - 2 * RECENCY_THRESHOLD)
+
+    def usernames(out: str) -> list[str]:
+        return [row[3] for row in _read_csv(tmp_path / out / "posts.csv")]
+
+    # Per file, a.json's newer stale post sets its own cutoff
+    assert usernames("file") == ["s1"]
+    assert usernames("global") == ["s0", "s1"]
+    assert usernames("ref") == ["s0", "s1"]
+
+
+def test_incremental_export_rejects_dedupe(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Incremental"):
+        read_profiles(tmp_path, tmp_path / "out", incremental=True, dedupe="memory")
+
+
+def test_read_profiles_reads_compressed_files(tmp_path: Path) -> None:
+    """gzip-compressed .json and .jsonl crawl output is read transparently."""
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+
+    now = 1_700_000_000
+    posts = [_make_post(date=now), _make_post(date=now - RECENCY_THRESHOLD, username="a")]
+    (json_dir / "food.json.gz").write_bytes(gzip.compress(json.dumps({"posts": posts}).encode()))
+    lines = "".join(json.dumps({**p, "username": p["username"] + "l"}) + "\n" for p in posts)
+    (json_dir / "pizza.jsonl.gz").write_bytes(gzip.compress(lines.encode()))
+
+    read_profiles(json_dir, tmp_path / "csv")
+
+    assert [row[3] for row in _read_csv(tmp_path / "csv" / "posts.csv")] == ["a", "al"]
+
+
+def test_read_store_filters_by_tag_and_date(tmp_path: Path) -> None:
+    store = PostStore(tmp_path / "posts.db")
+    now = 1_700_000_000
+    store.add_posts(
+        ["food"],
+        [
+            {**_make_post(date=now), "shortcode": "NEW"},
+            {**_make_post(date=now - RECENCY_THRESHOLD), "shortcode": "A"},
+            {**_make_post(date=now - 3 * RECENCY_THRESHOLD), "shortcode": "B"},
+        ],
+    )
+    store.add_posts(["pizza"], [{**_make_post(date=now - RECENCY_THRESHOLD), "shortcode": "C"}])
+    store.close()
+
+    read_store(tmp_path / "posts.db", tmp_path / "all")
+    read_store(
+        tmp_path / "posts.db", tmp_path / "food", tags=["food"], since=now - RECENCY_THRESHOLD
+    )
+
+    assert sorted(row[0] for row in _read_csv(tmp_path / "all" / "posts.csv")) == ["A", "B", "C"]
+    assert [row[0] for row in _read_csv(tmp_path / "food" / "posts.csv")] == ["A"]
+
+
+def test_export_main_from_store(tmp_path: Path) -> None:
+    store = PostStore(tmp_path / "posts.db")
+    store.add_posts(["food"], [{**_make_post(date=100), "shortcode": "A"}])
+    store.close()
+
+    export.main(
+        ["--store", f"sqlite:{tmp_path / 'posts.db'}", "--csv-dir", str(tmp_path), "--until", "100"]
+    )
+
+    assert [row[0] for row in _read_csv(tmp_path / "posts.csv")] == ["A"]
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+from instagram_hashtag_crawler.filters import (
+    caption_keywords,
+    min_comments,
+    min_likes,
+    node_value,
+)
+
+
+def _post(node: dict, caption: str = "") -> MagicMock:
+    post = MagicMock()
+    post._node = node
+    post.caption = caption
+    return post
+
+
+def test_node_value_tries_paths_in_order() -> None:
+    post = _post({"edge_liked_by": {"count": 3}})
+    assert node_value(post, ("edge_media_preview_like", "count"), ("edge_liked_by", "count")) == 3
+    assert node_value(post, ("missing",)) is None
+
+
+def test_min_likes_reads_node_and_passes_unknown_counts() -> None:
+    likes = min_likes(10)
+    assert likes(_post({"edge_media_preview_like": {"count": 10}}))
+    assert not likes(_post({"edge_media_preview_like": {"count": 0}}))
+    assert likes(_post({}))
+
+
+def test_min_comments() -> None:
+    comments = min_comments(2)
+    assert comments(_post({"edge_media_to_comment": {"count": 5}}))
+    assert not comments(_post({"edge_media_to_parent_comment": {"count": 1}}))
+
+
+def test_caption_keywords_matches_any_word_case_insensitively() -> None:
+    keyword = caption_keywords(["Margherita", "napoli"])
+    assert keyword(_post({}, "Best MARGHERITA in town"))
+    assert not keyword(_post({}, "pepperoni"))
+    assert not keyword(_post({}, None))
+    assert keyword.name == "keyword"
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from instagram_hashtag_crawler.post_index import PostIndex
+
+
+def test_get_returns_first_hashtag_and_counts_reuse() -> None:
+    index = PostIndex()
+    assert index.get("A") is None
+
+    index.put("food", {"shortcode": "A", "date": 1})
+    index.put("dish", {"shortcode": "A", "date": 2})
+
+    assert index.get("A") == ("food", {"shortcode": "A", "date": 1})
+    assert index.reused == 1
+    assert len(index) == 1
+
+
+def test_put_many_keeps_existing_entries() -> None:
+    index = PostIndex()
+    index.put("food", {"shortcode": "A"})
+
+    index.put_many("dish", [{"shortcode": "A"}, {"shortcode": "B"}])
+
+    assert index.get("A") == ("food", {"shortcode": "A"})
+    assert index.get("B") == ("dish", {"shortcode": "B"})
+
+
+def test_persists_across_instances(tmp_path: Path) -> None:
+    path = tmp_path / "posts.sqlite"
+    index = PostIndex(path)
+    index.put("food", {"shortcode": "A"})
+    index.close()
+
+    reopened = PostIndex(path)
+    assert reopened.get("A") == ("food", {"shortcode": "A"})
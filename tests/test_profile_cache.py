@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from instagram_hashtag_crawler.profile_cache import ProfileCache, ProfileRecord
+
+
+def _record(username: str = "user1") -> ProfileRecord:
+    return ProfileRecord(
+        username=username,
+        full_name="Test User",
+        profile_pic_url="https://example.com/pic.jpg",
+        mediacount=10,
+        followers=20,
+        followees=30,
+    )
+
+
+def test_from_profile_copies_fields() -> None:
+    profile = MagicMock()
+    profile.username = "alice"
+    profile.full_name = None
+    profile.profile_pic_url = "https://example.com/a.jpg"
+    profile.mediacount = 1
+    profile.followers = 2
+    profile.followees = 3
+
+    record = ProfileRecord.from_profile(profile)
+
+    assert record == ProfileRecord("alice", "", "https://example.com/a.jpg", 1, 2, 3)
+
+
+def test_get_put_counts_hits_and_misses() -> None:
+    cache = ProfileCache()
+    assert cache.get(1) is None
+    cache.put(1, _record())
+    assert cache.get(1) == _record()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_persists_across_instances(tmp_path: Path) -> None:
+    path = tmp_path / "profiles.sqlite"
+    cache = ProfileCache(path)
+    cache.put(7, _record("persisted"))
+    cache.close()
+
+    reopened = ProfileCache(path)
+    assert reopened.get(7) == _record("persisted")
+
+
+@patch("instagram_hashtag_crawler.profile_cache.time")
+def test_expired_entries_are_misses(mock_time: MagicMock) -> None:
+    mock_time.time.return_value = 1000.0
+    cache = ProfileCache(ttl=60)
+    cache.put(1, _record())
+
+    mock_time.time.return_value = 1061.0
+    assert cache.get(1) is None
+
+
+@patch("instagram_hashtag_crawler.profile_cache.time")
+def test_evicts_least_recently_used(mock_time: MagicMock) -> None:
+    cache = ProfileCache(max_size=2)
+    mock_time.time.return_value = 1.0
+    cache.put(1, _record("one"))
+    mock_time.time.return_value = 2.0
+    cache.put(2, _record("two"))
+    mock_time.time.return_value = 3.0
+    cache.get(1)  # refresh 1 so 2 becomes the eviction candidate
+    mock_time.time.return_value = 4.0
+    cache.put(3, _record("three"))
+
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+
+
+def test_rejects_bad_max_size() -> None:
+    with pytest.raises(ValueError, match="max_size"):
+        ProfileCache(max_size=0)
+
+
+@patch("instagram_hashtag_crawler.profile_cache.time")
+def test_hits_are_written_in_batches(mock_time: MagicMock, tmp_path: Path) -> None:
+    path = tmp_path / "profiles.sqlite"
+    mock_time.time.return_value = 1.0
+    cache = ProfileCache(path)
+    cache.put(7, _record())
+    cache.close()
+
+    def used_at() -> float:
+        conn = sqlite3.connect(str(path))
+        try:
+            return conn.execute("SELECT used_at FROM profiles WHERE owner_id = 7").fetchone()[0]
+        finally:
+            conn.close()
+
+    cache = ProfileCache(path)
+    mock_time.time.return_value = 5.0
+    assert cache.get(7) is not None
+    assert used_at() == 1.0  # not committed per lookup
+    cache.close()
+    assert used_at() == 5.0
+
+
+@patch("instagram_hashtag_crawler.profile_cache.time")
+def test_pending_hits_count_for_eviction(mock_time: MagicMock) -> None:
+    cache = ProfileCache(max_size=3)
+    for owner_id in (1, 2, 3):
+        mock_time.time.return_value = float(owner_id)
+        cache.put(owner_id, _record())
+    mock_time.time.return_value = 4.0
+    cache.get(1)
+    cache.put(2, _record("updated"))  # replacing an entry evicts nothing
+    assert len(cache) == 3
+
+    mock_time.time.return_value = 5.0
+    cache.put(4, _record())
+
+    assert len(cache) == 3
+    assert cache.get(3) is None
+    assert cache.get(1) is not None
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import pytest
+
+from instagram_hashtag_crawler.query import (
+    And,
+    Not,
+    Or,
+    QueryError,
+    Tag,
+    file_stem,
+    parse,
+    plan_feeds,
+    positive_tags,
+)
+
+
+def test_parse_precedence_and_grouping() -> None:
+    query = parse("(#Pizza OR pasta) and not #ad OR italy")
+
+    assert query == Or(
+        (
+            And((Or((Tag("pizza"), Tag("pasta"))), Not(Tag("ad")))),
+            Tag("italy"),
+        )
+    )
+    assert str(query) == "(pizza OR pasta) AND NOT ad OR italy"
+
+
+@pytest.mark.parametrize("expression", ["", "pizza AND", "(pizza", "pizza)", "pizza & pasta"])
+def test_parse_rejects_malformed_queries(expression: str) -> None:
+    with pytest.raises(QueryError):
+        parse(expression)
+
+
+def test_matches_evaluates_caption_tags() -> None:
+    query = parse("(pizza OR pasta) AND NOT ad")
+
+    assert query.matches(frozenset({"pasta", "food"}))
+    assert not query.matches(frozenset({"pizza", "ad"}))
+    assert not query.matches(frozenset({"food"}))
+
+
+def test_plan_feeds_reads_cheapest_and_operand() -> None:
+    sizes = {"food": 1_000_000, "pizza": 5_000, "pasta": 3_000, "italy": 50_000}
+    query = parse("food AND (pizza OR pasta)")
+
+    assert plan_feeds(query, sizes.__getitem__) == ["pasta", "pizza"]
+    assert plan_feeds(parse("italy OR pizza AND food"), sizes.__getitem__) == ["pizza", "italy"]
+    assert positive_tags(parse("pizza AND NOT ad")) == {"pizza"}
+
+
+def test_plan_feeds_rejects_unanswerable_queries() -> None:
+    with pytest.raises(QueryError, match="positive hashtag"):
+        plan_feeds(parse("NOT ad"), lambda _tag: 1)
+    with pytest.raises(QueryError):
+        plan_feeds(parse("pizza OR NOT ad"), lambda _tag: 1)
+
+
+def test_file_stem() -> None:
+    assert file_stem(parse("(pizza OR pasta) AND NOT ad")) == "pizza_OR_pasta_AND_NOT_ad-c16f00b4"
+    assert file_stem(parse("(#Pizza OR pasta) and not ad")) == file_stem(
+        parse("(pizza OR pasta) AND NOT ad")
+    )
+    # Same words, different grouping
+    assert file_stem(parse("(food OR pizza) AND vegan")) != file_stem(
+        parse("food OR (pizza AND vegan)")
+    )
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import instaloader
+import pytest
+
+from instagram_hashtag_crawler.ratelimit import (
+    RateLimiter,
+    backoff_delay,
+    call_with_retry,
+    rate_controller_factory,
+)
+
+
+def test_rate_limiter_rejects_bad_arguments() -> None:
+    with pytest.raises(ValueError, match="rate must be positive"):
+        RateLimiter(0)
+    with pytest.raises(ValueError, match="burst must be at least 1"):
+        RateLimiter(1.0, burst=0)
+
+
+@patch("instagram_hashtag_crawler.ratelimit.time")
+def test_rate_limiter_burst_then_waits(mock_time: MagicMock) -> None:
+    """Burst tokens are free; the next acquire sleeps for one token's worth."""
+    clock = [100.0]
+    mock_time.monotonic.side_effect = lambda: clock[0]
+
+    def fake_sleep(secs: float) -> None:
+        clock[0] += secs
+
+    mock_time.sleep.side_effect = fake_sleep
+
+    limiter = RateLimiter(2.0, burst=2)
+    limiter.acquire()
+    limiter.acquire()
+    mock_time.sleep.assert_not_called()
+
+    limiter.acquire()
+    mock_time.sleep.assert_called_once_with(pytest.approx(0.5))
+
+
+def test_rate_controller_factory_acquires_before_query() -> None:
+    limiter = MagicMock()
+    controller = rate_controller_factory(limiter)(MagicMock())
+
+    controller.wait_before_query("iphone")
+
+    limiter.acquire.assert_called_once()
+
+
+def test_rate_limiter_counts_requests_per_owner() -> None:
+    limiter = RateLimiter(1000.0, burst=10)
+    context = MagicMock()
+    controller = rate_controller_factory(limiter)(context)
+
+    controller.wait_before_query("graphql")
+    controller.wait_before_query("graphql")
+    limiter.acquire()
+
+    assert limiter.requests == 3
+    assert limiter.requests_for(context) == 2
+    assert limiter.requests_for(MagicMock()) == 0
+
+
+def test_backoff_delay_grows_and_caps() -> None:
+    assert 1.0 <= backoff_delay(0, base=2.0) <= 2.0
+    assert 4.0 <= backoff_delay(2, base=2.0) <= 8.0
+    assert 5.0 <= backoff_delay(20, base=2.0, cap=10.0) <= 10.0
+
+
+@patch("instagram_hashtag_crawler.ratelimit.random")
+def test_throttled_halves_rate_and_backs_off_exponentially(mock_random: MagicMock) -> None:
+    mock_random.uniform.side_effect = lambda _low, high: high
+    limiter = RateLimiter(1.0, min_rate=0.3)
+
+    assert limiter.throttled() == 2.0
+    assert limiter.rate == pytest.approx(0.5)
+    assert limiter.throttled() == 4.0
+    assert limiter.rate == pytest.approx(0.3)  # clamped at min_rate
+    assert limiter.throttles == 2
+
+
+@patch("instagram_hashtag_crawler.ratelimit.random")
+def test_succeeded_recovers_additively_up_to_max(mock_random: MagicMock) -> None:
+    mock_random.uniform.side_effect = lambda _low, high: high
+    limiter = RateLimiter(1.0, increase=0.2)
+    limiter.throttled()
+
+    limiter.succeeded()
+    assert limiter.rate == pytest.approx(0.7)
+    for _ in range(5):
+        limiter.succeeded()
+    assert limiter.rate == pytest.approx(1.0)
+    # A success resets the exponential backoff
+    assert limiter.throttled() == 2.0
+
+
+def test_rate_controller_reports_success_and_429() -> None:
+    limiter = MagicMock()
+    limiter.throttled.return_value = 0.0
+    context = MagicMock()
+    attempts = iter([True, False])
+
+    def get_json(path: str, params: dict) -> dict:
+        controller.wait_before_query("iphone")
+        if next(attempts):
+            controller.handle_429("iphone")
+            return context.get_json(path, params)  # instaloader retries by recursing
+        return {}
+
+    context.get_json = get_json
+    controller = rate_controller_factory(limiter)(context)
+
+    assert context.get_json("path", {}) == {}
+    limiter.sleep.assert_called_once_with(0.0)
+    # Both attempts acquired a token, but the query succeeded once
+    assert limiter.acquire.call_count == 2
+    limiter.succeeded.assert_called_once()
+
+
+@patch("instagram_hashtag_crawler.ratelimit.random")
+def test_repeated_failures_back_off_longer_and_slow_down(mock_random: MagicMock) -> None:
+    """Retries of a failing query are not mistaken for successes."""
+    mock_random.uniform.side_effect = lambda _low, high: high
+    limiter = RateLimiter(100.0, burst=10)
+    waits: list[float] = []
+    context = MagicMock()
+
+    def get_json(path: str, params: dict) -> dict:
+        controller.wait_before_query("other")
+        raise instaloader.ConnectionException("500")
+
+    context.get_json = get_json
+    controller = rate_controller_factory(limiter)(context)
+
+    with (
+        patch.object(limiter, "sleep", side_effect=waits.append),
+        pytest.raises(instaloader.ConnectionException),
+    ):
+        call_with_retry(lambda: context.get_json("path", {}), limiter, what="test", attempts=4)
+
+    assert waits == [2.0, 4.0, 8.0]
+    assert limiter.rate == pytest.approx(100.0 * 0.5**3)
+
+
+def test_call_with_retry_retries_connection_errors() -> None:
+    limiter = MagicMock()
+    limiter.throttled.return_value = 0.5
+    fn = MagicMock(side_effect=[instaloader.ConnectionException("boom"), "ok"])
+
+    assert call_with_retry(fn, limiter, what="testing") == "ok"
+    limiter.sleep.assert_called_once_with(0.5)
+
+
+def test_call_with_retry_gives_up_after_attempts() -> None:
+    limiter = MagicMock()
+    limiter.throttled.return_value = 0.0
+    fn = MagicMock(side_effect=instaloader.ConnectionException("boom"))
+
+    with pytest.raises(instaloader.ConnectionException):
+        call_with_retry(fn, limiter, what="testing", attempts=3)
+    assert fn.call_count == 3
+
+
+def test_call_with_retry_does_not_retry_not_found() -> None:
+    fn = MagicMock(side_effect=instaloader.QueryReturnedNotFoundException("404"))
+
+    with pytest.raises(instaloader.QueryReturnedNotFoundException):
+        call_with_retry(fn, MagicMock(), what="testing")
+    fn.assert_called_once()
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import instaloader
+import pytest
+
+from instagram_hashtag_crawler.crawler import CrawlConfig, CrawlStats
+from instagram_hashtag_crawler.scheduler import (
+    MAX_IDLE,
+    RETRY_DELAY,
+    Scheduler,
+    TagSchedule,
+    load_schedule,
+    parse_duration,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def _fake_crawl(results: dict[str, tuple[int, int]], calls: list[str]) -> Any:
+    """A crawl stand-in that records the hashtag and reports (kept, requests)."""
+
+    def crawl(_loader: Any, hashtag: str, config: CrawlConfig, stats: CrawlStats) -> bool:
+        assert config.incremental
+        calls.append(hashtag)
+        stats.kept, stats.requests = results.get(hashtag, (0, 1))
+        return True
+
+    return crawl
+
+
+def _scheduler(tmp_path: Path, tags: list[TagSchedule], **kwargs: Any) -> Scheduler:
+    clock = kwargs.pop("clock", FakeClock())
+    return Scheduler(
+        MagicMock(),
+        tags,
+        CrawlConfig(output_dir=tmp_path),
+        clock=clock,
+        sleep=clock.sleep,
+        **kwargs,
+    )
+
+
+def test_parse_duration() -> None:
+    assert parse_duration("90") == 90
+    assert parse_duration("15m") == 900
+    assert parse_duration("1.5h") == 5400
+    assert parse_duration("1d") == 86400
+    for bad in ("", "0", "5w", "-1h"):
+        with pytest.raises(ValueError, match="Invalid duration"):
+            parse_duration(bad)
+
+
+def test_load_schedule(tmp_path: Path) -> None:
+    path = tmp_path / "tags.txt"
+    path.write_text("# nightly tags\nFood 1h\n\npizza   # default interval\n")
+
+    tags = load_schedule(path, default_interval=600)
+
+    assert [(t.hashtag, t.interval) for t in tags] == [("food", 3600), ("pizza", 600)]
+
+
+def test_due_tags_run_by_staleness_and_velocity(tmp_path: Path) -> None:
+    clock = FakeClock()
+    tags = [
+        TagSchedule("quiet", 3600, last_crawl=clock.now - 7200, velocity=0),
+        TagSchedule("busy", 3600, last_crawl=clock.now - 7200, velocity=50),
+        TagSchedule("fresh", 3600, last_crawl=clock.now - 60),
+        TagSchedule("new", 3600),
+    ]
+    calls: list[str] = []
+    scheduler = _scheduler(tmp_path, tags, clock=clock)
+
+    with patch("instagram_hashtag_crawler.scheduler.crawl", _fake_crawl({}, calls)):
+        scheduler.run(max_crawls=3)
+        # Nothing else is due yet; the scheduler checks back after MAX_IDLE
+        assert scheduler.run_once() == MAX_IDLE
+
+    assert calls == ["new", "busy", "quiet"]
+
+
+def test_velocity_tracks_new_posts_per_hour(tmp_path: Path) -> None:
+    clock = FakeClock()
+    tag = TagSchedule("food", 3600, last_crawl=clock.now - 7200)
+    scheduler = _scheduler(tmp_path, [tag], clock=clock)
+
+    with patch("instagram_hashtag_crawler.scheduler.crawl", _fake_crawl({"food": (40, 1)}, [])):
+        scheduler.run_once()
+
+    # 40 posts in 2 hours, smoothed from 0
+    assert tag.velocity == pytest.approx(10)
+    assert tag.last_crawl == clock.now
+
+
+def test_hourly_request_budget_delays_crawls(tmp_path: Path) -> None:
+    clock = FakeClock()
+    tags = [TagSchedule("a", 60), TagSchedule("b", 60)]
+    calls: list[str] = []
+    scheduler = _scheduler(tmp_path, tags, clock=clock, hourly_requests=100)
+
+    with patch("instagram_hashtag_crawler.scheduler.crawl", _fake_crawl({"b": (0, 150)}, calls)):
+        assert scheduler.run_once() == 0
+        assert scheduler.remaining_budget(clock.now) == -50
+        assert scheduler.run_once() == 60  # waits, a minute at a time
+        clock.now += 3600
+        scheduler.run_once()
+
+    assert calls == ["b", "a"]
+
+
+def test_state_survives_restart(tmp_path: Path) -> None:
+    clock = FakeClock()
+    state_path = tmp_path / "schedule.state.json"
+    scheduler = _scheduler(
+        tmp_path, [TagSchedule("food", 3600)], clock=clock, state_path=state_path
+    )
+    with patch("instagram_hashtag_crawler.scheduler.crawl", _fake_crawl({}, [])):
+        scheduler.run_once()
+
+    restarted = _scheduler(
+        tmp_path, [TagSchedule("food", 3600)], clock=clock, state_path=state_path
+    )
+    assert restarted.tags["food"].last_crawl == clock.now
+    assert restarted.next_tag(clock.now) is None
+
+
+def test_failed_crawls_are_retried_without_updating_the_tag(tmp_path: Path) -> None:
+    relogin = MagicMock()
+    clock = FakeClock()
+    last_crawl = clock.now - 7200
+    scheduler = _scheduler(
+        tmp_path,
+        [TagSchedule("a", 3600, last_crawl=last_crawl, velocity=5.0)],
+        relogin=relogin,
+        clock=clock,
+    )
+    errors = iter(
+        [
+            instaloader.AbortDownloadException("checkpoint_required"),
+            instaloader.ConnectionException("x"),
+            ValueError("corrupt output"),
+        ]
+    )
+    calls: list[float] = []
+
+    def crawl(*_args: Any) -> bool:
+        calls.append(clock.now)
+        error = next(errors, None)
+        if error is not None:
+            raise error
+        return True
+
+    with patch("instagram_hashtag_crawler.scheduler.crawl", crawl):
+        scheduler.run(max_crawls=3)
+        (tag,) = scheduler.tags.values()
+        assert (tag.last_crawl, tag.velocity) == (last_crawl, 5.0)
+        scheduler.run(max_crawls=4)
+
+    relogin.assert_called_once_with()
+    # Retried at once after logging in again, after RETRY_DELAY after other errors
+    start = calls[0]
+    assert calls == [start, start, start + RETRY_DELAY, start + 2 * RETRY_DELAY]
+    assert tag.last_crawl == start + 2 * RETRY_DELAY
+
+
+def test_logged_out_session_without_relogin_is_raised(tmp_path: Path) -> None:
+    scheduler = _scheduler(tmp_path, [TagSchedule("a", 60)])
+
+    def crawl(*_args: Any) -> bool:
+        raise instaloader.LoginRequiredException("logged out")
+
+    with (
+        patch("instagram_hashtag_crawler.scheduler.crawl", crawl),
+        pytest.raises(instaloader.LoginRequiredException),
+    ):
+        scheduler.run_once()
+    assert scheduler.tags["a"].last_crawl is None
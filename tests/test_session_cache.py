@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from instagram_hashtag_crawler.session_cache import SessionCache, default_cache_dir
+
+
+def _cache(tmp_path: Path, ttl: float = 3600) -> tuple[SessionCache, list[float]]:
+    clock = [1000.0]
+    return SessionCache(tmp_path / "cache", ttl, clock=lambda: clock[0]), clock
+
+
+def test_verified_session_is_trusted_until_ttl(tmp_path: Path) -> None:
+    cache, clock = _cache(tmp_path)
+    session_file = tmp_path / "session-alice"
+    session_file.write_bytes(b"cookies")
+
+    assert cache.verified(session_file) is None
+    cache.mark_verified(session_file, "alice")
+    assert cache.verified(session_file) == "alice"
+
+    clock[0] += 3600
+    assert cache.verified(session_file) is None
+    # The username is still known, e.g. to reload a cached browser session
+    assert cache.username(session_file) == "alice"
+
+
+def test_changed_session_file_needs_verification(tmp_path: Path) -> None:
+    cache, _ = _cache(tmp_path)
+    session_file = tmp_path / "session-alice"
+    session_file.write_bytes(b"cookies")
+    cache.mark_verified(session_file, "alice")
+
+    stat = session_file.stat()
+    os.utime(session_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.verified(session_file) is None
+
+    session_file.unlink()
+    assert cache.verified(session_file) is None
+
+
+def test_forget_and_zero_ttl(tmp_path: Path) -> None:
+    cache, _ = _cache(tmp_path, ttl=0)
+    session_file = tmp_path / "session-alice"
+    session_file.write_bytes(b"cookies")
+
+    cache.mark_verified(session_file, "alice")
+    assert cache.verified(session_file) is None
+
+    cache.forget(session_file)
+    assert cache.username(session_file) is None
+
+
+def test_cache_survives_unreadable_file(tmp_path: Path) -> None:
+    cache, _ = _cache(tmp_path)
+    cache.directory.mkdir()
+    (cache.directory / "verified.json").write_text("{not json")
+    session_file = tmp_path / "session-alice"
+    session_file.write_bytes(b"cookies")
+
+    assert cache.verified(session_file) is None
+    cache.mark_verified(session_file, "alice")
+    assert cache.verified(session_file) == "alice"
+
+
+def test_browser_session_files_per_cookie_file(tmp_path: Path) -> None:
+    cache, _ = _cache(tmp_path)
+
+    default = cache.browser_session_file("Chrome", None)
+    profile = cache.browser_session_file("chrome", "/profiles/1/Cookies")
+
+    assert default.parent == cache.directory
+    assert default.name.startswith("browser-chrome-")
+    assert default != profile
+    assert cache.browser_session_file("chrome", None) == default
+
+
+def test_default_cache_dir_honours_xdg(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert default_cache_dir() == tmp_path / "instagram-hashtag-crawler"
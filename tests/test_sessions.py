@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import instaloader
+import pytest
+
+from instagram_hashtag_crawler.crawler import CrawlConfig, CrawlStoppedError
+from instagram_hashtag_crawler.ratelimit import RateLimiter
+from instagram_hashtag_crawler.sessions import (
+    QUARANTINE_COOLDOWN,
+    NoSessionsError,
+    Session,
+    SessionPool,
+    crawl_pooled,
+)
+
+
+def _session(name: str) -> Session:
+    return Session(name, MagicMock(name=name), RateLimiter(1.0))
+
+
+def _pool(*names: str) -> tuple[SessionPool, list[float]]:
+    clock = [1000.0]
+    pool = SessionPool([_session(name) for name in names], clock=lambda: clock[0])
+    return pool, clock
+
+
+def test_acquire_spreads_work_across_idle_sessions() -> None:
+    pool, _ = _pool("a", "b")
+
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.name, second.name} == {"a", "b"}
+
+    pool.release(first)
+    pool.release(second)
+    # Both clean, so the session with fewer crawls goes next
+    third = pool.acquire()
+    pool.release(third)
+    assert pool.acquire() is not third
+
+
+def test_throttled_session_is_quarantined_with_growing_cooldown() -> None:
+    pool, clock = _pool("a", "b")
+    a, b = pool.sessions
+
+    session = pool.acquire()
+    assert session is a
+    a.limiter.throttles += 3  # three 429s during the lease
+    pool.release(a)
+    pool.release(pool.acquire())  # b
+    assert a.quarantined_until == 1000.0 + QUARANTINE_COOLDOWN
+    assert pool.healthy() == 1
+    assert pool.acquire() is b
+    pool.release(b)
+
+    clock[0] += QUARANTINE_COOLDOWN
+    assert pool.healthy() == 2
+    b.busy = True
+    assert pool.acquire() is a
+    pool.release(a, failed=True)
+    a.busy = True
+    a.limiter.throttles += 2
+    pool.release(a)
+    # Quarantined again before a clean crawl: the cooldown doubles
+    assert a.quarantined_until == clock[0] + 2 * QUARANTINE_COOLDOWN
+
+
+def test_strikes_expire_after_health_window() -> None:
+    pool, clock = _pool("a")
+    (a,) = pool.sessions
+
+    pool.acquire()
+    pool.release(a, failed=True)
+    pool.acquire()
+    pool.release(a, failed=True)
+    clock[0] += pool.window + 1
+    pool.acquire()
+    pool.release(a, failed=True)
+
+    assert a.quarantined_until == 0.0
+    assert a.failures == 3
+
+
+def test_logged_out_sessions_are_retired() -> None:
+    pool, _ = _pool("a", "b")
+    a, b = pool.sessions
+
+    pool.release(pool.acquire(), logged_out=True)
+    assert pool.acquire() is b
+    pool.release(b, logged_out=True)
+
+    assert a.logged_out
+    with pytest.raises(NoSessionsError):
+        pool.acquire()
+
+
+def test_crawl_pooled_uses_each_sessions_limiter(tmp_path: Path) -> None:
+    pool, _ = _pool("a", "b")
+    config = CrawlConfig(output_dir=tmp_path)
+    calls = []
+
+    def fake_crawl(loader: MagicMock, hashtag: str, crawl_config: CrawlConfig) -> bool:
+        session = next(s for s in pool.sessions if s.loader is loader)
+        assert crawl_config.rate_limiter is session.limiter
+        calls.append(hashtag)
+        return hashtag != "rare"
+
+    with patch("instagram_hashtag_crawler.sessions.crawl", fake_crawl):
+        results = crawl_pooled(pool, ["food", "pizza", "rare"], config)
+
+    assert results == {"food": True, "pizza": True, "rare": False}
+    assert sorted(calls) == ["food", "pizza", "rare"]
+    assert sum(session.crawls for session in pool.sessions) == 3
+
+
+def test_crawl_pooled_retries_failed_crawl_on_another_session(tmp_path: Path) -> None:
+    pool, _ = _pool("a", "b")
+    a, b = pool.sessions
+    config = CrawlConfig(output_dir=tmp_path)
+    attempts = []
+
+    def fake_crawl(loader: MagicMock, hashtag: str, crawl_config: CrawlConfig) -> bool:
+        attempts.append((loader, crawl_config.resume))
+        if loader is a.loader:
+            raise instaloader.TooManyRequestsException("429")
+        return True
+
+    with patch("instagram_hashtag_crawler.sessions.crawl", fake_crawl):
+        assert crawl_pooled(pool, ["food"], config) == {"food": True}
+
+    # The retry resumes the interrupted crawl on the other session
+    assert attempts == [(a.loader, False), (b.loader, True)]
+    assert a.failures == 1
+    assert b.failures == 0
+
+
+def test_crawl_pooled_retires_flagged_session(tmp_path: Path) -> None:
+    pool, _ = _pool("a", "b")
+    a, b = pool.sessions
+    config = CrawlConfig(output_dir=tmp_path)
+
+    def fake_crawl(loader: MagicMock, hashtag: str, crawl_config: CrawlConfig) -> bool:
+        if loader is a.loader:
+            raise instaloader.AbortDownloadException("checkpoint_required")
+        return True
+
+    with patch("instagram_hashtag_crawler.sessions.crawl", fake_crawl):
+        assert crawl_pooled(pool, ["food", "pizza"], config) == {"food": True, "pizza": True}
+
+    assert a.logged_out
+    assert not b.logged_out
+
+
+def test_crawl_pooled_waits_for_stopped_crawls_on_interrupt(tmp_path: Path) -> None:
+    pool, _ = _pool("a", "b")
+    started = threading.Event()
+    finished = []
+
+    def fake_crawl(_loader: MagicMock, hashtag: str, config: CrawlConfig) -> bool:
+        if hashtag == "food":
+            started.set()
+            assert config.stop.wait(5)
+            time.sleep(0.05)
+            finished.append(hashtag)
+            raise CrawlStoppedError(hashtag)
+        started.wait(5)
+        raise KeyboardInterrupt
+
+    with (
+        patch("instagram_hashtag_crawler.sessions.crawl", fake_crawl),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        crawl_pooled(pool, ["interrupt", "food"], CrawlConfig(output_dir=tmp_path))
+
+    assert finished == ["food"]
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from instagram_hashtag_crawler.store import PostStore, parse_store_url
+
+PROFILE = {
+    "username": "alice",
+    "full_name": "Alice",
+    "profile_pic_url": "https://example.com/a.jpg",
+    "media_count": 3,
+    "follower_count": 10,
+    "following_count": 5,
+}
+
+
+def _post(shortcode: str, date: int, owner: int = 1, **fields: object) -> dict:
+    return {"shortcode": shortcode, "user_id": owner, "date": date, **fields}
+
+
+def test_add_posts_upserts_and_merges_records(tmp_path: Path) -> None:
+    store = PostStore(tmp_path / "posts.db")
+    store.add_posts(["food"], [_post("A", 1, like_count=3, **PROFILE)])
+    # A later crawl with fewer fields keeps what the first one wrote
+    store.add_posts(["pizza"], [_post("A", 1, like_count=7)])
+
+    assert len(store) == 1
+    assert list(store.iter_posts()) == [_post("A", 1, like_count=7, **PROFILE)]
+    assert [p["shortcode"] for p in store.iter_posts(tags=["pizza"])] == ["A"]
+
+
+def test_recrawl_stores_fields_that_became_null(tmp_path: Path) -> None:
+    store = PostStore(tmp_path / "posts.db")
+    store.add_posts(["food"], [_post("A", 1, like_count=3, location="Rome", **PROFILE)])
+    store.add_posts(["food"], [_post("A", 1, like_count=4, location=None)])
+    # Repeats within one batch merge too
+    store.add_posts(["food"], [_post("A", 1, comment_count=None), _post("A", 1, like_count=5)])
+
+    assert list(store.iter_posts()) == [
+        _post("A", 1, like_count=5, location=None, comment_count=None, **PROFILE)
+    ]
+
+
+def test_iter_posts_fills_profiles_and_filters(tmp_path: Path) -> None:
+    store = PostStore(tmp_path / "posts.db")
+    store.add_posts(["food"], [_post("A", 10, **PROFILE), _post("B", 20)])
+    store.add_posts(["pizza"], [_post("C", 30, owner=2)])
+
+    posts = list(store.iter_posts())
+    assert [p["shortcode"] for p in posts] == ["C", "B", "A"]
+    # B was saved without profile fields; its owner's stored profile fills them in
+    assert posts[1]["username"] == "alice"
+    assert "username" not in posts[0]
+
+    assert [p["shortcode"] for p in store.iter_posts(tags=["food"], since=15)] == ["B"]
+    assert [p["shortcode"] for p in store.iter_posts(until=20, chunk_size=1)] == ["B", "A"]
+
+
+def test_reference_records_only_add_hashtags(tmp_path: Path) -> None:
+    store = PostStore(tmp_path / "posts.db")
+    store.add_posts(["food"], [_post("A", 1, caption="hi")])
+    written = store.add_posts(["dish"], [{**_post("A", 1), "seen_in": "food"}])
+
+    assert written == 0
+    assert list(store.iter_posts(tags=["dish"])) == [_post("A", 1, caption="hi")]
+
+
+def test_high_water_mark(tmp_path: Path) -> None:
+    store = PostStore(tmp_path / "posts.db")
+    assert store.high_water_mark("food") is None
+
+    store.add_posts(["food"], [_post("A", 5), _post("B", 5), _post("C", 3)])
+    store.add_posts(["pizza"], [_post("D", 9)])
+
+    assert store.high_water_mark("food") == (5, {"A", "B"}, 3)
+    assert store.newest_date() == 9
+
+
+def test_parse_store_url() -> None:
+    assert parse_store_url("sqlite:out/posts.db") == Path("out/posts.db")
+    with pytest.raises(ValueError, match="sqlite:PATH"):
+        parse_store_url("posts.db")